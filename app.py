@@ -1,21 +1,38 @@
 
 import streamlit as st
+import io
+import os
+import sys
+import warnings
+import zlib
+import hashlib
+import threading
+import tempfile
+import importlib
+import multiprocessing
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
 import pandas as pd
 import numpy as np
-from scipy.stats import kruskal
+from scipy.stats import chi2, norm, gamma, beta, qmc, f as f_dist, t as t_dist
 import matplotlib.pyplot as plt
 import matplotlib as mpl
 from matplotlib.ticker import MaxNLocator
 
-# Configurações gerais com tema escuro
-st.set_page_config(
-    page_title="Análise de Vermicompostos",
-    layout="wide",
-    page_icon="📊"
-)
+def apply_page_theme():
+    """Configuração da página e tema escuro: chamada no início de main(), e não na importação, para que
+    o módulo possa ser importado (testes, processos de tile_pool) sem comandos do Streamlit"""
+    st.set_page_config(
+        page_title="Análise de Vermicompostos",
+        layout="wide",
+        page_icon="📊"
+    )
 
-# CSS para tema escuro premium com cards clicáveis
-st.markdown("""
+    # CSS para tema escuro premium com cards clicáveis
+    st.markdown("""
 <style>
     /* Configurações gerais */
     body {
@@ -171,7 +188,7 @@ st.markdown("""
         position: relative;
     }
 </style>
-""", unsafe_allow_html=True)
+    """, unsafe_allow_html=True)
 
 # Configurar matplotlib para tema escuro premium
 plt.style.use('dark_background')
@@ -191,344 +208,3232 @@ mpl.rcParams.update({
 })
 
 # ===================================================================
-# TELA INICIAL
+# NÚCLEO DE SIMULAÇÃO COMPARTILHADO
 # ===================================================================
-def show_homepage():
-    """Tela inicial de seleção de artigo"""
-    st.markdown(f"""
-    <div class="header-card">
-        <h1 style="margin:0;padding:0;background:linear-gradient(135deg, #a78bfa 0%, #6f42c1 100%); -webkit-background-clip:text; -webkit-text-fill-color:transparent; font-size:2.5rem;">
-            🪱 Análise de Vermicompostos
-        </h1>
-        <p style="margin:0;padding-top:10px;color:#a0a7c0;font-size:1.1rem;">
-            Selecione um artigo abaixo para realizar a análise estatística
-        </p>
-    </div>
-    """, unsafe_allow_html=True)
-    
-    # Madhubala et al. (2025) - Removido
-    
-    col1, col2, col3 = st.columns(3) # Use colunas para os próximos 3 artigos
+# Bloco de réplicas simuladas: array N-dimensional + nomes dos eixos + rótulos de cada eixo
+SimulatedBlock = namedtuple('SimulatedBlock', ['values', 'dims', 'coords'])
+# Tabela de um estudo já convertida em arrays (médias, desvios e limites físicos)
+StudySpec = namedtuple('StudySpec', ['key', 'means', 'sds', 'lower', 'upper', 'dims', 'coords'])
 
-    with col1:
-        # Dermendzhieva et al. (2021) - PRIMEIRO
-        with st.container():
-            st.markdown("""
-            <div class="card-container">
-                <div class="card">
-                    <h2 style="color:#e0e5ff;">Dermendzhieva et al. (2021)</h2>
-                    <p style="color:#a0a7c0;">Análise temporal de parâmetros de vermicomposto</p>
-                    <ul class="custom-list">
-                        <li>Evolução ao longo de 120 dias</li>
-                        <li>Parâmetros: TKN, Fósforo, Potássio</li>
-                        <li>Teste de Kruskal-Wallis</li>
-                    </ul>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            if st.button("Selecionar Dermendzhieva", key="btn_dermendzhieva", 
-                         help="Clique para selecionar este artigo",
-                         use_container_width=True,
-                         type="primary"):
-                st.session_state['selected_article'] = 'dermendzhieva'
-                st.rerun()
-    
-    with col2:
-        # Mago et al. (2021) - SEGUNDO
-        with st.container():
-            st.markdown("""
-            <div class="card-container">
-                <div class="card">
-                    <h2 style="color:#e0e5ff;">Mago et al. (2021)</h2>
-                    <p style="color:#a0a7c0;">Gestão de biomassa de resíduos de cultura de banana via vermicompostagem</p>
-                    <ul class="custom-list">
-                        <li>Análise de parâmetros físico-químicos do vermicomposto final</li>
-                        <li>Diferentes proporções de resíduos de folha de bananeira e esterco de vaca</li>
-                        <li>Teste de Kruskal-Wallis</li>
-                    </ul>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-            if st.button("Selecionar Mago", key="btn_mago", 
-                        help="Clique para selecionar este artigo",
-                        use_container_width=True,
-                        type="primary"):
-                st.session_state['selected_article'] = 'mago'
-                st.rerun()
+# Semente padrão dos fluxos aleatórios (pode ser alterada na interface de cada módulo)
+DEFAULT_SEED = 2021
+# Réplicas por grupo informadas em cada artigo: n das estatísticas publicadas (ANOVA analítica, bayesiano)
+# e número padrão de réplicas simuladas
+PUBLISHED_REPLICATIONS = {'dermendzhieva': 3, 'jordao': 4, 'sharma': 5, 'mago': 3, 'hanc': 3}
+# Opções extras de réplicas simuladas por grupo (acima de DENSE_POINTS_THRESHOLD os gráficos viram densidades)
+REPLICATION_CHOICES = [10, 30, 100, 300, 1000]
 
-    with col3:
-        # Hanc et al. (2021) - TERCEIRO
-        with st.container():
-            st.markdown("""
-            <div class="card-container">
-                <div class="card">
-                    <h2 style="color:#e0e5ff;">Hanc et al. (2021)</h2>
-                    <p style="color:#a0a7c0;">Conversão de borra de café em vermicomposto</p>
-                    <ul class="custom-list">
-                        <li>Análise temporal de pH, C/N, N-NH₄⁺, N-NO₃⁻, Fósforo e Potássio</li>
-                        <li>Diferentes camadas (idades) e tratamentos</li>
-                        <li>Teste de Kruskal-Wallis</li>
-                    </ul>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-            if st.button("Selecionar Hanc", key="btn_hanc",
-                        help="Clique para selecionar este artigo",
-                        use_container_width=True,
-                        type="primary"):
-                st.session_state['selected_article'] = 'hanc'
-                st.rerun()
+def stream_key(*parts):
+    """Converte rótulos (texto ou inteiros) em uma chave estável para SeedSequence.spawn_key"""
+    return tuple(
+        int(p) if isinstance(p, (int, np.integer)) else zlib.crc32(str(p).encode('utf-8'))
+        for p in parts
+    )
 
-    # Próximos dois artigos em uma nova linha
-    col4, col5, _ = st.columns(3) # A terceira coluna está vazia para manter o alinhamento
-                
-    with col4:
-        # Sharma (2019) - QUARTO
-        with st.container():
-            st.markdown("""
-            <div class="card-container">
-                <div class="card">
-                    <h2 style="color:#e0e5ff;">Sharma (2019)</h2>
-                    <p style="color:#a0a7c0;">Comparação de vermicompostos por espécie</p>
-                    <ul class="custom-list">
-                        <li>Três espécies de minhocas epigeicas</li>
-                        <li>Parâmetros: N, P, K, pH, C/N</li>
-                        <li>Comparação com solo original</li>
-                    </ul>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            if st.button("Selecionar Sharma", key="btn_sharma", 
-                         help="Clique para selecionar este artigo",
-                         use_container_width=True,
-                         type="primary"):
-                st.session_state['selected_article'] = 'sharma'
-                st.rerun()
+def spawn_generator(seed, *parts):
+    """Gerador independente e reprodutível identificado por (semente, rótulos)"""
+    seed_seq = np.random.SeedSequence(int(seed), spawn_key=stream_key(*parts))
+    return np.random.Generator(np.random.PCG64(seed_seq))
 
-    with col5:
-        # Jordão et al. (2007) - QUINTO
-        with st.container():
-            st.markdown("""
-            <div class="card-container">
-                <div class="card">
-                    <h2 style="color:#e0e5ff;">Jordão et al. (2007)</h2>
-                    <p style="color:#a0a7c0;">Remoção de metais pesados e cultivo de alface</p>
-                    <ul class="custom-list">
-                        <li>Comparação entre doses de vermicomposto</li>
-                        <li>Metais: Cobre, Níquel, Zinco</li>
-                        <li>Absorção por folhas e raízes</li>
-                    </ul>
-                </div>
-            </div>
-            """, unsafe_allow_html=True)
-            
-            if st.button("Selecionar Jordão", key="btn_jordao", 
-                         help="Clique para selecionar este artigo",
-                         use_container_width=True,
-                         type="primary"):
-                st.session_state['selected_article'] = 'jordao'
-                st.rerun()
+SAMPLING_METHODS = ['Pseudoaleatória', 'Sobol', 'Hipercubo Latino']
+
+def qmc_normals(rng, sample_shape, sampling='Pseudoaleatória'):
+    """Normais padrão por amostragem pseudoaleatória ou quasi-Monte Carlo (Sobol embaralhado / hipercubo latino).
+
+    O último eixo de sample_shape é a dimensão de cada ponto (ex.: as réplicas de um experimento)
+    e os eixos anteriores enumeram os pontos; os uniformes passam pela CDF inversa da normal.
+    """
+    sample_shape = tuple(sample_shape)
+    if sampling == 'Pseudoaleatória':
+        return rng.standard_normal(sample_shape)
+
+    dim = sample_shape[-1] if len(sample_shape) > 1 else 1
+    num_points = int(np.prod(sample_shape)) // dim
+    if sampling == 'Sobol':
+        engine = qmc.Sobol(dim, scramble=True, rng=rng)
+    elif sampling == 'Hipercubo Latino':
+        engine = qmc.LatinHypercube(dim, rng=rng)
+    else:
+        raise ValueError(f"Amostragem desconhecida: {sampling}")
+
+    with warnings.catch_warnings():
+        # Sobol avisa quando o número de pontos não é potência de 2 (o balanceamento é apenas parcial)
+        warnings.simplefilter('ignore', UserWarning)
+        u = engine.random(num_points)
+    u = np.clip(u, np.finfo(float).eps, 1.0 - np.finfo(float).eps)
+    return norm.ppf(u).reshape(sample_shape)
+
+def cell_noise(spec, sample_shape, seed, *extra, sampling='Pseudoaleatória'):
+    """Ruído normal padrão com um fluxo próprio por célula (estudo, parâmetro, grupo[, camada]).
+
+    Cada célula depende apenas da semente e dos seus rótulos, então o resultado é idêntico
+    em execução serial, em threads ou em processos, e não muda com a ordem das células.
+    """
+    sample_shape = tuple(sample_shape)
+    noise = np.empty(spec.means.shape + sample_shape)
+    for index in np.ndindex(*spec.means.shape):
+        labels = [spec.coords[dim][i] for dim, i in zip(spec.dims, index)]
+        rng = spawn_generator(seed, spec.key, *labels, *extra)
+        noise[index] = qmc_normals(rng, sample_shape, sampling)
+    return noise
+
+def summary_table_to_arrays(table, dims, order=None, dispersion='sd', sample_size=None):
+    """Converte a tabela aninhada de média/desvio padrão de um estudo em arrays (médias, desvios, rótulos).
+
+    Com dispersion='sem' a tabela publica o erro padrão da média, convertido para desvio padrão
+    (sd = sem · √n com n = sample_size), de modo que os desvios devolvidos são sempre desvios padrão.
+    """
+    if dispersion not in ('sd', 'sem'):
+        raise ValueError(f"dispersão desconhecida: {dispersion!r} (use 'sd' ou 'sem')")
+    if dispersion == 'sem' and sample_size is None:
+        raise ValueError("tabelas com erro padrão (sem) exigem sample_size")
+    coords = [[] for _ in dims]
+
+    # Primeira passada: coletar os rótulos de cada nível na ordem em que aparecem
+    def collect(node, level):
+        for key, child in node.items():
+            if key not in coords[level]:
+                coords[level].append(key)
+            if level + 1 < len(dims):
+                collect(child, level + 1)
+    collect(table, 0)
+
+    shape = tuple(len(c) for c in coords)
+    means = np.full(shape, np.nan)
+    sds = np.full(shape, np.nan)
+
+    # Segunda passada: preencher os arrays (folhas podem ser tuplas ou dicionários)
+    def fill(node, level, index):
+        for key, child in node.items():
+            idx = index + (coords[level].index(key),)
+            if level + 1 < len(dims):
+                fill(child, level + 1, idx)
+                continue
+            if isinstance(child, dict):
+                mean, stdev = child['mean'], child['stdev']
+            else:
+                mean, stdev = child
+            means[idx] = mean
+            sds[idx] = np.nan if stdev is None else stdev
+    fill(table, 0, ())
+    if dispersion == 'sem':
+        sds = sds * np.sqrt(sample_size)
+
+    dims = list(dims)
+    if order is not None:
+        axes = [dims.index(d) for d in order]
+        means = means.transpose(axes)
+        sds = sds.transpose(axes)
+        coords = [coords[a] for a in axes]
+        dims = list(order)
+
+    return means, sds, dict(zip(dims, coords))
+
+def fill_missing_stdev(means, sds, relative=0.01, fallback=0.01):
+    """Estima um desvio padrão (fração da média) onde o artigo não o informa"""
+    estimated = np.where(means != 0, np.abs(means) * relative, fallback)
+    return np.where(np.isnan(sds), estimated, sds)
+
+def parameter_bounds(params, ndim, ph_params=(), nonneg_params=()):
+    """Limites físicos por parâmetro (pH entre 0 e 14, concentrações não-negativas) prontos para broadcast"""
+    lower = np.full(len(params), -np.inf)
+    upper = np.full(len(params), np.inf)
+    for i, param in enumerate(params):
+        if param in ph_params:
+            lower[i], upper[i] = 0.0, 14.0
+        elif param in nonneg_params:
+            lower[i] = 0.0
+    shape = (len(params),) + (1,) * (ndim - 1)
+    return lower.reshape(shape), upper.reshape(shape)
+
+def lognormal_parameters(means, sds):
+    """Parâmetros (mu, sigma) da LogNormal com a mesma média e desvio padrão informados"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        log_sigma = np.sqrt(np.log1p((np.maximum(sds, 0) / means) ** 2))
+        log_mu = np.log(means) - 0.5 * log_sigma ** 2
+    return log_mu, log_sigma
 
 # ===================================================================
-# MÓDULO DERMENDZHIEVA ET AL. (2021) - ANÁLISE TEMPORAL
+# FAMÍLIA DE DISTRIBUIÇÕES LIMITADAS (AMOSTRAGEM POR CDF INVERSA)
 # ===================================================================
-def run_dermendzhieva_analysis():
-    """Módulo de análise temporal corrigido"""
-    
-    # Mapeamento de parâmetros
-    PARAM_MAPPING = {
-        "TKN (g/kg)": "Nitrogênio Total (N)",
-        "Total P (g/kg)": "Fósforo Total (P)",
-        "TK (g/kg)": "Potássio Total (K)",
-        "pH (H₂O)": "pH",
-        "C/N ratio": "Relação C/N"
-    }
+# 'Normal' e 'LogNormal' mantêm o comportamento original (sorteio + corte nos limites);
+# as demais respeitam os limites físicos por truncamento, sem acumular massa no limite.
+DISTRIBUTION_FAMILIES = ['Normal', 'LogNormal', 'Normal Truncada', 'LogNormal Truncada', 'Gama', 'Beta Escalonada']
 
-    # Mapeamento de dias
-    DAY_MAPPING = {
-        'Day 1': 1,
-        'Day 30': 30,
-        'Day 60': 60,
-        'Day 90': 90, 
-        'Day 120': 120
-    }
+def truncnorm_moments(mu, sigma, lower, upper):
+    """Média e desvio padrão da normal N(mu, sigma) truncada em [lower, upper]"""
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        alpha = (lower - mu) / sigma
+        beta_ = (upper - mu) / sigma
+        z = np.maximum(norm.cdf(beta_) - norm.cdf(alpha), 1e-300)
+        pdf_a, pdf_b = norm.pdf(alpha), norm.pdf(beta_)
+        a_pdf_a = np.where(np.isfinite(alpha), alpha * pdf_a, 0.0)
+        b_pdf_b = np.where(np.isfinite(beta_), beta_ * pdf_b, 0.0)
+        shift = (pdf_a - pdf_b) / z
+        mean = mu + sigma * shift
+        var = sigma ** 2 * (1.0 + (a_pdf_a - b_pdf_b) / z - shift ** 2)
+    return mean, np.sqrt(np.maximum(var, 0.0))
 
-    # Função para carregar dados de exemplo
-    @st.cache_data
-    def load_sample_data_with_stdev(distribution_type='Normal'):
-        sample_param_data = {
-            'TKN (g/kg)': {
-                'Day 1': {'mean': 20.8, 'stdev': 0.5},
-                'Day 30': {'mean': 21.5, 'stdev': 0.6},
-                'Day 60': {'mean': 22.2, 'stdev': 0.7},
-                'Day 90': {'mean': 23.0, 'stdev': 0.8},
-                'Day 120': {'mean': 24.5, 'stdev': 0.9}
-            },
-            'Total P (g/kg)': {
-                'Day 1': {'mean': 12.1, 'stdev': 0.3},
-                'Day 30': {'mean': 12.8, 'stdev': 0.4},
-                'Day 60': {'mean': 13.5, 'stdev': 0.4},
-                'Day 90': {'mean': 14.2, 'stdev': 0.5},
-                'Day 120': {'mean': 15.0, 'stdev': 0.6}
-            },
-            'TK (g/kg)': {
-                'Day 1': {'mean': 1.28, 'stdev': 0.02},
-                'Day 30': {'mean': 1.29, 'stdev': 0.02},
-                'Day 60': {'mean': 1.30, 'stdev': 0.02},
-                'Day 90': {'mean': 1.31, 'stdev': 0.02},
-                'Day 120': {'mean': 1.32, 'stdev': 0.02}
-            },
-            'pH (H₂O)': {
-                'Day 1': {'mean': 7.04, 'stdev': 0.05},
-                'Day 30': {'mean': 7.00, 'stdev': 0.05},
-                'Day 60': {'mean': 6.95, 'stdev': 0.05},
-                'Day 90': {'mean': 6.90, 'stdev': 0.05},
-                'Day 120': {'mean': 6.85, 'stdev': 0.05}
-            },
-            'C/N ratio': {
-                'Day 1': {'mean': 11.2, 'stdev': 0.2},
-                'Day 30': {'mean': 10.9, 'stdev': 0.25},
-                'Day 60': {'mean': 10.5, 'stdev': 0.3},
-                'Day 90': {'mean': 10.0, 'stdev': 0.35},
-                'Day 120': {'mean': 9.5, 'stdev': 0.4}
-            }
-        }
+def trunclognorm_moments(log_mu, log_sigma, lower, upper):
+    """Média e desvio padrão da LogNormal(log_mu, log_sigma) truncada em [lower, upper]"""
+    with np.errstate(divide='ignore', invalid='ignore', over='ignore'):
+        alpha = (np.log(np.maximum(lower, 0.0)) - log_mu) / log_sigma
+        beta_ = (np.log(upper) - log_mu) / log_sigma
+        z = np.maximum(norm.cdf(beta_) - norm.cdf(alpha), 1e-300)
 
-        num_replications = 3
-        days = ['Day 1', 'Day 30', 'Day 60', 'Day 90', 'Day 120']
-        all_replicated_data = []
-
-        for param_name, daily_stats in sample_param_data.items():
-            for _ in range(num_replications):
-                row_data = {'Parameter': param_name, 'Substrate': 'VC-M'}
-                for day in days:
-                    stats = daily_stats.get(day)
-                    if stats:
-                        if distribution_type == 'Normal':
-                            simulated_value = np.random.normal(
-                                loc=stats['mean'], 
-                                scale=stats['stdev']
-                            )
-                        elif distribution_type == 'LogNormal':
-                            mu = stats['mean']
-                            sigma = stats['stdev']
-                            if sigma <= 0:
-                                log_sigma = 0
-                                log_mu = np.log(mu)
-                            else:
-                                log_sigma = np.sqrt(np.log(1 + (sigma/mu)**2))
-                                log_mu = np.log(mu) - 0.5 * log_sigma**2
-                            
-                            simulated_value = np.random.lognormal(
-                                mean=log_mu,
-                                sigma=log_sigma
-                            )
-                        else:
-                            simulated_value = np.random.normal(
-                                loc=stats['mean'], 
-                                scale=stats['stdev']
-                            )
-                            
-                        if param_name == 'pH (H₂O)':
-                            simulated_value = np.clip(simulated_value, 0.0, 14.0)
-                        elif 'g/kg' in param_name or 'ratio' in param_name:
-                            simulated_value = max(0.0, simulated_value)
-                        
-                        row_data[day] = simulated_value
-                    else:
-                        row_data[day] = np.nan
-                all_replicated_data.append(row_data)
+        def raw_moment(k):
+            partial_mass = norm.cdf(beta_ - k * log_sigma) - norm.cdf(alpha - k * log_sigma)
+            return np.exp(k * log_mu + 0.5 * (k * log_sigma) ** 2) * partial_mass / z
 
-        return pd.DataFrame(all_replicated_data)
-    
-    # Function to plot temporal evolution
-    def plot_parameter_evolution(ax, data, days, param_name):
-        # Convert days to numeric for ordering
-        numeric_days = [DAY_MAPPING[d] for d in days]
-        
-        # Modern color palette
-        colors = ['#6f42c1', '#00c1e0', '#00d4b1', '#ffd166', '#ff6b6b']
-        
-        for i, (day, num_day) in enumerate(zip(days, numeric_days)):
-            group_data = data[i]
-            
-            # Plot individual points with depth effect
-            ax.scatter(
-                [num_day] * len(group_data), 
-                group_data, 
-                alpha=0.85, 
-                s=100,
-                color=colors[i % len(colors)],
-                edgecolors='white',
-                linewidth=1.2,
-                zorder=3,
-                label=f"{day.replace('Day ', 'Dia ')}",
-                marker='o'
-            )
-        
-        # Calculate and plot medians with premium style
-        medians = [np.median(group) for group in data]
-        ax.plot(
-            numeric_days, 
-            medians, 
-            'D-', 
-            markersize=10,
-            linewidth=3,
-            color='#ffffff',
-            markerfacecolor='#6f42c1',
-            markeredgecolor='white',
-            markeredgewidth=1.5,
-            zorder=5,
-            alpha=0.95
-        )
-        
-        # Configure X-axis with numeric days
-        ax.set_xticks(numeric_days)
-        ax.set_xticklabels([d.replace('Day ', '') for d in days], fontsize=11)
-        ax.xaxis.set_major_locator(MaxNLocator(integer=True))
-        
-        # Improve formatting
-        ax.set_xlabel("Dias de Vermicompostagem", fontsize=12, fontweight='bold', labelpad=15)
-        ax.set_ylabel(PARAM_MAPPING.get(param_name, param_name), fontsize=12, fontweight='bold', labelpad=15)
-        ax.set_title(f"Evolução do {PARAM_MAPPING.get(param_name, param_name)}", 
-                             fontsize=14, fontweight='bold', pad=20)
-        
-        # Grid and style
-        ax.grid(True, alpha=0.2, linestyle='--', color='#a0a7c0', zorder=1)
-        # Adjustment: Change legend location to 'lower right' to avoid overlapping
-        ax.legend(loc='lower right', fontsize=10, framealpha=0.25) 
-        
-        # Remove borders
-        for spine in ax.spines.values():
-            spine.set_visible(False)
-        
-        # Gradient background
-        ax.set_facecolor('#0c0f1d')
-        
-        return ax
+        mean = raw_moment(1)
+        var = raw_moment(2) - mean ** 2
+    return mean, np.sqrt(np.maximum(var, 0.0))
+
+def match_truncated_moments(means, sds, lower, upper, log_scale=False, iterations=60):
+    """Ajusta (mu, sigma) da distribuição base para que a versão truncada tenha a média e o desvio informados"""
+    if log_scale:
+        mu, sigma = lognormal_parameters(means, sds)
+        moments = trunclognorm_moments
+    else:
+        mu, sigma = means.astype(float), sds.astype(float)
+        moments = truncnorm_moments
+    sigma = np.maximum(sigma, 1e-12)
+
+    for _ in range(iterations):
+        m, s = moments(mu, sigma, lower, upper)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            if log_scale:
+                mu = mu + np.log(means / m)
+                sigma = sigma * (sds / means) / (s / m)
+            else:
+                mu = mu + (means - m)
+                sigma = sigma * sds / s
+        mu = np.where(np.isfinite(mu), mu, means)
+        sigma = np.where(np.isfinite(sigma) & (sigma > 0), sigma, np.maximum(sds, 1e-12))
+    return mu, sigma
+
+def bounded_ppf(distribution_type, u, means, sds, lower, upper):
+    """Quantis (CDF inversa) da família escolhida, truncada em [lower, upper], para uniformes u"""
+    def truncated_uniform(cdf_lower, cdf_upper):
+        return cdf_lower + u * (cdf_upper - cdf_lower)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if distribution_type == 'Normal Truncada':
+            mu, sigma = match_truncated_moments(means, sds, lower, upper)
+            u_t = truncated_uniform(norm.cdf((lower - mu) / sigma), norm.cdf((upper - mu) / sigma))
+            return mu + sigma * norm.ppf(u_t)
+
+        if distribution_type == 'LogNormal Truncada':
+            mu, sigma = match_truncated_moments(means, sds, lower, upper, log_scale=True)
+            u_t = truncated_uniform(norm.cdf((np.log(np.maximum(lower, 0.0)) - mu) / sigma),
+                                    norm.cdf((np.log(upper) - mu) / sigma))
+            return np.exp(mu + sigma * norm.ppf(u_t))
+
+        if distribution_type == 'Gama':
+            shape = (means / sds) ** 2
+            scale = sds ** 2 / means
+            u_t = truncated_uniform(gamma.cdf(lower, shape, scale=scale), gamma.cdf(upper, shape, scale=scale))
+            return gamma.ppf(u_t, shape, scale=scale)
+
+        if distribution_type == 'Beta Escalonada':
+            # Só definida com os dois limites finitos (ex.: pH); demais parâmetros usam a normal truncada
+            finite = np.isfinite(lower) & np.isfinite(upper)
+            width = np.where(finite, upper - lower, 1.0)
+            m = (means - lower) / width
+            v = (sds / width) ** 2
+            common = m * (1.0 - m) / v - 1.0
+            a, b = m * common, (1.0 - m) * common
+            valid = finite & (a > 0) & (b > 0)
+            scaled = lower + width * beta.ppf(u, np.where(valid, a, 1.0), np.where(valid, b, 1.0))
+            fallback = bounded_ppf('Normal Truncada', u, means, sds, lower, upper)
+            return np.where(valid, scaled, fallback)
+
+    raise ValueError(f"Distribuição desconhecida: {distribution_type}")
+
+def simulate_replicates(means, sds, num_replications, distribution_type='Normal',
+                        lower=None, upper=None, noise=None, rng=None):
+    """Sorteia todas as réplicas de uma vez: retorna array com shape means.shape + (num_replications,)
+
+    noise (normal padrão, mesmo shape da saída) permite usar fluxos aleatórios já preparados.
+    """
+    if noise is None:
+        rng = np.random.default_rng() if rng is None else rng
+        noise = rng.standard_normal(means.shape + (num_replications,))
+    loc = means[..., np.newaxis]
+    scale = sds[..., np.newaxis]
+
+    if distribution_type not in ('Normal', 'LogNormal'):
+        # Famílias limitadas: uniforme via Φ(ruído) e CDF inversa truncada nos limites físicos
+        lo = np.broadcast_to(-np.inf if lower is None else np.asarray(lower, dtype=float), means.shape)
+        hi = np.broadcast_to(np.inf if upper is None else np.asarray(upper, dtype=float), means.shape)
+        u = norm.cdf(noise)
+        values = bounded_ppf(distribution_type, u, loc, scale, lo[..., np.newaxis], hi[..., np.newaxis])
+        # Desvio padrão nulo: todas as réplicas iguais à média
+        return np.where(scale > 0, values, loc)
+
+    if distribution_type == 'LogNormal':
+        log_mu, log_sigma = lognormal_parameters(loc, scale)
+        values = np.exp(log_mu + log_sigma * noise)
+    else:
+        values = loc + scale * noise
+
+    # Regras de limites físicos aplicadas como operação de array
+    if lower is not None or upper is not None:
+        lo = -np.inf if lower is None else np.asarray(lower)[..., np.newaxis]
+        hi = np.inf if upper is None else np.asarray(upper)[..., np.newaxis]
+        values = np.clip(values, lo, hi)
+
+    return values
+
+def prepare_study(key, table, dims, order=None, ph_params=(), nonneg_params=(), missing_stdev=None,
+                  dispersion='sd', sample_size=None):
+    """Descrição de um estudo pronta para simulação: médias, desvios e limites físicos com rótulos.
+
+    O primeiro eixo é sempre o parâmetro e o último é o eixo de grupos comparado pelo teste.
+    dispersion/sample_size indicam se a tabela traz desvio padrão ou erro padrão (ver summary_table_to_arrays).
+    """
+    means, sds, coords = summary_table_to_arrays(table, dims, order, dispersion, sample_size)
+    if missing_stdev is not None:
+        sds = fill_missing_stdev(means, sds, relative=missing_stdev)
+
+    out_dims = list(coords.keys())
+    lower, upper = parameter_bounds(coords[out_dims[0]], means.ndim, ph_params, nonneg_params)
+    return StudySpec(key, means, sds, lower, upper, out_dims, coords)
+
+def correlation_matrix(params, pairs):
+    """Matriz de correlação entre parâmetros a partir de pares {(a, b): r}"""
+    matrix = np.eye(len(params))
+    for (a, b), r in pairs.items():
+        if a in params and b in params:
+            i, j = params.index(a), params.index(b)
+            matrix[i, j] = matrix[j, i] = r
+    return matrix
+
+def nearest_correlation(matrix):
+    """Projeta uma matriz editada pelo usuário na matriz de correlação válida (simétrica, PSD) mais próxima"""
+    matrix = np.asarray(matrix, dtype=float)
+    matrix = np.clip((matrix + matrix.T) / 2.0, -1.0, 1.0)
+    np.fill_diagonal(matrix, 1.0)
+    eigvals, eigvecs = np.linalg.eigh(matrix)
+    if eigvals.min() > 1e-8:
+        return matrix
+    fixed = eigvecs @ np.diag(np.maximum(eigvals, 1e-6)) @ eigvecs.T
+    scale = np.sqrt(np.diag(fixed))
+    return fixed / np.outer(scale, scale)
+
+def correlate_noise(noise, correlation):
+    """Correlaciona o ruído entre parâmetros (eixo 0) com um único produto matricial pelo fator de Cholesky.
+
+    Funciona como cópula gaussiana: vale para qualquer família de distribuição das margens.
+    """
+    chol = np.linalg.cholesky(nearest_correlation(correlation))
+    flat = noise.reshape(noise.shape[0], -1)
+    return (chol @ flat).reshape(noise.shape)
+
+def derive_ratio(block, target, numerator, denominator):
+    """Substitui um parâmetro pela razão de dois parâmetros simulados (ex.: C/N = C / N)"""
+    params = block.coords[block.dims[0]]
+    values = block.values.copy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        values[params.index(target)] = values[params.index(numerator)] / values[params.index(denominator)]
+    return block._replace(values=values)
+
+def simulate_spec(spec, num_replications, distribution_type='Normal', seed=DEFAULT_SEED, correlation=None,
+                  sampling='Pseudoaleatória'):
+    """Simula o bloco completo (parâmetro × grupo × [camada] × réplica) de um estudo.
+
+    correlation (parâmetros × parâmetros) ativa o modo multivariado: cada réplica é um vetor correlacionado.
+    """
+    noise = cell_noise(spec, (num_replications,), seed, 'data', sampling=sampling)
+    if correlation is not None:
+        noise = correlate_noise(noise, correlation)
+    values = simulate_replicates(spec.means, spec.sds, num_replications, distribution_type,
+                                 spec.lower, spec.upper, noise=noise)
+    coords = dict(spec.coords)
+    coords['Replicate'] = list(range(1, num_replications + 1))
+    return SimulatedBlock(values, list(spec.dims) + ['Replicate'], coords)
+
+def block_to_long_frame(block, value_name='Value'):
+    """Converte o bloco simulado para o formato longo (uma linha por réplica) usado nas tabelas"""
+    shape = block.values.shape
+    frame = {}
+    for axis, dim in enumerate(block.dims[:-1]):
+        labels = np.asarray(block.coords[dim], dtype=object)
+        repeats = int(np.prod(shape[axis + 1:]))
+        tiles = int(np.prod(shape[:axis]))
+        frame[dim] = np.tile(np.repeat(labels, repeats), tiles)
+    frame[value_name] = block.values.ravel()
+    return pd.DataFrame(frame)
+
+def block_to_wide_frame(block, column_dim):
+    """Converte o bloco para o formato largo: uma linha por (parâmetro, réplica) e uma coluna por rótulo de column_dim"""
+    axis = block.dims.index(column_dim)
+    values = np.moveaxis(block.values, axis, -1)
+    row_dims = [d for d in block.dims if d != column_dim]
+    row_block = SimulatedBlock(np.zeros(values.shape[:-1]), row_dims, block.coords)
+    frame = block_to_long_frame(row_block).drop(columns='Value')
+    wide = pd.DataFrame(values.reshape(-1, values.shape[-1]), columns=block.coords[column_dim])
+    return pd.concat([frame, wide], axis=1)
+
+def seed_input(key_prefix):
+    """Campo da semente aleatória: a mesma semente reproduz exatamente as mesmas amostras"""
+    return int(st.number_input(
+        "Semente aleatória (reprodutibilidade):",
+        min_value=0,
+        max_value=2**32 - 1,
+        value=DEFAULT_SEED,
+        step=1,
+        key=f"{key_prefix}_seed"
+    ))
+
+def replications_input(key_prefix, published):
+    """Réplicas simuladas por grupo: o n do artigo por padrão; mais réplicas estabilizam os testes e gráficos"""
+    options = sorted({published, *REPLICATION_CHOICES})
+    return st.selectbox(
+        "Réplicas simuladas por grupo:",
+        options,
+        index=options.index(published),
+        key=f"{key_prefix}_replications",
+        help=f"O artigo informa n = {published}. Acima de {DENSE_POINTS_THRESHOLD} réplicas os pontos de cada grupo "
+             f"são substituídos por violinos (KDE binada)."
+    )
+
+def distribution_input(key_prefix, default='Normal'):
+    """Seleção da família de distribuição usada para gerar as réplicas"""
+    return st.selectbox(
+        "Distribuição para geração de amostras:",
+        DISTRIBUTION_FAMILIES,
+        index=DISTRIBUTION_FAMILIES.index(default),
+        key=f"{key_prefix}_distribution"
+    )
+
+def sampling_input(key_prefix):
+    """Seleção do gerador das réplicas: pseudoaleatório ou quasi-Monte Carlo"""
+    return st.selectbox(
+        "Amostragem:",
+        SAMPLING_METHODS,
+        index=0,
+        key=f"{key_prefix}_sampling",
+        help="Sobol e Hipercubo Latino cobrem o espaço de forma mais uniforme: curvas de poder estáveis com menos simulações."
+    )
+
+def correlation_input(key_prefix, params, label_map, default_pairs):
+    """Modo multivariado opcional: retorna a matriz de correlação editada (ou None se desativado)"""
+    enabled = st.checkbox("Modo multivariado (parâmetros correlacionados)", value=False, key=f"{key_prefix}_multivariate")
+    if not enabled:
+        return None
+    labels = [label_map.get(p, p) for p in params]
+    default = pd.DataFrame(correlation_matrix(list(params), default_pairs), index=labels, columns=labels)
+    st.caption("Correlações entre parâmetros dentro de cada réplica (valores editáveis; a matriz é ajustada para ser válida).")
+    edited = st.data_editor(default, key=f"{key_prefix}_correlation", use_container_width=True)
+    return nearest_correlation(edited.to_numpy(dtype=float))
+
+def render_export_button(df, file_prefix, seed, distribution_type='Normal', sampling='Pseudoaleatória'):
+    """Botão de exportação das amostras simuladas, registrando semente, distribuição e amostragem usadas"""
+    export_df = df.assign(Seed=seed, Distribution=distribution_type, Sampling=sampling)
+    st.download_button(
+        "⬇️ Exportar amostras simuladas (CSV)",
+        data=export_df.to_csv(index=False).encode('utf-8'),
+        file_name=f"{file_prefix}_seed{seed}.csv",
+        mime="text/csv",
+        key=f"{file_prefix}_export"
+    )
+
+# ===================================================================
+# KRUSKAL-WALLIS EM LOTE
+# ===================================================================
+def stack_groups(data_by_group_list):
+    """Empilha listas de grupos (uma por parâmetro) em um array (lote × grupos × réplicas), completando com NaN"""
+    num_groups = max(len(groups) for groups in data_by_group_list)
+    max_n = max((len(g) for groups in data_by_group_list for g in groups), default=0)
+    stacked = np.full((len(data_by_group_list), num_groups, max_n), np.nan)
+    for b, groups in enumerate(data_by_group_list):
+        for g, values in enumerate(groups):
+            stacked[b, g, :len(values)] = values
+    return stacked
+
+def tie_runs(sorted_vals):
+    """Início e fim (posições) da sequência de valores empatados de cada elemento de um array ordenado"""
+    n_total = sorted_vals.shape[-1]
+    positions = np.broadcast_to(np.arange(n_total), sorted_vals.shape)
+    new_run = np.ones(sorted_vals.shape, dtype=bool)
+    new_run[..., 1:] = sorted_vals[..., 1:] != sorted_vals[..., :-1]
+    run_end = np.ones(sorted_vals.shape, dtype=bool)
+    run_end[..., :-1] = new_run[..., 1:]
+    start = np.maximum.accumulate(np.where(new_run, positions, 0), axis=-1)
+    end = np.flip(np.minimum.accumulate(
+        np.flip(np.where(run_end, positions, n_total - 1), axis=-1), axis=-1), axis=-1)
+    return start, end
+
+def tie_sum(values, func):
+    """Soma de func(t) sobre os grupos de empates (tamanho t) ao longo do último eixo, ignorando NaN"""
+    sorted_vals = np.sort(np.asarray(values, dtype=float), axis=-1)
+    start, end = tie_runs(sorted_vals)
+    t = end - start + 1.0
+    return np.sum(np.where(np.isnan(sorted_vals), 0.0, func(t) / t), axis=-1)
+
+def ranked_runs(values):
+    """Ordena uma única vez ao longo do último eixo (NaN ignorado).
+
+    Retorna (postos médios, menor posto da sequência de empates de cada elemento,
+    termo de empates sum(t³ - t), número de observações válidas).
+    """
+    values = np.asarray(values, dtype=float)
+    order = np.argsort(values, axis=-1, kind='stable')
+    sorted_vals = np.take_along_axis(values, order, axis=-1)
+    valid = ~np.isnan(sorted_vals)
+
+    # Início e fim de cada sequência de valores empatados
+    start, end = tie_runs(sorted_vals)
+
+    sorted_ranks = np.where(valid, (start + end) / 2.0 + 1.0, np.nan)
+    ties = np.where(valid, (end - start + 1.0) ** 2 - 1.0, 0.0)
+
+    ranks = np.empty_like(sorted_ranks)
+    np.put_along_axis(ranks, order, sorted_ranks, axis=-1)
+    low_ranks = np.empty_like(sorted_ranks)
+    np.put_along_axis(low_ranks, order, np.where(valid, start + 1.0, np.nan), axis=-1)
+    return ranks, low_ranks, ties.sum(axis=-1), valid.sum(axis=-1)
+
+def average_ranks(values):
+    """Postos médios (empates recebem a média dos postos) ao longo do último eixo, ignorando NaN.
+
+    Retorna (postos, termo de empates sum(t³ - t), número de observações válidas).
+    """
+    ranks, _, tie_term, n_valid = ranked_runs(values)
+    return ranks, tie_term, n_valid
+
+def rank_groups(samples):
+    """Ranqueia os dados agrupados de cada lote (lote × grupos × réplicas) de uma só vez"""
+    samples = np.asarray(samples, dtype=float)
+    shape = samples.shape
+    pooled = samples.reshape(shape[:-2] + (-1,))
+    ranks, tie_term, n_total = average_ranks(pooled)
+    return ranks.reshape(shape), tie_term, n_total
+
+# Postos dos dados agrupados de cada linha (lote × grupos × réplicas), calculados uma única vez e repassados
+# a todos os testes por postos da linha: postos médios, menor posto da sequência de empates, termo de empates e N
+GroupRanks = namedtuple('GroupRanks', ['ranks', 'low_ranks', 'tie_term', 'n_total'])
+
+def rank_bundle(samples):
+    """Ordena os dados agrupados de cada linha uma vez e devolve os postos no formato lote × grupos × réplicas"""
+    samples = np.asarray(samples, dtype=float)
+    shape = samples.shape
+    ranks, low_ranks, tie_term, n_total = ranked_runs(samples.reshape(shape[:-2] + (-1,)))
+    return GroupRanks(ranks.reshape(shape), low_ranks.reshape(shape), tie_term, n_total)
+
+def kruskal_batched(samples):
+    """Teste de Kruskal-Wallis vetorizado: samples (lote × grupos × réplicas) -> vetores H e p.
+
+    Réplicas ausentes podem ser marcadas com NaN; grupos vazios são ignorados.
+    Equivale a scipy.stats.kruskal aplicado a cada linha do lote (com correção de empates).
+    """
+    return kruskal_from_ranks(*rank_groups(samples))
+
+def kruskal_from_ranks(ranks, tie_term, n_total):
+    """H e p do Kruskal-Wallis a partir de postos já calculados (lote × grupos × réplicas)"""
+    counts = np.sum(~np.isnan(ranks), axis=-1)
+    rank_sums = np.nansum(ranks, axis=-1)
+    num_groups = np.sum(counts > 0, axis=-1)
+
+    n = n_total.astype(float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        h_stat = (12.0 / (n * (n + 1.0)) * np.sum(np.where(counts > 0, rank_sums ** 2 / counts, 0.0), axis=-1)
+                  - 3.0 * (n + 1.0))
+        h_stat = h_stat / (1.0 - tie_term / (n ** 3 - n))
+    h_stat = np.where(num_groups >= 2, h_stat, np.nan)
+    p_val = chi2.sf(h_stat, np.maximum(num_groups - 1, 1))
+    return h_stat, p_val
+
+PERMUTATION_CHUNK_VALUES = 2 ** 22  # chaves de embaralhamento por lote (linhas × permutações × observações)
+# Acima deste N total o qui-quadrado já é preciso e substitui a permutação em kruskal_exact_pvalues
+PERMUTATION_MAX_OBSERVATIONS = 200
+
+def kruskal_permutation(samples, labels=None, alpha=0.05, max_permutations=20000, batch_size=2000,
+                        confidence=0.99, seed=DEFAULT_SEED):
+    """p-valor de permutação do Kruskal-Wallis para cada linha do lote (lote × grupos × réplicas).
+
+    Os postos não mudam ao permutar os rótulos de grupo, então cada permutação só reordena os postos
+    e recalcula sum(R²/n). Uma linha para de ser permutada assim que o intervalo de confiança do p-valor
+    fica inteiramente acima ou abaixo de alpha. Retorna (p-valores, permutações usadas por linha).
+    """
+    ranks, _, n_total = rank_groups(samples)
+    num_rows = ranks.shape[0]
+    labels = list(range(num_rows)) if labels is None else list(labels)
+    counts = np.sum(~np.isnan(ranks), axis=-1)
+    inv_counts = np.where(counts > 0, 1.0 / np.maximum(counts, 1), 0.0)
+    observed = np.sum(np.nansum(ranks, axis=-1) ** 2 * inv_counts, axis=-1)
+
+    # Postos válidos no início de cada linha; cada grupo ocupa uma faixa fixa de posições
+    pooled = ranks.reshape(num_rows, -1)
+    pooled = np.nan_to_num(np.take_along_axis(pooled, np.argsort(np.isnan(pooled), axis=-1, kind='stable'), -1))
+    ends = np.cumsum(counts, axis=-1)
+    starts = ends - counts
+    invalid = np.arange(pooled.shape[-1]) >= n_total[:, np.newaxis]
+
+    exceed = np.zeros(num_rows)
+    done = np.zeros(num_rows)
+    active = np.sum(counts > 0, axis=-1) >= 2
+    while active.any() and done[active].max() < max_permutations:
+        rows = np.flatnonzero(active)
+        k = int(min(batch_size, max_permutations - done[rows].max(),
+                    max(1, PERMUTATION_CHUNK_VALUES // (len(rows) * pooled.shape[-1]))))
+        keys = np.stack([spawn_generator(seed, 'permutation', labels[r], int(done[r])).random((k, pooled.shape[-1]))
+                         for r in rows])
+        keys[np.broadcast_to(invalid[rows, np.newaxis, :], keys.shape)] = 2.0
+        shuffled = np.take_along_axis(pooled[rows, np.newaxis, :], np.argsort(keys, axis=-1), axis=-1)
+
+        cumulative = np.concatenate([np.zeros(shuffled.shape[:-1] + (1,)), np.cumsum(shuffled, axis=-1)], axis=-1)
+        sums = (np.take_along_axis(cumulative, np.broadcast_to(ends[rows, np.newaxis, :], (len(rows), k, ends.shape[-1])), -1)
+                - np.take_along_axis(cumulative, np.broadcast_to(starts[rows, np.newaxis, :], (len(rows), k, ends.shape[-1])), -1))
+        stat = np.sum(sums ** 2 * inv_counts[rows, np.newaxis, :], axis=-1)
+        tolerance = 1e-9 * np.abs(observed[rows, np.newaxis])
+        exceed[rows] += np.sum(stat >= observed[rows, np.newaxis] - tolerance, axis=-1)
+        done[rows] += k
+
+        ci_low, ci_high = wilson_interval(exceed[rows], done[rows], confidence)
+        active[rows] = ~((ci_low > alpha) | (ci_high < alpha))
+
+    with np.errstate(invalid='ignore'):
+        p_val = np.where(done > 0, (exceed + 1.0) / (done + 1.0), np.nan)
+    return p_val, done.astype(int)
+
+# ===================================================================
+# KRUSKAL-WALLIS INCREMENTAL (EDIÇÃO DE RÉPLICAS)
+# ===================================================================
+class OnlineKruskal:
+    """Kruskal-Wallis de um parâmetro que se atualiza a cada réplica inserida, removida ou corrigida.
+
+    Mantém os valores ordenados (todos e por grupo), a soma de postos de cada grupo e o termo de
+    empates sum(t³ - t). Cada operação localiza o valor por bisseção e ajusta as somas de postos
+    sem reordenar nem reranquear os dados.
+    """
+
+    def __init__(self, groups):
+        groups = [np.asarray(g, dtype=float) for g in groups]
+        groups = [g[~np.isnan(g)] for g in groups]
+        self.by_group = [sorted(g.tolist()) for g in groups]
+        self.values = sorted(v for g in self.by_group for v in g)
+        pooled = np.concatenate(groups) if groups else np.empty(0)
+        ranks, tie_term, _ = average_ranks(pooled)
+        bounds = np.cumsum([0] + [len(g) for g in groups])
+        self.rank_sums = np.array([ranks[a:b].sum() for a, b in zip(bounds[:-1], bounds[1:])])
+        self.tie_term = float(tie_term)
+
+    def _shift_ranks(self, value, sign):
+        """Valores maiores mudam de posto em 1 e empatados em 1/2 quando value entra (+1) ou sai (-1)"""
+        for g, group in enumerate(self.by_group):
+            greater = len(group) - bisect_right(group, value)
+            equal = bisect_right(group, value) - bisect_left(group, value)
+            self.rank_sums[g] += sign * (greater + 0.5 * equal)
+
+    def insert(self, group, value):
+        value = float(value)
+        below = bisect_left(self.values, value)
+        ties = bisect_right(self.values, value) - below
+        self._shift_ranks(value, +1)
+        self.rank_sums[group] += below + (ties + 2) / 2.0
+        self.tie_term += (ties + 1) ** 3 - (ties + 1) - (ties ** 3 - ties)
+        insort(self.values, value)
+        insort(self.by_group[group], value)
+
+    def delete(self, group, value):
+        value = float(value)
+        group_values = self.by_group[group]
+        position = bisect_left(group_values, value)
+        if position == len(group_values) or group_values[position] != value:
+            raise ValueError(f"Valor {value} não encontrado no grupo {group}")
+        del group_values[position]
+        del self.values[bisect_left(self.values, value)]
+        below = bisect_left(self.values, value)
+        ties = bisect_right(self.values, value) - below
+        self.rank_sums[group] -= below + (ties + 2) / 2.0
+        self._shift_ranks(value, -1)
+        self.tie_term -= (ties + 1) ** 3 - (ties + 1) - (ties ** 3 - ties)
+
+    def update(self, group, old_value, new_value):
+        self.delete(group, old_value)
+        self.insert(group, new_value)
+
+    def result(self):
+        """(H, p) com correção de empates, como kruskal_batched; NaN se o teste não é definido"""
+        counts = np.array([len(g) for g in self.by_group], dtype=float)
+        num_groups = int(np.sum(counts > 0))
+        n = counts.sum()
+        denominator = 1.0 - self.tie_term / (n ** 3 - n) if n > 1 else 0.0
+        if num_groups < 2 or denominator <= 0:
+            return np.nan, np.nan
+        h_stat = (12.0 / (n * (n + 1.0)) * np.sum(self.rank_sums[counts > 0] ** 2 / counts[counts > 0])
+                  - 3.0 * (n + 1.0)) / denominator
+        return h_stat, chi2.sf(h_stat, num_groups - 1)
+
+def render_online_editor(key_prefix, datasets):
+    """Edição de réplicas com Kruskal-Wallis recalculado incrementalmente.
+
+    datasets: {rótulo: (lista de arrays por grupo, nomes dos grupos)}. A estrutura e a última tabela
+    aplicada ficam na sessão; cada rerun aplica só as células alteradas (inserção, remoção ou correção).
+    """
+    st.markdown("""
+    <div class="card">
+        <h2 style="display:flex;align-items:center;gap:10px;">
+            <span style="background:linear-gradient(135deg, #a78bfa 0%, #6f42c1 100%);padding:5px 15px;border-radius:30px;font-size:1.2rem;">
+                ✏️ Edição de Réplicas (E se?)
+            </span>
+        </h2>
+    </div>
+    """, unsafe_allow_html=True)
+
+    run_editor = st.checkbox("Editar réplicas e recalcular o Kruskal-Wallis", value=False,
+                             key=f"{key_prefix}_online_toggle")
+    if not run_editor or not datasets:
+        return
+
+    label = st.selectbox("Parâmetro:", list(datasets.keys()), key=f"{key_prefix}_online_param")
+    groups, names = datasets[label]
+    names = [str(name) for name in names]
+    base = stack_groups([groups])[0]
+    base_table = pd.DataFrame(base.T, columns=names)
+
+    # Reinicia a estrutura quando o parâmetro ou os dados simulados mudam
+    signature = (label, zlib.crc32(np.ascontiguousarray(base).tobytes()))
+    state_key = f"{key_prefix}_online_state"
+    state = st.session_state.get(state_key)
+    if state is None or state["signature"] != signature:
+        state = {"signature": signature, "online": OnlineKruskal(groups), "table": base_table.copy()}
+        st.session_state[state_key] = state
+
+    edited = st.data_editor(base_table, num_rows="dynamic", use_container_width=True,
+                            key=f"{key_prefix}_online_editor_{zlib.crc32(label.encode())}")
+    edited = edited.reindex(columns=names).apply(pd.to_numeric, errors='coerce')
+
+    # Diferença célula a célula em relação à última tabela aplicada
+    previous = state["table"]
+    operations = 0
+    for g, name in enumerate(names):
+        old_col = previous[name].to_numpy(dtype=float)
+        new_col = edited[name].to_numpy(dtype=float)
+        size = max(len(old_col), len(new_col))
+        old_col = np.pad(old_col, (0, size - len(old_col)), constant_values=np.nan)
+        new_col = np.pad(new_col, (0, size - len(new_col)), constant_values=np.nan)
+        for old, new in zip(old_col, new_col):
+            if np.isnan(old) and np.isnan(new) or old == new:
+                continue
+            if np.isnan(new):
+                state["online"].delete(g, old)
+            elif np.isnan(old):
+                state["online"].insert(g, new)
+            else:
+                state["online"].update(g, old, new)
+            operations += 1
+    state["table"] = edited.copy()
+
+    h_base, p_base = (v[0] for v in kruskal_batched(base[np.newaxis]))
+    h_edit, p_edit = state["online"].result()
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("H (dados simulados)", f"{h_base:.2f}", help=f"p = {p_base:.4f}")
+    with col2:
+        st.metric("H (dados editados)", f"{h_edit:.2f}", delta=f"{h_edit - h_base:+.2f}",
+                  help=f"p = {p_edit:.4f}")
+    st.markdown(
+        f"**p (qui-quadrado):** {p_base:.4f} → {p_edit:.4f} · "
+        f"**Células atualizadas nesta edição:** {operations}"
+    )
+
+# ===================================================================
+# DISTRIBUIÇÃO NULA EXATA DO KRUSKAL-WALLIS (TABELAS EM DISCO)
+# ===================================================================
+# Delineamentos (réplicas por grupo) gerados por `python app.py --build-kw-tables`: todos os delineamentos
+# balanceados dos estudos (4 ou 5 grupos) com até EXACT_MAX_OBSERVATIONS observações
+EXACT_TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'kw_exact_tables.npz')
+EXACT_MAX_OBSERVATIONS = 20  # maior N dos delineamentos gravados no arquivo (enumeração feita no build)
+EXACT_TABLE_DESIGNS = [(n,) * k for k in (4, 5) for n in range(2, 6) if n * k <= EXACT_MAX_OBSERVATIONS]
+# Delineamentos fora do arquivo só são enumerados em execução até este N (< 1 s); acima dele, ou com
+# empates, kruskal_exact_pvalues usa permutação (qui-quadrado acima de PERMUTATION_MAX_OBSERVATIONS)
+EXACT_LAZY_MAX_OBSERVATIONS = 15
+
+def design_key(sizes):
+    """Chave canônica de um delineamento: tamanhos dos grupos em ordem decrescente"""
+    return '-'.join(str(n) for n in sorted(sizes, reverse=True))
+
+def exact_statistic_weights(sizes):
+    """Pesos inteiros que tornam T = sum(R² · mmc/n) um inteiro equivalente a H (sem empates)"""
+    common = int(np.lcm.reduce(np.asarray(sizes, dtype=np.int64)))
+    return common // np.asarray(sizes, dtype=np.int64)
+
+def enumerate_kruskal_null(sizes):
+    """Enumera a distribuição nula exata de T atribuindo os postos 1..N um a um aos grupos.
+
+    O estado guarda (vagas restantes, soma de postos) de cada grupo em ordem canônica; grupos
+    em estados iguais são intercambiáveis, o que reduz bilhões de arranjos a poucos milhares de estados.
+    Retorna (suporte: valores possíveis de T em ordem crescente, sobrevivência P(T >= t) em cada um).
+    """
+    sizes = sorted(sizes, reverse=True)
+    weight_of = dict(zip(sizes, exact_statistic_weights(sizes)))
+    states = {tuple(sorted((n, n, 0) for n in sizes)): 1}
+    for rank in range(1, sum(sizes) + 1):
+        following = {}
+        for state, ways in states.items():
+            seen = {}
+            for slot in state:
+                seen[slot] = seen.get(slot, 0) + 1
+            for (size, left, total), multiplicity in seen.items():
+                if left == 0:
+                    continue
+                slots = list(state)
+                slots.remove((size, left, total))
+                slots.append((size, left - 1, total + rank))
+                key = tuple(sorted(slots))
+                following[key] = following.get(key, 0) + ways * multiplicity
+        states = following
+
+    statistic = np.array([sum(weight_of[size] * total ** 2 for size, _, total in state) for state in states],
+                         dtype=np.int64)
+    ways = np.array([float(w) for w in states.values()])
+    support, inverse = np.unique(statistic, return_inverse=True)
+    pmf = np.bincount(inverse.ravel(), weights=ways)
+    survival = np.cumsum(pmf[::-1])[::-1] / ways.sum()
+    return support, survival
+
+def save_exact_kruskal_tables(tables, path=EXACT_TABLE_PATH):
+    """Grava {chave: (suporte, sobrevivência)} de forma atômica (arquivo temporário + os.replace)"""
+    arrays = {}
+    for key, (support, survival) in tables.items():
+        arrays[f"support_{key}"] = support
+        arrays[f"sf_{key}"] = survival
+    handle, temporary = tempfile.mkstemp(suffix='.npz', dir=os.path.dirname(path))
+    try:
+        with os.fdopen(handle, 'wb') as stream:
+            np.savez_compressed(stream, **arrays)
+        os.chmod(temporary, 0o644)  # mkstemp cria com 0600
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+def build_exact_kruskal_tables(path=EXACT_TABLE_PATH, designs=EXACT_TABLE_DESIGNS):
+    """Etapa de build: enumera os delineamentos e grava as tabelas comprimidas em disco"""
+    save_exact_kruskal_tables({design_key(sizes): enumerate_kruskal_null(sizes) for sizes in designs}, path)
+    return sorted(design_key(sizes) for sizes in designs)
+
+@st.cache_resource
+def exact_kruskal_tables(path=EXACT_TABLE_PATH):
+    """Tabelas exatas carregadas uma vez por processo: ({chave: (suporte, sobrevivência)}, trava das inclusões)"""
+    tables = {}
+    if os.path.exists(path):
+        with np.load(path) as stored:
+            for name in stored.files:
+                if name.startswith('sf_'):
+                    key = name[3:]
+                    tables[key] = (stored[f"support_{key}"], stored[name])
+    return tables, threading.Lock()
+
+def exact_kruskal_table(sizes, path=EXACT_TABLE_PATH):
+    """Tabela de um delineamento (None se não houver).
+
+    O arquivo é só lido; um delineamento pequeno ausente (até EXACT_LAZY_MAX_OBSERVATIONS) é enumerado
+    uma única vez sob a trava e fica apenas em memória, no cache do processo (o app não grava na sua
+    própria pasta; para gravar um delineamento, inclua-o em EXACT_TABLE_DESIGNS e rode o build).
+    """
+    tables, lock = exact_kruskal_tables(path)
+    key = design_key(sizes)
+    table = tables.get(key)
+    if table is not None or sum(sizes) > EXACT_LAZY_MAX_OBSERVATIONS:
+        return table
+    with lock:
+        if key not in tables:
+            tables[key] = enumerate_kruskal_null(sizes)
+        return tables[key]
+
+def exact_table_pvalues(ranks, tie_term):
+    """p exato do Kruskal-Wallis por linha, consultado nas tabelas nulas (NaN onde não há tabela).
+
+    ranks (lote × grupos × réplicas) e tie_term vêm de rank_groups. As linhas sem empates são agrupadas
+    por delineamento e cada delineamento resolve todas as suas linhas com um único np.searchsorted
+    sobre o suporte de T. Linhas com empates, menos de 2 grupos ou sem tabela ficam NaN.
+    """
+    counts = np.sum(~np.isnan(ranks), axis=-1)
+    rank_sums = np.rint(np.nansum(ranks, axis=-1)).astype(np.int64)
+    p_val = np.full(ranks.shape[0], np.nan)
+    rows = np.flatnonzero((np.asarray(tie_term) == 0) & (np.sum(counts > 0, axis=-1) >= 2))
+    if len(rows) == 0:
+        return p_val
+
+    designs, inverse = np.unique(-np.sort(-counts[rows], axis=-1), axis=0, return_inverse=True)
+    for d, design in enumerate(designs):
+        table = exact_kruskal_table(tuple(int(n) for n in design if n > 0))
+        if table is None:
+            continue
+        support, survival = table
+        members = rows[inverse.ravel() == d]
+        sizes = counts[members]
+        common = int(np.lcm.reduce(design[design > 0].astype(np.int64)))
+        weights = np.where(sizes > 0, common // np.maximum(sizes, 1), 0)
+        statistic = np.sum(weights * rank_sums[members] ** 2, axis=-1)
+        p_val[members] = survival[np.minimum(np.searchsorted(support, statistic), len(survival) - 1)]
+    return p_val
+
+def kruskal_table_batched(samples):
+    """Kruskal-Wallis em lote com o p exato das tabelas onde houver e qui-quadrado nas demais linhas.
+
+    Para as ressimulações (poder, blocos), onde a permutação por linha seria cara demais: sem empates,
+    o p coincide com o p exato da tabela de resultados.
+    """
+    ranks, tie_term, n_total = rank_groups(samples)
+    h_stat, p_chi2 = kruskal_from_ranks(ranks, tie_term, n_total)
+    p_exact = exact_table_pvalues(ranks, tie_term)
+    return h_stat, np.where(np.isnan(p_exact), p_chi2, p_exact)
+
+def kruskal_exact_pvalues(samples, labels=None, seed=DEFAULT_SEED, alpha=0.05, ranked=None):
+    """p-valor exato do Kruskal-Wallis por linha: consulta vetorizada à tabela nula quando não há empates.
+
+    Linhas com empates ou grandes demais para enumerar usam o teste de permutação até
+    PERMUTATION_MAX_OBSERVATIONS observações, e o qui-quadrado acima disso (muitas réplicas por grupo).
+    ranked (GroupRanks de rank_bundle) evita ordenar os dados de novo.
+    """
+    ranks, _, tie_term, n_total = rank_bundle(samples) if ranked is None else ranked
+    p_val = exact_table_pvalues(ranks, tie_term)
+    testable = np.sum(np.sum(~np.isnan(ranks), axis=-1) > 0, axis=-1) >= 2
+    asymptotic = np.isnan(p_val) & testable & (n_total > PERMUTATION_MAX_OBSERVATIONS)
+    if asymptotic.any():
+        p_val[asymptotic] = kruskal_from_ranks(ranks[asymptotic], tie_term[asymptotic], n_total[asymptotic])[1]
+    needs_permutation = np.isnan(p_val) & testable
+
+    if needs_permutation.any():
+        rows = np.flatnonzero(needs_permutation)
+        row_labels = rows if labels is None else [labels[r] for r in rows]
+        p_val[rows], _ = kruskal_permutation(np.asarray(samples, dtype=float)[rows], labels=row_labels,
+                                             alpha=alpha, seed=seed)
+    return p_val
+
+# ===================================================================
+# COMPARAÇÕES MÚLTIPLAS (DUNN) COM CORREÇÃO DE MULTIPLICIDADE
+# ===================================================================
+PAIRWISE_CORRECTIONS = ['Holm', 'Hochberg', 'Benjamini-Hochberg']
+# Correção ao longo de todos os testes de uma rodada (parâmetros [× tratamentos])
+MULTIPLICITY_CORRECTIONS = PAIRWISE_CORRECTIONS + ['Nenhuma']
+
+def adjust_pvalues(p_vals, method='Holm'):
+    """Correção de multiplicidade ao longo do último eixo (NaN é ignorado e preservado)"""
+    p_vals = np.asarray(p_vals, dtype=float)
+    if method == 'Nenhuma':
+        return p_vals.copy()
+    m = np.sum(~np.isnan(p_vals), axis=-1, keepdims=True)
+    order = np.argsort(p_vals, axis=-1)  # NaN vai para o fim
+    sorted_p = np.take_along_axis(p_vals, order, axis=-1)
+    position = np.arange(p_vals.shape[-1])
+
+    if method == 'Holm':
+        adjusted = np.maximum.accumulate(np.minimum((m - position) * sorted_p, 1.0), axis=-1)
+    elif method == 'Hochberg':
+        scaled = np.where(np.isnan(sorted_p), np.inf, (m - position) * sorted_p)
+        adjusted = np.minimum(np.flip(np.minimum.accumulate(np.flip(scaled, -1), axis=-1), -1), 1.0)
+    elif method == 'Benjamini-Hochberg':
+        scaled = np.where(np.isnan(sorted_p), np.inf, m / (position + 1.0) * sorted_p)
+        adjusted = np.minimum(np.flip(np.minimum.accumulate(np.flip(scaled, -1), axis=-1), -1), 1.0)
+    else:
+        raise ValueError(f"Correção desconhecida: {method}")
+
+    result = np.empty_like(p_vals)
+    np.put_along_axis(result, order, np.where(np.isnan(sorted_p), np.nan, adjusted), axis=-1)
+    return result
+
+def dunn_batched(samples=None, ranks=None, tie_term=None):
+    """Teste de Dunn para todos os pares de grupos, reaproveitando os postos do Kruskal-Wallis.
+
+    samples (lote × grupos × réplicas) -> (z, p) com shape (lote × grupos × grupos); diagonal e
+    grupos vazios ficam NaN. Com ranks/tie_term (postos dos dados agrupados, já no formato
+    lote × grupos × réplicas, e termo de empates) os dados não são ordenados de novo.
+    """
+    if ranks is None:
+        ranks, tie_term, _ = rank_groups(samples)
+    counts = np.sum(~np.isnan(ranks), axis=-1).astype(float)
+    n = counts.sum(axis=-1)[..., np.newaxis, np.newaxis]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_ranks = np.nansum(ranks, axis=-1) / counts
+        variance = n * (n + 1.0) / 12.0 - tie_term[..., np.newaxis, np.newaxis] / (12.0 * (n - 1.0))
+        se = np.sqrt(variance * (1.0 / counts[..., :, np.newaxis] + 1.0 / counts[..., np.newaxis, :]))
+        z = (mean_ranks[..., :, np.newaxis] - mean_ranks[..., np.newaxis, :]) / se
+    num_groups = z.shape[-1]
+    z[..., np.arange(num_groups), np.arange(num_groups)] = np.nan
+    return z, 2.0 * norm.sf(np.abs(z))
+
+def adjust_pairwise(p_matrix, method='Holm'):
+    """Aplica a correção às comparações distintas (triângulo superior) de cada matriz de p-valores"""
+    num_groups = p_matrix.shape[-1]
+    upper_i, upper_j = np.triu_indices(num_groups, 1)
+    adjusted = adjust_pvalues(p_matrix[..., upper_i, upper_j], method)
+    result = np.full(p_matrix.shape, np.nan)
+    result[..., upper_i, upper_j] = adjusted
+    result[..., upper_j, upper_i] = adjusted
+    return result
+
+def posthoc_correction_input(key_prefix):
+    """Seleção da correção de multiplicidade do pós-teste de Dunn"""
+    return st.selectbox(
+        "Correção do pós-teste de Dunn:",
+        PAIRWISE_CORRECTIONS,
+        index=0,
+        key=f"{key_prefix}_posthoc_correction"
+    )
+
+def adjust_family(p_vals, method='Holm', family=None):
+    """Correção sobre a família de células testadas em cada ressimulação.
+
+    p_vals (experimentos × células...) -> mesmo shape; family são os índices planos das células que
+    entram na família (None = todas). As demais ficam NaN e nunca são rejeitadas.
+    """
+    p_vals = np.asarray(p_vals, dtype=float)
+    flat = p_vals.reshape(p_vals.shape[0], -1)
+    if family is not None:
+        members = list(family)
+        flat = np.full_like(flat, np.nan)
+        flat[:, members] = p_vals.reshape(p_vals.shape[0], -1)[:, members]
+    return adjust_pvalues(flat, method).reshape(p_vals.shape)
+
+def multiplicity_input(key_prefix):
+    """Seleção da correção aplicada a todos os testes de Kruskal-Wallis da rodada"""
+    return st.selectbox(
+        "Correção para múltiplos parâmetros:",
+        MULTIPLICITY_CORRECTIONS,
+        index=0,
+        key=f"{key_prefix}_multiplicity"
+    )
+
+def plot_dunn_matrix(ax, p_matrix, labels, correction='Holm', alpha=0.05):
+    """Matriz compacta de p-valores ajustados (triângulo inferior), com pares significativos destacados"""
+    num_groups = len(labels)
+    lower = np.tril(np.ones((num_groups, num_groups), dtype=bool), -1)
+    shown = np.where(lower, p_matrix, np.nan)
+    strength = np.clip(-np.log10(np.where(np.isnan(shown), 1.0, shown)), 0.0, 3.0)
+    ax.imshow(np.where(lower, strength, np.nan), cmap='magma', vmin=0.0, vmax=3.0)
+
+    for i, j in zip(*np.nonzero(lower)):
+        value = shown[i, j]
+        if np.isnan(value):
+            continue
+        text = "<0.001" if value < 0.001 else f"{value:.3f}"
+        ax.text(j, i, text, ha='center', va='center', fontsize=8,
+                color='#00c853' if value < alpha else 'white',
+                fontweight='bold' if value < alpha else 'normal')
+
+    ax.set_xticks(range(num_groups - 1))
+    ax.set_xticklabels(labels[:-1], rotation=45, ha='right', fontsize=8)
+    ax.set_yticks(range(1, num_groups))
+    ax.set_yticklabels(labels[1:], fontsize=8)
+    ax.set_xlim(-0.5, num_groups - 1.5)
+    ax.set_ylim(num_groups - 0.5, 0.5)
+    ax.set_title(f"Dunn ({correction})", fontsize=11, fontweight='bold', pad=10)
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    ax.set_facecolor('#0c0f1d')
+    return ax
+
+# ===================================================================
+# BATERIA DE TESTES POR POSTOS (UMA ÚNICA ORDENAÇÃO)
+# ===================================================================
+# Kruskal-Wallis, mediana de Mood, Van der Waerden e Fligner-Killeen para cada linha do lote
+RankBattery = namedtuple('RankBattery', ['kw_h', 'kw_p', 'mood_chi2', 'mood_p', 'vdw_t', 'vdw_p',
+                                         'fk_chi2', 'fk_p'])
+
+def score_test(scores, counts):
+    """Teste de escores (lote × grupos × réplicas): sum n_i (média_i - média)² / s², qui² com k - 1 gl"""
+    n = counts.sum(axis=-1).astype(float)
+    num_groups = np.sum(counts > 0, axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        total_mean = np.nansum(scores, axis=(-2, -1)) / n
+        group_means = np.nansum(scores, axis=-1) / counts
+        variance = np.nansum((scores - total_mean[..., np.newaxis, np.newaxis]) ** 2, axis=(-2, -1)) / (n - 1.0)
+        stat = np.sum(np.where(counts > 0, counts * (group_means - total_mean[..., np.newaxis]) ** 2, 0.0),
+                      axis=-1) / variance
+    # Escores todos iguais (ex.: dados constantes): variância só de arredondamento, teste indefinido
+    constant = np.all((scores == scores[..., :1, :1]) | np.isnan(scores), axis=(-2, -1))
+    stat = np.where((num_groups >= 2) & ~constant, stat, np.nan)
+    return stat, chi2.sf(stat, np.maximum(num_groups - 1, 1))
+
+def rank_test_battery(samples, ranked=None):
+    """Quatro testes não paramétricos por linha do lote (lote × grupos × réplicas, NaN = ausente).
+
+    Os dados agrupados são ordenados uma única vez: Kruskal-Wallis usa os postos médios, Van der Waerden
+    os escores normais Φ⁻¹(R/(N+1)) e Mood a posição de cada valor em relação à mediana global
+    (empates na mediana contam abaixo, como scipy.stats.median_test). Fligner-Killeen mede a dispersão e
+    precisa dos postos de |x - mediana do grupo|, a única ordenação adicional. ranked (GroupRanks de
+    rank_bundle) reaproveita a ordenação feita pelo chamador.
+    """
+    samples = np.asarray(samples, dtype=float)
+    ranks, low_ranks, tie_term, n_total = rank_bundle(samples) if ranked is None else ranked
+    counts = np.sum(~np.isnan(ranks), axis=-1)
+    n = n_total.astype(float)[..., np.newaxis, np.newaxis]
+    kw_h, kw_p = kruskal_from_ranks(ranks, tie_term, n_total)
+
+    # Mood: acima da mediana global <=> a sequência de empates começa após a posição ceil(N/2)
+    above = np.sum(np.where(np.isnan(ranks), False, low_ranks > np.ceil(n / 2.0)), axis=-1)
+    below = counts - above
+    num_groups = np.sum(counts > 0, axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        share_above = above.sum(axis=-1, keepdims=True) / n[..., 0]
+        expected_above = counts * share_above
+        expected_below = counts - expected_above
+        mood = np.sum(np.where(counts > 0, (above - expected_above) ** 2 / expected_above
+                               + (below - expected_below) ** 2 / expected_below, 0.0), axis=-1)
+    degenerate = (share_above[..., 0] <= 0.0) | (share_above[..., 0] >= 1.0) | (num_groups < 2)
+    mood = np.where(degenerate, np.nan, mood)
+    mood_p = chi2.sf(mood, np.maximum(num_groups - 1, 1))
+
+    vdw_t, vdw_p = score_test(norm.ppf(ranks / (n + 1.0)), counts)
+
+    deviations = np.abs(samples - group_medians(samples)[..., np.newaxis])
+    deviation_ranks, _, _ = rank_groups(deviations)
+    fk_chi2, fk_p = score_test(norm.ppf(0.5 + deviation_ranks / (2.0 * (n + 1.0))), counts)
+
+    return RankBattery(kw_h, kw_p, mood, mood_p, vdw_t, vdw_p, fk_chi2, fk_p)
+
+def render_rank_battery(battery, row_labels, correction='Nenhuma'):
+    """Tabela comparativa dos quatro testes por postos; row_labels tem um dicionário de rótulos por linha"""
+    st.markdown("""
+    <div class="card">
+        <h2 style="display:flex;align-items:center;gap:10px;">
+            <span style="background:linear-gradient(135deg, #a78bfa 0%, #6f42c1 100%);padding:5px 15px;border-radius:30px;font-size:1.2rem;">
+                🧪 Bateria de Testes por Postos
+            </span>
+        </h2>
+    </div>
+    """, unsafe_allow_html=True)
+    st.markdown(f"""
+    <div class="info-card">
+        <div style="color:#d7dce8; line-height:1.7;">
+            Kruskal-Wallis, mediana de Mood e Van der Waerden comparam a <b>posição</b> dos grupos;
+            Fligner-Killeen compara a <b>dispersão</b>. Todos usam a mesma ordenação dos dados.
+            p-valores assintóticos (qui-quadrado), corrigidos por <b>{correction}</b> dentro de cada teste.
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+
+    tests = [("Kruskal-Wallis", "H", battery.kw_h, battery.kw_p),
+             ("Mood", "χ²", battery.mood_chi2, battery.mood_p),
+             ("Van der Waerden", "T", battery.vdw_t, battery.vdw_p),
+             ("Fligner-Killeen", "χ²", battery.fk_chi2, battery.fk_p)]
+    columns = {}
+    for name, symbol, stat, p_val in tests:
+        columns[f"{symbol} ({name})"] = stat
+        columns[f"p ({name})"] = adjust_pvalues(p_val, correction)
+
+    battery_df = pd.DataFrame(row_labels)
+    for column, values in columns.items():
+        battery_df[column] = values
+    p_cols = [c for c in columns if c.startswith("p (")]
+    st.dataframe(
+        battery_df.style
+        .format({c: ("{:.4f}" if c in p_cols else "{:.2f}") for c in columns}, na_rep="—")
+        .set_properties(**{'color': 'white', 'background-color': '#131625'})
+        .apply(lambda col: ['background: rgba(70, 80, 150, 0.3)' if v < 0.05 else '' for v in col],
+               subset=p_cols)
+    )
+
+# ===================================================================
+# INTERVALOS DE CONFIANÇA POR BOOTSTRAP (MEDIANAS E ε²)
+# ===================================================================
+BootstrapInterval = namedtuple('BootstrapInterval', ['estimate', 'low', 'high'])
+BOOTSTRAP_CHUNK_VALUES = 2 ** 22  # valores reamostrados por bloco (lote × grupos × réplicas × reamostras)
+JACKKNIFE_MAX_STEPS = 50  # passos do jackknife do BCa; acima disso remove blocos de réplicas
+
+def group_medians(samples):
+    """Mediana de cada grupo (último eixo), ignorando NaN: (... × grupos × réplicas) -> (... × grupos).
+
+    Igual a np.nanmedian, mas por uma ordenação vetorizada: nanmedian percorre grupo a grupo quando há NaN
+    e as réplicas são muitas (reamostras do bootstrap com centenas de réplicas).
+    """
+    ordered = np.sort(np.asarray(samples, dtype=float), axis=-1)  # NaN vai para o fim
+    counts = np.sum(~np.isnan(ordered), axis=-1, keepdims=True)
+    lower = np.take_along_axis(ordered, np.maximum(counts - 1, 0) // 2, axis=-1)[..., 0]
+    upper = np.take_along_axis(ordered, counts // 2 - (counts == 0), axis=-1)[..., 0]
+    return np.where(counts[..., 0] > 0, (lower + upper) / 2.0, np.nan)
+
+def epsilon_squared(samples, ranked=None):
+    """Tamanho de efeito ε² = H / (N - 1) do Kruskal-Wallis: (... × grupos × réplicas) -> (...)
+
+    Com ranked (GroupRanks de rank_bundle, lote × grupos × réplicas) o H sai dos postos já calculados.
+    """
+    if ranked is not None:
+        h_stat, _ = kruskal_from_ranks(ranked.ranks, ranked.tie_term, ranked.n_total)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return h_stat / (ranked.n_total - 1.0)
+    samples = np.asarray(samples, dtype=float)
+    h_stat, _ = kruskal_batched(samples.reshape((-1,) + samples.shape[-2:]))
+    n_total = np.sum(~np.isnan(samples), axis=(-2, -1))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return h_stat.reshape(samples.shape[:-2]) / (n_total - 1.0)
+
+def bootstrap_interval(samples, statistic, labels=None, num_resamples=2000, confidence=0.95,
+                       method='BCa', seed=DEFAULT_SEED, estimate=None):
+    """Bootstrap estratificado (reamostra dentro de cada grupo) com intervalo percentil ou BCa.
+
+    samples (lote × grupos × réplicas, NaN = ausente). As reamostras de todos os grupos saem de arrays de
+    índices (bloco de B × lote × grupos × réplicas); statistic é vetorizada sobre os eixos iniciais.
+    A aceleração do BCa vem do jackknife por observação. estimate (statistic(samples) já calculada,
+    ex.: ε² a partir dos postos compartilhados) evita recalcular a estimativa pontual.
+    """
+    samples = np.asarray(samples, dtype=float)
+    num_rows, num_groups, max_n = samples.shape
+    labels = list(range(num_rows)) if labels is None else list(labels)
+    counts = np.sum(~np.isnan(samples), axis=-1)
+    estimate = statistic(samples) if estimate is None else np.asarray(estimate, dtype=float)
+
+    # Um fluxo por linha: o intervalo de um parâmetro não depende dos demais selecionados. As reamostras saem
+    # em blocos de até BOOTSTRAP_CHUNK_VALUES valores, lidos em sequência do mesmo fluxo (resultado idêntico ao
+    # de um único array), para que muitas réplicas não estourem a memória
+    generators = [spawn_generator(seed, 'bootstrap', labels[b]) for b in range(num_rows)]
+    chunk = max(1, BOOTSTRAP_CHUNK_VALUES // max(num_rows * num_groups * max_n, 1))
+    present = np.arange(max_n) < counts[..., np.newaxis]
+    boot = []
+    for start in range(0, num_resamples, chunk):
+        uniforms = np.stack([generator.random((min(chunk, num_resamples - start), num_groups, max_n))
+                             for generator in generators], axis=1)
+        index = np.minimum(np.floor(uniforms * counts[..., np.newaxis]).astype(np.int64),
+                           np.maximum(counts - 1, 0)[..., np.newaxis])
+        resampled = np.take_along_axis(np.broadcast_to(samples, uniforms.shape), index, axis=-1)
+        boot.append(statistic(np.where(present, resampled, np.nan)))
+    boot = np.concatenate(boot, axis=0)
+
+    alpha = (1.0 - confidence) / 2.0
+    if method == 'Percentil':
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            low, high = np.nanquantile(boot, [alpha, 1.0 - alpha], axis=0)
+        return BootstrapInterval(estimate, low, high)
+
+    # Correção de viés (z0): proporção de reamostras abaixo da estimativa, empates contam metade
+    proportion = np.mean(boot < estimate, axis=0) + 0.5 * np.mean(boot == estimate, axis=0)
+    z0 = norm.ppf(np.clip(proportion, 0.5 / num_resamples, 1.0 - 0.5 / num_resamples))
+
+    # Aceleração: jackknife removendo uma observação por vez (contribuições agrupadas por grupo). Um passo por
+    # posição de réplica j: a cópia g remove o j-ésimo valor do grupo g, então a memória é grupos × lote × grupos
+    # × réplicas por passo em vez de uma máscara (grupos · réplicas)² de todas as remoções. Com mais de
+    # JACKKNIFE_MAX_STEPS réplicas cada passo remove um bloco contíguo de posições (jackknife agrupado)
+    groups = np.arange(num_groups)
+    blocks = np.array_split(np.arange(max_n), min(max_n, JACKKNIFE_MAX_STEPS))
+    steps = []
+    for block in blocks:
+        removed = np.repeat(samples[np.newaxis], num_groups, axis=0)
+        removed[groups, :, groups, block[0]:block[-1] + 1] = np.nan
+        steps.append(statistic(removed))
+    jackknife = np.stack(steps, axis=1)  # grupos × blocos × saída da estatística
+    present = ~np.isnan(samples)
+    removed_valid = np.moveaxis(np.stack([present[..., block].any(axis=-1) for block in blocks], axis=-1), 0, -1)
+    removed_valid = removed_valid.reshape(removed_valid.shape + (1,) * (jackknife.ndim - 3))
+    jackknife = np.where(removed_valid, jackknife, np.nan)
+    with warnings.catch_warnings(), np.errstate(divide='ignore', invalid='ignore'):
+        warnings.simplefilter('ignore', RuntimeWarning)
+        influence = np.nanmean(jackknife, axis=1, keepdims=True) - jackknife
+        acceleration = (np.nansum(influence ** 3, axis=(0, 1))
+                        / (6.0 * np.nansum(influence ** 2, axis=(0, 1)) ** 1.5))
+    acceleration = np.nan_to_num(acceleration)
+
+    z_alpha = norm.ppf([alpha, 1.0 - alpha]).reshape((2,) + (1,) * z0.ndim)
+    adjusted = norm.cdf(z0 + (z0 + z_alpha) / (1.0 - acceleration * (z0 + z_alpha)))
+    ordered = np.sort(boot, axis=0)  # NaN vai para o fim
+    valid_boot = np.sum(~np.isnan(boot), axis=0)
+    position = np.clip(np.rint(adjusted * (valid_boot - 1)), 0, np.maximum(valid_boot - 1, 0)).astype(np.int64)
+    low, high = (np.take_along_axis(ordered, position[k][np.newaxis], axis=0)[0] for k in range(2))
+    missing = np.isnan(estimate)
+    return BootstrapInterval(estimate, np.where(missing, np.nan, low), np.where(missing, np.nan, high))
+
+# ===================================================================
+# EQUIVALÊNCIA (TOST) PARA CONCLUSÕES DE ESTABILIDADE
+# ===================================================================
+EQUIVALENCE_TYPES = ['% da média', 'Absoluta']
+# p do TOST (interseção-união sobre todos os pares), maior diferença entre médias e margem absoluta usada
+EquivalenceTest = namedtuple('EquivalenceTest', ['p_value', 'max_difference', 'margin'])
+
+def tost_equivalence(samples, margins, relative=False):
+    """TOST de Welch entre todos os pares de grupos de cada linha (lote × grupos × réplicas).
+
+    A equivalência exige que todo par fique dentro de ±margem (interseção-união: o p é o maior p dos
+    pares, sem correção adicional). margins por linha; com relative, são % da média geral da linha.
+    """
+    samples = np.asarray(samples, dtype=float)
+    counts = np.sum(~np.isnan(samples), axis=-1)
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        means = np.nanmean(samples, axis=-1)
+        variances = np.nanvar(samples, axis=-1, ddof=1)
+        grand_mean = np.nanmean(samples, axis=(-2, -1))
+    margins = np.where(relative, np.asarray(margins, dtype=float) / 100.0 * np.abs(grand_mean), margins)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        se2 = variances / counts
+        welch = se2 ** 2 / (counts - 1.0)
+        diff = means[..., :, np.newaxis] - means[..., np.newaxis, :]
+        se = np.sqrt(se2[..., :, np.newaxis] + se2[..., np.newaxis, :])
+        df = se ** 4 / (welch[..., :, np.newaxis] + welch[..., np.newaxis, :])
+        margin = margins[..., np.newaxis, np.newaxis]
+        p_pairs = np.maximum(t_dist.sf((diff + margin) / se, df), t_dist.cdf((diff - margin) / se, df))
+
+    num_groups = samples.shape[-2]
+    valid = counts >= 2
+    pairs = (np.triu(np.ones((num_groups, num_groups), dtype=bool), 1)
+             & valid[..., :, np.newaxis] & valid[..., np.newaxis, :])
+    has_pairs = pairs.any(axis=(-2, -1))
+    p_value = np.where(has_pairs, np.max(np.where(pairs, np.nan_to_num(p_pairs, nan=1.0), 0.0), axis=(-2, -1)),
+                       np.nan)
+    max_difference = np.where(has_pairs, np.max(np.where(pairs, np.abs(diff), 0.0), axis=(-2, -1)), np.nan)
+    return EquivalenceTest(p_value, max_difference, margins)
+
+def equivalence_margin_input(key_prefix, params, label_map):
+    """Margens de equivalência por parâmetro (padrão: ±0,2 para pH e ±5% da média para os demais)"""
+    is_ph = ['pH' in str(p) for p in params]
+    default = pd.DataFrame({
+        "Parâmetro": [label_map.get(p, p) for p in params],
+        "Margem": [0.2 if ph else 5.0 for ph in is_ph],
+        "Tipo": ['Absoluta' if ph else '% da média' for ph in is_ph],
+    })
+    with st.expander("Margens de equivalência (TOST) para afirmar estabilidade"):
+        edited = st.data_editor(
+            default,
+            key=f"{key_prefix}_equivalence_margins",
+            use_container_width=True,
+            hide_index=True,
+            disabled=["Parâmetro"],
+            column_config={
+                "Margem": st.column_config.NumberColumn(min_value=0.0),
+                "Tipo": st.column_config.SelectboxColumn(options=EQUIVALENCE_TYPES, required=True),
+            }
+        )
+    return {p: (float(m), t == '% da média') for p, m, t in zip(params, edited["Margem"], edited["Tipo"])}
+
+def equivalence_note(res):
+    """Item do cartão de interpretação: só afirma estabilidade quando o TOST demonstra equivalência"""
+    margin, p_tost = res["Margem (TOST)"], res["p (TOST)"]
+    if p_tost < 0.05:
+        color = "#00c853"
+        text = (f"<b>Equivalência demonstrada</b> (TOST, margem ±{margin:.3g}, p = {p_tost:.4f}): todas as "
+                f"diferenças entre grupos ficam dentro da margem e o parâmetro pode ser considerado estável")
+    else:
+        color = "#ffd166"
+        text = (f"<b>Equivalência não demonstrada</b> (TOST, margem ±{margin:.3g}, p = {p_tost:.4f}): a ausência "
+                f"de diferença significativa não basta para afirmar que o parâmetro é estável")
+    return f"""
+    <div style="color:#e0e5ff; line-height:1.8;">
+        <p style="margin:12px 0; display:flex; align-items:center; gap:8px;">
+            <span style="color:{color}; font-size:1.5rem;">•</span>
+            {text}
+        </p>
+    </div>
+    """
+
+# ===================================================================
+# TESTES DE TENDÊNCIA (GRUPOS ORDENADOS: DIAS, DOSES, CAMADAS)
+# ===================================================================
+TrendTests = namedtuple('TrendTests', ['jt_stat', 'jt_z', 'jt_p', 'mk_s', 'mk_z', 'mk_p', 'sen_slope'])
+SEN_CHUNK_VALUES = 2 ** 22  # inclinações de Sen por bloco de linhas (linhas × pares de grupos × réplicas²)
+
+def trend_tests(samples, positions):
+    """Jonckheere-Terpstra e Mann-Kendall/Sen para grupos ordenados, vetorizados sobre o lote.
+
+    samples (... × grupos × réplicas, NaN = ausente) e positions (... × grupos ou grupos): posição
+    numérica de cada grupo (dia, dose, idade da camada). Os eixos iniciais podem ser parâmetros
+    e/ou ressimulações. z positivo indica tendência crescente; p bilateral pela aproximação normal
+    com correção de empates e sem correção de continuidade (o p do Mann-Kendall é o de
+    scipy.stats.kendalltau(tempo, valor)).
+
+    Os pares de observações são contados por par de grupos: os postos de cada par (2 × réplicas valores)
+    dão a contagem de Mann-Whitney, então a memória cresce com grupos² × réplicas, não com N². Só a
+    inclinação de Sen precisa de todas as inclinações (réplicas² por par), calculadas em blocos de linhas.
+    """
+    samples = np.asarray(samples, dtype=float)
+    positions = np.broadcast_to(np.asarray(positions, dtype=float), samples.shape[:-1])
+    num_groups, num_reps = samples.shape[-2:]
+
+    x = samples.reshape(samples.shape[:-2] + (-1,))
+    sizes = np.sum(~np.isnan(samples), axis=-1).astype(float)
+    n = sizes.sum(axis=-1)
+
+    # Contagem de Mann-Whitney de cada par de grupos (a, b): pares x_a < x_b mais metade dos empates
+    first, second = np.triu_indices(num_groups, 1)
+    pair_ranks, _, _ = average_ranks(np.concatenate([samples[..., first, :], samples[..., second, :]], axis=-1))
+    size_a, size_b = sizes[..., first], sizes[..., second]
+    u_second = np.nansum(pair_ranks[..., num_reps:], axis=-1) - size_b * (size_b + 1.0) / 2.0
+    dt = positions[..., second] - positions[..., first]
+    ordered = (dt > 0) | (dt < 0)
+
+    # Jonckheere-Terpstra: J = pares concordantes (grupo posterior maior) + metade dos empates;
+    # Mann-Kendall: S = concordantes - discordantes = 2J - pares com tempos distintos
+    jt_stat = np.sum(np.where(dt > 0, u_second, np.where(dt < 0, size_a * size_b - u_second, 0.0)), axis=-1)
+    mk_s = 2.0 * jt_stat - np.sum(np.where(ordered, size_a * size_b, 0.0), axis=-1)
+
+    ties_x = [tie_sum(x, f) for f in (lambda u: u * (u - 1) * (2 * u + 5),
+                                      lambda u: u * (u - 1) * (u - 2),
+                                      lambda u: u * (u - 1))]
+    ties_g = [np.sum(f(sizes), axis=-1) for f in (lambda u: u * (u - 1) * (2 * u + 5),
+                                                   lambda u: u * (u - 1) * (u - 2),
+                                                   lambda u: u * (u - 1))]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Variância de S (Kendall com empates em x e no tempo); J = (S + pares entre grupos) / 2
+        var_s = ((n * (n - 1) * (2 * n + 5) - ties_g[0] - ties_x[0]) / 18.0
+                 + ties_g[1] * ties_x[1] / (9.0 * n * (n - 1) * (n - 2))
+                 + ties_g[2] * ties_x[2] / (2.0 * n * (n - 1)))
+        jt_mean = (n ** 2 - np.sum(sizes ** 2, axis=-1)) / 4.0
+        jt_z = (jt_stat - jt_mean) / np.sqrt(var_s / 4.0)
+        mk_z = mk_s / np.sqrt(var_s)
+
+    # Inclinação de Sen: mediana das inclinações entre pares de tempos distintos (um bloco réplicas ×
+    # réplicas por par de grupos), com até SEN_CHUNK_VALUES inclinações por vez
+    flat_samples = samples.reshape((-1, num_groups, num_reps))
+    flat_dt, flat_ordered = dt.reshape(-1, len(first)), ordered.reshape(-1, len(first))
+    chunk = max(1, SEN_CHUNK_VALUES // max(len(first) * num_reps ** 2, 1))
+    medians = []
+    for start in range(0, max(len(flat_samples), 1), chunk):
+        block = flat_samples[start:start + chunk]
+        block_dt = flat_dt[start:start + chunk, :, np.newaxis, np.newaxis]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            dx = block[:, second, :, np.newaxis] - block[:, first, np.newaxis, :]
+            slopes = np.where(flat_ordered[start:start + chunk, :, np.newaxis, np.newaxis], dx / block_dt, np.nan)
+        medians.append(group_medians(slopes.reshape(len(block), -1)))
+    sen_slope = np.concatenate(medians).reshape(x.shape[:-1])
+
+    return TrendTests(jt_stat, jt_z, 2.0 * norm.sf(np.abs(jt_z)), mk_s, mk_z, 2.0 * norm.sf(np.abs(mk_z)),
+                      sen_slope)
+
+# ===================================================================
+# TESTES POR PARÂMETRO DE UMA RODADA (EM CACHE)
+# ===================================================================
+ParameterTests = namedtuple('ParameterTests', ['battery', 'exact_p', 'trend', 'median_ci', 'effect_ci',
+                                               'equivalence', 'dunn_p'])
+
+@st.cache_data(show_spinner="Calculando os testes por parâmetro...", max_entries=64)
+def parameter_tests(stacked, labels, seed, margins, relative, positions=None, dunn=False):
+    """Todos os testes por parâmetro de uma rodada (lote × grupos × réplicas), em cache pelos dados.
+
+    Bateria por postos, p exato, tendência (com positions), IC bootstrap das medianas e do ε², TOST e,
+    com dunn, os p de Dunn de todos os pares. Trocar de aba, de backend ou de correção não repete os
+    testes: só dados, rótulos, semente ou margens novos entram no cálculo.
+    """
+    ranked = rank_bundle(stacked)  # uma ordenação por linha, repassada a todos os testes por postos
+    battery = rank_test_battery(stacked, ranked)  # Kruskal-Wallis, Mood, Van der Waerden e Fligner-Killeen
+    exact_p = kruskal_exact_pvalues(stacked, labels=labels, seed=seed, ranked=ranked)
+    trend = None if positions is None else trend_tests(stacked, positions)
+    median_ci = bootstrap_interval(stacked, group_medians, labels=labels, seed=seed)
+    effect_ci = bootstrap_interval(stacked, epsilon_squared, labels=labels, seed=seed,
+                                   estimate=epsilon_squared(stacked, ranked))
+    equivalence = tost_equivalence(stacked, margins, relative)
+    dunn_p = dunn_batched(ranks=ranked.ranks, tie_term=ranked.tie_term)[1] if dunn else None
+    return ParameterTests(battery, exact_p, trend, median_ci, effect_ci, equivalence, dunn_p)
+
+# ===================================================================
+# ANÁLISE FATORIAL NÃO PARAMÉTRICA (DOIS FATORES)
+# ===================================================================
+FACTORIAL_EFFECTS = ['Tratamento', 'Camada', 'Interação']
+FactorialTests = namedtuple('FactorialTests', ['df', 'srh_h', 'srh_p', 'art_f', 'art_p', 'df_error'])
+
+def factorial_sums_of_squares(y):
+    """Somas de quadrados da ANOVA de dois fatores balanceada: y (... × A × B × réplicas).
+
+    Retorna (SS dos efeitos [A, B, A×B] no último eixo, SS do erro, SS total).
+    """
+    a, b, r = y.shape[-3:]
+    axes = (-3, -2, -1)
+    grand = y.mean(axis=axes, keepdims=True)
+    cell = y.mean(axis=-1, keepdims=True)
+    mean_a = y.mean(axis=(-2, -1), keepdims=True)
+    mean_b = y.mean(axis=(-3, -1), keepdims=True)
+    ss_a = b * r * np.sum((mean_a - grand) ** 2, axis=axes)
+    ss_b = a * r * np.sum((mean_b - grand) ** 2, axis=axes)
+    ss_ab = r * np.sum((cell - mean_a - mean_b + grand) ** 2, axis=axes)
+    ss_error = np.sum((y - cell) ** 2, axis=axes)
+    ss_total = np.sum((y - grand) ** 2, axis=axes)
+    return np.stack([ss_a, ss_b, ss_ab], axis=-1), ss_error, ss_total
+
+def two_factor_rank_tests(values):
+    """Scheirer-Ray-Hare e ANOVA com alinhamento e postos (ART) para um delineamento A × B balanceado.
+
+    values (... × A × B × réplicas): os eixos iniciais (ex.: parâmetros) são analisados em um único lote.
+    Cada estatística tem um valor por efeito (A, B, A×B) no último eixo.
+    """
+    values = np.asarray(values, dtype=float)
+    a, b, r = values.shape[-3:]
+    n_total = a * b * r
+    df = np.array([a - 1, b - 1, (a - 1) * (b - 1)], dtype=float)
+    df_error = a * b * (r - 1)
+
+    def rank_cells(y):
+        ranks, _, _ = average_ranks(y.reshape(y.shape[:-3] + (-1,)))
+        return ranks.reshape(y.shape)
+
+    # Scheirer-Ray-Hare: ANOVA sobre os postos de todas as observações, H = SS / MS total
+    ss_effects, _, ss_total = factorial_sums_of_squares(rank_cells(values))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        srh_h = ss_effects / (ss_total / (n_total - 1))[..., np.newaxis]
+    srh_p = chi2.sf(srh_h, df)
+
+    # ART: alinha os dados para cada efeito (resíduo + efeito estimado), ranqueia e testa só aquele efeito
+    grand = values.mean(axis=(-3, -2, -1), keepdims=True)
+    cell = values.mean(axis=-1, keepdims=True)
+    mean_a = values.mean(axis=(-2, -1), keepdims=True)
+    mean_b = values.mean(axis=(-3, -1), keepdims=True)
+    residual = values - cell
+    aligned = np.stack([residual + (mean_a - grand),
+                        residual + (mean_b - grand),
+                        residual + (cell - mean_a - mean_b + grand)])
+    # Arredondar evita que ruído de ponto flutuante desfaça empates verdadeiros
+    aligned_ss, aligned_error, _ = factorial_sums_of_squares(rank_cells(np.round(aligned, 9)))
+    effect_ss = np.stack([aligned_ss[e, ..., e] for e in range(3)], axis=-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        art_f = (effect_ss / df) / (np.moveaxis(aligned_error, 0, -1) / df_error)
+    art_p = f_dist.sf(art_f, df, df_error)
+
+    return FactorialTests(df, srh_h, srh_p, art_f, art_p, df_error)
+
+# ===================================================================
+# ANOVA E WELCH ANALÍTICOS (A PARTIR DE MÉDIA, DESVIO PADRÃO E n)
+# ===================================================================
+SummaryTests = namedtuple('SummaryTests', ['anova_f', 'anova_p', 'welch_f', 'welch_df2', 'welch_p',
+                                           'eta_squared', 'omega_squared'])
+
+def summary_anova(means, sds, n):
+    """ANOVA de um fator e teste de Welch calculados diretamente das estatísticas publicadas.
+
+    means/sds têm os grupos no último eixo; n é o número de réplicas (escalar ou por grupo).
+    Sem sorteios: o resultado é determinístico. Welch fica NaN quando algum grupo tem desvio nulo.
+    """
+    means = np.asarray(means, dtype=float)
+    sds = np.asarray(sds, dtype=float)
+    n = np.broadcast_to(np.asarray(n, dtype=float), means.shape)
+    k = means.shape[-1]
+    total = n.sum(axis=-1)
+
+    # ANOVA clássica (variâncias iguais) e tamanhos de efeito
+    grand_mean = np.sum(n * means, axis=-1) / total
+    ss_between = np.sum(n * (means - grand_mean[..., np.newaxis]) ** 2, axis=-1)
+    ss_within = np.sum((n - 1.0) * sds ** 2, axis=-1)
+    ms_within = ss_within / (total - k)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        anova_f = (ss_between / (k - 1)) / ms_within
+        eta_squared = ss_between / (ss_between + ss_within)
+        omega_squared = (ss_between - (k - 1) * ms_within) / (ss_between + ss_within + ms_within)
+
+        # Welch (variâncias desiguais)
+        weights = n / sds ** 2
+        weight_sum = weights.sum(axis=-1)
+        weighted_mean = np.sum(weights * means, axis=-1) / weight_sum
+        spread = np.sum(weights * (means - weighted_mean[..., np.newaxis]) ** 2, axis=-1) / (k - 1)
+        tmp = np.sum((1.0 - weights / weight_sum[..., np.newaxis]) ** 2 / (n - 1.0), axis=-1)
+        welch_f = spread / (1.0 + 2.0 * (k - 2) / (k ** 2 - 1) * tmp)
+        welch_df2 = (k ** 2 - 1) / (3.0 * tmp)
+    welch_ok = np.all(sds > 0, axis=-1)
+    welch_f = np.where(welch_ok, welch_f, np.nan)
+    welch_df2 = np.where(welch_ok, welch_df2, np.nan)
+
+    return SummaryTests(anova_f, f_dist.sf(anova_f, k - 1, total - k), welch_f, welch_df2,
+                        f_dist.sf(welch_f, k - 1, welch_df2), eta_squared, np.maximum(omega_squared, 0.0))
+
+def render_summary_tests(spec, label_maps, selected_params=None, num_replications=3, results=None):
+    """Tabela de referência analítica (ANOVA/Welch + efeitos), ao lado do Kruskal-Wallis simulado"""
+    st.markdown(f"""
+    <div class="info-card">
+        <div style="color:#d7dce8; line-height:1.7;">
+            <b>Referência analítica (sem simulação):</b> ANOVA e Welch calculados diretamente das médias e
+            desvios padrão publicados, com n = {num_replications} por grupo. O veredito não depende da semente.
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+
+    tests = summary_anova(spec.means, spec.sds, num_replications)
+    kruskal_p = {(r["Parâmetro"], r.get("Tratamento")): r["p-value"] for r in (results or [])}
+
+    rows = []
+    for index in np.ndindex(*spec.means.shape[:-1]):
+        labels = [spec.coords[dim][i] for dim, i in zip(spec.dims, index)]
+        if selected_params is not None and labels[0] not in selected_params:
+            continue
+        names = [label_maps[d].get(l, l) if d < len(label_maps) else l for d, l in enumerate(labels)]
+        row = {"Parâmetro": names[0]}
+        if len(names) > 1:
+            row["Tratamento"] = " / ".join(str(n) for n in names[1:])
+        row.update({
+            "F (ANOVA)": tests.anova_f[index],
+            "p (ANOVA)": tests.anova_p[index],
+            "F (Welch)": tests.welch_f[index],
+            "p (Welch)": tests.welch_p[index],
+            "η²": tests.eta_squared[index],
+            "ω²": tests.omega_squared[index],
+            "p Kruskal-Wallis (simulado)": kruskal_p.get((row["Parâmetro"], row.get("Tratamento")), np.nan),
+        })
+        rows.append(row)
+
+    if not rows:
+        return
+
+    summary_df = pd.DataFrame(rows)
+    p_cols = ["p (ANOVA)", "p (Welch)", "p Kruskal-Wallis (simulado)"]
+    st.dataframe(
+        summary_df.style
+        .format({"F (ANOVA)": "{:.2f}", "F (Welch)": "{:.2f}", "η²": "{:.3f}", "ω²": "{:.3f}",
+                 **{c: "{:.4f}" for c in p_cols}}, na_rep="—")
+        .set_properties(**{'color': 'white', 'background-color': '#131625'})
+        .apply(lambda col: ['background: rgba(70, 80, 150, 0.3)' if v < 0.05 else '' for v in col],
+               subset=p_cols)
+    )
+
+# ===================================================================
+# COMPARAÇÃO BAYESIANA (POSTERIORES CONJUGADAS A PARTIR DO RESUMO)
+# ===================================================================
+# Intervalo de credibilidade da média de cada grupo, P(linha > coluna) e P(grupo tem a maior média)
+BayesComparison = namedtuple('BayesComparison', ['low', 'high', 'prob_greater', 'prob_max'])
+
+def bayes_posteriors(means, sds, n, num_draws=20000, credibility=0.95, seed=DEFAULT_SEED):
+    """Posteriores das médias com priori não informativa normal-inversa-gama (Jeffreys).
+
+    Com média, desvio e n publicados, μ | dados ~ média + (s/√n)·t(n - 1). s é o desvio padrão (tabelas com
+    erro padrão já chegam convertidas por prepare_study, ver summary_table_to_arrays). O intervalo de credibilidade
+    sai em forma fechada; as probabilidades de ordem vêm de sorteios vetorizados de todas as linhas
+    (lote... × grupos) de uma vez.
+    """
+    means = np.asarray(means, dtype=float)
+    scale = np.asarray(sds, dtype=float) / np.sqrt(n)
+    half = t_dist.ppf(0.5 + credibility / 2.0, n - 1) * scale
+
+    rng = spawn_generator(seed, 'bayes', n)
+    draws = means + scale * rng.standard_t(n - 1, size=(num_draws,) + means.shape)
+    prob_greater = np.mean(draws[..., :, np.newaxis] > draws[..., np.newaxis, :], axis=0)
+    num_groups = means.shape[-1]
+    prob_max = np.mean(np.argmax(draws, axis=-1)[..., np.newaxis] == np.arange(num_groups), axis=0)
+    return BayesComparison(means - half, means + half, prob_greater, prob_max)
+
+def plot_probability_matrix(ax, prob, labels, title="P(linha > coluna)"):
+    """Matriz P(linha > coluna) das médias posteriores (diagonal em branco)"""
+    num_groups = len(labels)
+    shown = np.where(np.eye(num_groups, dtype=bool), np.nan, prob)
+    ax.imshow(shown, cmap='coolwarm', vmin=0.0, vmax=1.0)
+    for i, j in zip(*np.nonzero(~np.isnan(shown))):
+        value = shown[i, j]
+        ax.text(j, i, f"{value:.2f}", ha='center', va='center', fontsize=8,
+                color='#131625' if 0.25 < value < 0.75 else 'white',
+                fontweight='bold' if value >= 0.95 or value <= 0.05 else 'normal')
+    ax.set_xticks(range(num_groups))
+    ax.set_xticklabels(labels, rotation=45, ha='right', fontsize=8)
+    ax.set_yticks(range(num_groups))
+    ax.set_yticklabels(labels, fontsize=8)
+    ax.set_title(title, fontsize=11, fontweight='bold', pad=10)
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    ax.set_facecolor('#0c0f1d')
+    return ax
+
+def draw_bayes_tile(name, group_labels, prob_greater, prob_max):
+    """Figura de um parâmetro: matriz P(linha > coluna) ao lado de P(maior média) por grupo"""
+    fig = plt.figure(figsize=(14, 3.6))
+    gs = fig.add_gridspec(1, 2, wspace=0.35, width_ratios=[1.2, 1])
+    plot_probability_matrix(fig.add_subplot(gs[0, 0]), prob_greater, group_labels, f"{name}: P(linha > coluna)")
+
+    ax = fig.add_subplot(gs[0, 1])
+    ax.barh(group_labels, prob_max, color='#a78bfa', alpha=0.85, zorder=3)
+    ax.set_xlim(0.0, 1.0)
+    ax.invert_yaxis()
+    ax.set_xlabel("Probabilidade", fontsize=10, fontweight='bold')
+    ax.set_title(f"{name}: P(maior média)", fontsize=11, fontweight='bold', pad=10)
+    ax.grid(True, axis='x', alpha=0.2, linestyle='--', color='#a0a7c0', zorder=1)
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    ax.set_facecolor('#0c0f1d')
+    fig.tight_layout()
+    return fig
+
+def render_bayes_comparison(spec, key_prefix, label_maps, selected_params=None, num_replications=3,
+                            seed=DEFAULT_SEED):
+    """Modo bayesiano: matriz P(A > B) e P(máximo) por parâmetro, calculados das médias publicadas"""
+    st.markdown("""
+    <div class="card">
+        <h2 style="display:flex;align-items:center;gap:10px;">
+            <span style="background:linear-gradient(135deg, #a78bfa 0%, #6f42c1 100%);padding:5px 15px;border-radius:30px;font-size:1.2rem;">
+                🎲 Comparação Bayesiana dos Grupos
+            </span>
+        </h2>
+    </div>
+    """, unsafe_allow_html=True)
+
+    run_bayes = st.checkbox("Mostrar probabilidades posteriores", value=False, key=f"{key_prefix}_bayes_toggle")
+    if not run_bayes:
+        return
+
+    st.markdown(f"""
+    <div class="info-card">
+        <div style="color:#d7dce8; line-height:1.7;">
+            Posteriores das médias de cada grupo (priori não informativa), obtidas das médias e desvios publicados
+            com n = {num_replications}. <b>P(linha &gt; coluna)</b> é a probabilidade de a média da linha superar a
+            da coluna; <b>P(máximo)</b> é a probabilidade de o grupo ter a maior média.
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+
+    posterior = bayes_posteriors(spec.means, spec.sds, num_replications, seed=seed)
+    params = spec.coords[spec.dims[0]]
+    group_labels = [str(label_maps[1].get(g, g)) if len(label_maps) > 1 else str(g)
+                    for g in spec.coords[spec.dims[-1]]]
+    rows = [i for i, p in enumerate(params) if selected_params is None or p in selected_params]
+    if not rows:
+        st.info("Nenhum parâmetro selecionado para a comparação bayesiana.")
+        return
+
+    summary, tiles = [], {}
+    for i in rows:
+        name = label_maps[0].get(params[i], params[i])
+        best = int(np.argmax(posterior.prob_max[i]))
+        summary.append({
+            "Parâmetro": name,
+            "Grupo com maior média": group_labels[best],
+            "P(máximo)": posterior.prob_max[i][best],
+            "IC 95% (credibilidade)": f"{posterior.low[i][best]:.3g} – {posterior.high[i][best]:.3g}",
+        })
+        fingerprint = data_fingerprint(name, group_labels, posterior.prob_greater[i], posterior.prob_max[i])
+        tiles[params[i]] = chart_tile(f"{spec.key}_bayes", params[i], fingerprint, draw_bayes_tile,
+                                      name, group_labels, posterior.prob_greater[i], posterior.prob_max[i])
+
+    st.dataframe(
+        pd.DataFrame(summary).style
+        .format({"P(máximo)": "{:.3f}"})
+        .set_properties(**{'color': 'white', 'background-color': '#131625'})
+    )
+    parameter_tabs(f"{key_prefix}_bayes", tiles, label_maps[0])
+
+# ===================================================================
+# PODER ESTATÍSTICO E TAMANHO AMOSTRAL (MONTE CARLO)
+# ===================================================================
+# Curva de poder: taxa de rejeição por número de réplicas para cada célula testada
+PowerCurve = namedtuple('PowerCurve', ['replications', 'power', 'simulations', 'ci_low', 'ci_high'])
+
+def wilson_interval(successes, trials, confidence=0.95):
+    """Intervalo de Wilson para uma proporção (vetorizado)"""
+    z = norm.ppf(0.5 + confidence / 2.0)
+    p_hat = successes / trials
+    denom = 1.0 + z ** 2 / trials
+    center = (p_hat + z ** 2 / (2.0 * trials)) / denom
+    half = z * np.sqrt(p_hat * (1.0 - p_hat) / trials + z ** 2 / (4.0 * trials ** 2)) / denom
+    return center - half, center + half
+
+def simulate_rejection_rate(spec, num_replications, distribution_type='Normal', alpha=0.05,
+                            target_power=0.8, max_simulations=2000, chunk_size=256,
+                            confidence=0.95, seed=DEFAULT_SEED, sampling='Pseudoaleatória',
+                            correction='Nenhuma', family=None):
+    """Ressimula o estudo em blocos e estima a taxa de rejeição do Kruskal-Wallis por célula.
+
+    O p de cada ressimulação é o exato das tabelas nulas (qui-quadrado só onde não há tabela), o mesmo
+    da tabela de resultados (ver kruskal_table_batched).
+
+    Com correction, cada ressimulação ajusta os p-valores da família inteira (ver adjust_family)
+    antes de comparar com alpha, como na tabela de resultados.
+
+    Para assim que o intervalo de confiança de todas as células fica inteiramente
+    acima ou abaixo do poder alvo. Com amostragem quasi-Monte Carlo, cada experimento é um
+    ponto no espaço das réplicas e cada bloco é um novo embaralhamento (o intervalo binomial fica conservador).
+    """
+    batch_shape = spec.means.shape[:-1]
+    num_groups = spec.means.shape[-1]
+    rejections = np.zeros(batch_shape)
+    done = 0
+
+    while done < max_simulations:
+        k = min(chunk_size, max_simulations - done)
+        shape = (k,) + spec.means.shape
+        # Fluxo próprio por (célula, número de réplicas, bloco): resultado independe da ordem de execução
+        noise = np.moveaxis(cell_noise(spec, (k, num_replications), seed, 'power', num_replications, done,
+                                       sampling=sampling), -2, 0)
+        values = simulate_replicates(np.broadcast_to(spec.means, shape), np.broadcast_to(spec.sds, shape),
+                                     num_replications, distribution_type, spec.lower, spec.upper, noise=noise)
+        _, p_vals = kruskal_table_batched(values.reshape(-1, num_groups, num_replications))
+        p_vals = adjust_family(p_vals.reshape((k,) + batch_shape), correction, family)
+        rejections += (p_vals < alpha).sum(axis=0)
+        done += k
+
+        ci_low, ci_high = wilson_interval(rejections, done, confidence)
+        if np.all((ci_low > target_power) | (ci_high < target_power)):
+            break
+
+    return rejections / done, done, ci_low, ci_high
+
+def kruskal_power_curve(spec, replication_grid, distribution_type='Normal', alpha=0.05,
+                        target_power=0.8, max_simulations=2000, seed=DEFAULT_SEED, executor=None,
+                        sampling='Pseudoaleatória', correction='Nenhuma', family=None):
+    """Curva de poder do Kruskal-Wallis para cada número de réplicas em replication_grid.
+
+    executor (ThreadPoolExecutor/ProcessPoolExecutor) distribui os pontos da curva sem alterar o resultado.
+    """
+    run_point = partial(simulate_rejection_rate, spec, distribution_type=distribution_type, alpha=alpha,
+                        target_power=target_power, max_simulations=max_simulations, seed=seed,
+                        sampling=sampling, correction=correction, family=family)
+    mapper = map if executor is None else executor.map
+
+    power, simulations, ci_low, ci_high = [], [], [], []
+    for rate, done, low, high in mapper(run_point, replication_grid):
+        power.append(rate)
+        simulations.append(done)
+        ci_low.append(low)
+        ci_high.append(high)
+    return PowerCurve(np.asarray(replication_grid), np.stack(power), np.asarray(simulations),
+                      np.stack(ci_low), np.stack(ci_high))
+
+def minimum_replications(curve, target_power=0.8):
+    """Menor número de réplicas cuja taxa de rejeição atinge o poder alvo (NaN se nenhum atinge)"""
+    reached = curve.power >= target_power
+    first = np.argmax(reached, axis=0)
+    return np.where(reached.any(axis=0), curve.replications[first], np.nan)
+
+def exact_replication_limit(num_groups, replication_grid):
+    """Maior n da grade cujo delineamento balanceado tem p exato (tabela do arquivo ou enumerável em execução).
+
+    Acima dele kruskal_table_batched passa ao qui-quadrado, e a curva de poder pode saltar nessa troca.
+    None se nenhum n da grade tem tabela.
+    """
+    tables, _ = exact_kruskal_tables(EXACT_TABLE_PATH)
+    exact = [n for n in replication_grid
+             if design_key((n,) * num_groups) in tables or n * num_groups <= EXACT_LAZY_MAX_OBSERVATIONS]
+    return max(exact, default=None)
+
+@st.cache_data(show_spinner="Ressimulando o estudo...")
+def cached_power_curve(spec, replication_grid, distribution_type, alpha, target_power, max_simulations, seed,
+                       sampling='Pseudoaleatória', correction='Nenhuma', family=None):
+    with ThreadPoolExecutor(max_workers=os.cpu_count() or 1) as executor:
+        return kruskal_power_curve(spec, replication_grid, distribution_type, alpha, target_power,
+                                   max_simulations, seed, executor, sampling, correction, family)
+
+def selected_family(spec, selected_params=None):
+    """Índices planos das células testadas (parâmetros selecionados) para adjust_family"""
+    if selected_params is None:
+        return None
+    batch_shape = spec.means.shape[:-1]
+    return tuple(int(np.ravel_multi_index(index, batch_shape)) for index in np.ndindex(*batch_shape)
+                 if spec.coords[spec.dims[0]][index[0]] in selected_params)
+
+def draw_power_tile(name, replication_grid, curves, target_power, current_replications, exact_limit=None):
+    """Curva de poder de um parâmetro: uma linha por célula testada [(rótulo, poder por n)].
+
+    Com exact_limit dentro da grade, uma linha vertical marca a troca do p exato para o qui-quadrado.
+    """
+    fig, ax = plt.subplots(figsize=(10, 5))
+    colors = ['#6f42c1', '#00c1e0', '#00d4b1', '#ffd166', '#ff6b6b', '#a78bfa', '#f78c6b', '#c3e88d', '#89ddff']
+    for j, (label, power_by_n) in enumerate(curves):
+        ax.plot(replication_grid, power_by_n, 'o-', linewidth=2, markersize=6,
+                color=colors[j % len(colors)], label=label)
+    ax.axhline(y=target_power, color='#ff5252', linestyle='--', alpha=0.8)
+    ax.axvline(x=current_replications, color='#a0a7c0', linestyle=':', alpha=0.8)
+    if exact_limit is not None and exact_limit < replication_grid[-1]:
+        ax.axvline(x=exact_limit + 0.5, color='#ffd166', linestyle='-.', alpha=0.8,
+                   label=f"p exato até n={exact_limit}, qui-quadrado acima")
+    ax.set_ylim(-0.02, 1.02)
+    ax.set_xlabel("Réplicas por grupo", fontsize=12, fontweight='bold', labelpad=15)
+    ax.set_ylabel("Poder (taxa de rejeição)", fontsize=12, fontweight='bold', labelpad=15)
+    ax.set_title(f"Curva de Poder do Teste de Kruskal-Wallis: {name}", fontsize=14, fontweight='bold', pad=20)
+    ax.xaxis.set_major_locator(MaxNLocator(integer=True))
+    ax.grid(True, alpha=0.2, linestyle='--', color='#a0a7c0', zorder=1)
+    ax.legend(loc='lower right', fontsize=8, framealpha=0.25)
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+    ax.set_facecolor('#0c0f1d')
+    fig.tight_layout()
+    return fig
+
+def render_power_planner(spec, key_prefix, label_maps, selected_params=None,
+                         distribution_type='Normal', current_replications=3, seed=DEFAULT_SEED,
+                         sampling='Pseudoaleatória', correction='Nenhuma'):
+    """Seção de planejamento de poder: taxa de rejeição por parâmetro e réplicas mínimas"""
+    st.markdown("""
+    <div class="card">
+        <h2 style="display:flex;align-items:center;gap:10px;">
+            <span style="background:linear-gradient(135deg, #a78bfa 0%, #6f42c1 100%);padding:5px 15px;border-radius:30px;font-size:1.2rem;">
+                🎯 Poder Estatístico e Tamanho Amostral
+            </span>
+        </h2>
+    </div>
+    """, unsafe_allow_html=True)
+
+    st.markdown("""
+    <div class="info-card">
+        <div style="color:#d7dce8; line-height:1.7;">
+            Os p-valores acima vêm de <b>um único sorteio</b> de réplicas. Este modo ressimula o estudo várias vezes
+            para cada número de réplicas e informa com que frequência o teste de Kruskal-Wallis detecta diferença
+            (poder), além do menor número de réplicas que atinge o poder desejado.
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+
+    run_power = st.checkbox("Calcular poder estatístico", value=False, key=f"{key_prefix}_power_toggle")
+    if not run_power:
+        return
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        min_n, max_n = st.slider("Réplicas por grupo:", 2, 30, (2, 10), key=f"{key_prefix}_power_range")
+    with col2:
+        target_power = st.slider("Poder alvo:", 0.50, 0.99, 0.80, 0.01, key=f"{key_prefix}_power_target")
+    with col3:
+        max_simulations = st.selectbox("Simulações máximas por ponto:", [500, 1000, 2000, 5000],
+                                       index=2, key=f"{key_prefix}_power_sims")
+
+    replication_grid = tuple(range(min_n, max_n + 1))
+    curve = cached_power_curve(spec, replication_grid, distribution_type, 0.05, target_power, max_simulations, seed,
+                               sampling, correction, selected_family(spec, selected_params))
+    min_reps = minimum_replications(curve, target_power)
+    exact_limit = exact_replication_limit(spec.means.shape[-1], replication_grid)
+    switches = exact_limit is not None and exact_limit < replication_grid[-1]
+
+    # Uma linha por célula testada (parâmetro e, se houver, tratamento); uma curva por célula no gráfico do parâmetro
+    batch_dims = spec.dims[:-1]
+    rows, param_curves = [], {}
+    for index in np.ndindex(*spec.means.shape[:-1]):
+        labels = [spec.coords[dim][i] for dim, i in zip(batch_dims, index)]
+        if selected_params is not None and labels[0] not in selected_params:
+            continue
+        names = [label_maps[d].get(l, l) if d < len(label_maps) else l for d, l in enumerate(labels)]
+        row = {"Parâmetro": names[0]}
+        if len(names) > 1:
+            row["Grupo"] = " / ".join(str(n) for n in names[1:])
+        power_by_n = curve.power[(slice(None),) + index]
+        for n, value in zip(replication_grid, power_by_n):
+            row[f"n={n}"] = value
+        if np.isnan(min_reps[index]):
+            row["Réplicas mínimas"] = "—"
+        elif switches and min_reps[index] > exact_limit:
+            row["Réplicas mínimas"] = f"{int(min_reps[index])} (χ²)"
+        else:
+            row["Réplicas mínimas"] = int(min_reps[index])
+        rows.append(row)
+        label = " / ".join(str(n) for n in names[1:]) if len(names) > 1 else str(names[0])
+        param_curves.setdefault(labels[0], []).append((label, power_by_n))
+
+    if not rows:
+        st.info("Nenhum parâmetro selecionado para o cálculo de poder.")
+        return
+
+    power_df = pd.DataFrame(rows)
+    power_cols = [f"n={n}" for n in replication_grid]
+    st.dataframe(
+        power_df.style
+        .format({c: "{:.2f}" for c in power_cols})
+        .set_properties(**{'color': 'white', 'background-color': '#131625'})
+        .apply(lambda col: ['background: rgba(0, 200, 83, 0.25)' if v >= target_power else '' for v in col],
+               subset=power_cols)
+    )
+    st.markdown(
+        f"**Simulações utilizadas por ponto:** {', '.join(str(int(s)) for s in curve.simulations)} "
+        f"(parada antecipada quando o intervalo de confiança de 95% decide em relação ao poder alvo). "
+        f"**Réplicas atuais:** {current_replications} · **Semente:** {seed} · **Amostragem:** {sampling} · "
+        f"**Correção:** {correction}"
+    )
+    if switches:
+        st.markdown(
+            f"**Teste:** p exato (tabelas nulas) até n={exact_limit} e qui-quadrado a partir de n={exact_limit + 1} "
+            f"(linha amarela no gráfico). A curva pode saltar nessa troca; réplicas mínimas marcadas com (χ²) "
+            f"foram obtidas com o qui-quadrado e, perto da troca, refletem também a mudança de teste."
+        )
+    elif exact_limit is None:
+        st.markdown("**Teste:** qui-quadrado em todos os pontos (nenhum delineamento da faixa tem tabela exata).")
+    else:
+        st.markdown("**Teste:** p exato (tabelas nulas) em todos os pontos da curva.")
+
+    tiles = {}
+    for param, curves in param_curves.items():
+        name = label_maps[0].get(param, param)
+        fingerprint = data_fingerprint(name, replication_grid, curves, target_power, current_replications,
+                                       exact_limit)
+        tiles[param] = chart_tile(f"{spec.key}_power", param, fingerprint, draw_power_tile,
+                                  name, replication_grid, curves, target_power, current_replications, exact_limit)
+    parameter_tabs(f"{key_prefix}_power", tiles, label_maps[0])
+
+# ===================================================================
+# SIMULAÇÃO EM BLOCOS (STREAMING) COM MEMÓRIA LIMITADA
+# ===================================================================
+# Resumo do Kruskal-Wallis sobre os experimentos ressimulados: contagens por célula testada
+StreamingKruskal = namedtuple('StreamingKruskal', ['experiments', 'rejections', 'h_sum'])
+
+class StreamingCellStats:
+    """Estatísticas online por célula: contagem, média, variância, extremos e histograma para quantis.
+
+    A memória é fixa (num_bins por célula), independentemente de quantas réplicas passam por update().
+    """
+
+    def __init__(self, spec, num_bins=1024, span=8.0):
+        shape = spec.means.shape
+        self.shape = shape
+        self.num_bins = num_bins
+        self.count = np.zeros(shape)
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+        self.min = np.full(shape, np.inf)
+        self.max = np.full(shape, -np.inf)
+
+        # Faixa do histograma: média ± span desvios, restrita aos limites físicos
+        width = np.where(spec.sds > 0, spec.sds, np.abs(spec.means) * 0.01 + 1e-9)
+        low = np.maximum(spec.means - span * width, np.broadcast_to(spec.lower, shape))
+        high = np.minimum(spec.means + span * width, np.broadcast_to(spec.upper, shape))
+        self.low = low
+        self.bin_width = np.maximum(high - low, 1e-12) / num_bins
+        self.hist = np.zeros(shape + (num_bins,), dtype=np.int64)
+
+    def update(self, values):
+        """Incorpora um bloco com shape (células...) + (k,) (fusão de Chan para média e variância)"""
+        k = values.shape[-1]
+        chunk_mean = values.mean(axis=-1)
+        chunk_m2 = ((values - chunk_mean[..., np.newaxis]) ** 2).sum(axis=-1)
+        total = self.count + k
+        delta = chunk_mean - self.mean
+        self.mean = self.mean + delta * k / total
+        self.m2 = self.m2 + chunk_m2 + delta ** 2 * self.count * k / total
+        self.count = total
+        self.min = np.minimum(self.min, values.min(axis=-1))
+        self.max = np.maximum(self.max, values.max(axis=-1))
+
+        bins = np.floor((values - self.low[..., np.newaxis]) / self.bin_width[..., np.newaxis])
+        bins = np.clip(bins, 0, self.num_bins - 1).astype(np.int64)
+        cell_ids = np.arange(int(np.prod(self.shape))).reshape(self.shape)[..., np.newaxis]
+        flat = (cell_ids * self.num_bins + bins).ravel()
+        self.hist += np.bincount(flat, minlength=self.hist.size).reshape(self.hist.shape)
+
+    def std(self):
+        return np.sqrt(self.m2 / np.maximum(self.count - 1, 1))
+
+    def quantile(self, q):
+        """Quantil aproximado pelo histograma acumulado (interpolação linear dentro do bin)"""
+        cumulative = np.cumsum(self.hist, axis=-1)
+        target = q * self.count
+        idx = np.argmax(cumulative >= target[..., np.newaxis], axis=-1)
+        before = np.where(idx > 0, np.take_along_axis(cumulative, np.maximum(idx - 1, 0)[..., np.newaxis], -1)[..., 0], 0)
+        in_bin = np.take_along_axis(self.hist, idx[..., np.newaxis], -1)[..., 0]
+        frac = np.clip((target - before) / np.maximum(in_bin, 1), 0.0, 1.0)
+        value = self.low + (idx + frac) * self.bin_width
+        return np.clip(value, self.min, self.max)
+
+def iter_replicate_chunks(spec, total_replications, chunk_size=10000, distribution_type='Normal', seed=DEFAULT_SEED):
+    """Gera as réplicas do estudo em blocos de tamanho fixo (células...) + (k,)"""
+    for start in range(0, total_replications, chunk_size):
+        k = min(chunk_size, total_replications - start)
+        noise = cell_noise(spec, (k,), seed, 'stream', start)
+        yield simulate_replicates(spec.means, spec.sds, k, distribution_type, spec.lower, spec.upper, noise=noise)
+
+def stream_study_summary(spec, total_replications, chunk_size=10000, distribution_type='Normal',
+                         seed=DEFAULT_SEED, experiment_size=3, alpha=0.05, correction='Nenhuma', family=None):
+    """Consome os blocos acumulando estatísticas por célula e contagens do Kruskal-Wallis.
+
+    Cada bloco é dividido em experimentos de experiment_size réplicas por grupo, testados em lote com o
+    p exato das tabelas (ver kruskal_table_batched) e corrigidos por experimento sobre a família; nada
+    além do bloco corrente fica em memória.
+    """
+    chunk_size = max(experiment_size, (chunk_size // experiment_size) * experiment_size)
+    stats = StreamingCellStats(spec)
+    batch_shape = spec.means.shape[:-1]
+    num_groups = spec.means.shape[-1]
+    experiments = 0
+    rejections = np.zeros(batch_shape)
+    h_sum = np.zeros(batch_shape)
+
+    for values in iter_replicate_chunks(spec, total_replications, chunk_size, distribution_type, seed):
+        stats.update(values)
+
+        num_experiments = values.shape[-1] // experiment_size
+        if num_experiments == 0:
+            continue
+        usable = values[..., :num_experiments * experiment_size]
+        grouped = usable.reshape(spec.means.shape + (num_experiments, experiment_size))
+        grouped = np.moveaxis(grouped, -2, -3)  # (lote..., experimentos, grupos, réplicas)
+        h_stat, p_val = kruskal_table_batched(grouped.reshape(-1, num_groups, experiment_size))
+        h_stat = h_stat.reshape(batch_shape + (num_experiments,))
+        p_val = adjust_family(np.moveaxis(p_val.reshape(batch_shape + (num_experiments,)), -1, 0),
+                              correction, family)
+        rejections += (p_val < alpha).sum(axis=0)
+        h_sum += np.nansum(h_stat, axis=-1)
+        experiments += num_experiments
+
+    return stats, StreamingKruskal(experiments, rejections, h_sum)
+
+@st.cache_data(show_spinner="Simulando em blocos...")
+def cached_streaming_summary(spec, total_replications, chunk_size, distribution_type, seed, experiment_size,
+                             correction='Nenhuma', family=None):
+    stats, kruskal_counts = stream_study_summary(spec, total_replications, chunk_size, distribution_type,
+                                                 seed, experiment_size, correction=correction, family=family)
+    quantiles = {q: stats.quantile(q) for q in (0.025, 0.5, 0.975)}
+    return (stats.count, stats.mean, stats.std(), stats.min, stats.max, quantiles), kruskal_counts
+
+def render_streaming_summary(spec, key_prefix, label_maps, selected_params=None,
+                             distribution_type='Normal', current_replications=3, seed=DEFAULT_SEED,
+                             correction='Nenhuma'):
+    """Seção de simulação em larga escala: estatísticas por grupo e Kruskal-Wallis acumulados em blocos"""
+    st.markdown("""
+    <div class="card">
+        <h2 style="display:flex;align-items:center;gap:10px;">
+            <span style="background:linear-gradient(135deg, #a78bfa 0%, #6f42c1 100%);padding:5px 15px;border-radius:30px;font-size:1.2rem;">
+                🌊 Simulação em Larga Escala (Blocos)
+            </span>
+        </h2>
+    </div>
+    """, unsafe_allow_html=True)
+
+    run_stream = st.checkbox("Executar simulação em larga escala", value=False, key=f"{key_prefix}_stream_toggle")
+    if not run_stream:
+        return
+
+    col1, col2 = st.columns(2)
+    with col1:
+        total_replications = st.selectbox("Réplicas simuladas por grupo:", [10_000, 100_000, 1_000_000],
+                                          index=1, key=f"{key_prefix}_stream_total")
+    with col2:
+        chunk_size = st.selectbox("Tamanho do bloco:", [5_000, 20_000, 50_000],
+                                  index=1, key=f"{key_prefix}_stream_chunk")
+
+    (count, mean, std, vmin, vmax, quantiles), kruskal_counts = cached_streaming_summary(
+        spec, total_replications, chunk_size, distribution_type, seed, current_replications,
+        correction, selected_family(spec, selected_params)
+    )
+
+    def names_for(index):
+        labels = [spec.coords[dim][i] for dim, i in zip(spec.dims, index)]
+        return labels, [label_maps[d].get(l, l) if d < len(label_maps) else l for d, l in enumerate(labels)]
+
+    # Estatísticas descritivas por célula (parâmetro × grupo [× camada])
+    rows = []
+    for index in np.ndindex(*spec.means.shape):
+        labels, names = names_for(index)
+        if selected_params is not None and labels[0] not in selected_params:
+            continue
+        rows.append({
+            "Parâmetro": names[0],
+            "Grupo": " / ".join(str(n) for n in names[1:]),
+            "Média": mean[index],
+            "Desvio Padrão": std[index],
+            "P2.5": quantiles[0.025][index],
+            "Mediana": quantiles[0.5][index],
+            "P97.5": quantiles[0.975][index],
+            "Mínimo": vmin[index],
+            "Máximo": vmax[index],
+        })
+    if not rows:
+        st.info("Nenhum parâmetro selecionado para a simulação em larga escala.")
+        return
+
+    stats_df = pd.DataFrame(rows)
+    number_cols = [c for c in stats_df.columns if c not in ("Parâmetro", "Grupo")]
+    st.dataframe(
+        stats_df.style
+        .format({c: "{:.4g}" for c in number_cols})
+        .set_properties(**{'color': 'white', 'background-color': '#131625'})
+    )
+
+    # Kruskal-Wallis acumulado sobre os experimentos ressimulados
+    kw_rows = []
+    experiments = max(kruskal_counts.experiments, 1)
+    for index in np.ndindex(*spec.means.shape[:-1]):
+        labels, names = names_for(index)
+        if selected_params is not None and labels[0] not in selected_params:
+            continue
+        row = {"Parâmetro": names[0]}
+        if len(names) > 1:
+            row["Grupo"] = " / ".join(str(n) for n in names[1:])
+        row["H-Statistic (médio)"] = kruskal_counts.h_sum[index] / experiments
+        row["Taxa de rejeição (p<0.05)"] = kruskal_counts.rejections[index] / experiments
+        kw_rows.append(row)
+
+    kw_df = pd.DataFrame(kw_rows)
+    st.dataframe(
+        kw_df.style
+        .format({"H-Statistic (médio)": "{:.2f}", "Taxa de rejeição (p<0.05)": "{:.3f}"})
+        .set_properties(**{'color': 'white', 'background-color': '#131625'})
+        .apply(lambda x: ['background: rgba(70, 80, 150, 0.3)'
+                          if x['Taxa de rejeição (p<0.05)'] >= 0.5 else '' for i in x], axis=1)
+    )
+    st.markdown(
+        f"**Réplicas por grupo:** {int(count.max()):,} em blocos de {chunk_size:,} · "
+        f"**Experimentos de {current_replications} réplicas testados:** {kruskal_counts.experiments:,} · "
+        f"**Semente:** {seed} · **Correção:** {correction}"
+    )
+
+# ===================================================================
+# GRÁFICOS ADAPTATIVOS À DENSIDADE (KDE BINADO VIA FFT)
+# ===================================================================
+# Até DENSE_POINTS_THRESHOLD réplicas por grupo cada valor é um ponto; acima disso o grupo vira um violino
+# (matplotlib) ou uma faixa binada (Vega-Lite) de tamanho fixo, então tempo e bytes não crescem com n.
+DENSE_POINTS_THRESHOLD = 200
+KDE_GRID_SIZE = 256  # pontos mínimos da grade
+KDE_POINTS_PER_BANDWIDTH = 10  # espaçamento máximo h/10 da grade (erro de binning < 1e-3 do pico)
+KDE_MAX_GRID_SIZE = 2 ** 16
+DENSE_STRIP_BINS = 48
+
+def kde_bandwidth(values):
+    """Largura de banda de Silverman (robusta ao IQR), com piso para dados constantes"""
+    n = len(values)
+    spread = np.std(values, ddof=1) if n > 1 else 0.0
+    q75, q25 = np.percentile(values, [75, 25])
+    if q75 > q25:
+        spread = min(spread, (q75 - q25) / 1.34)
+    floor = max(abs(np.mean(values)) * 1e-3, 1e-6)
+    if spread <= floor * 1e-6:  # constante: o desvio calculado é só ruído de arredondamento
+        spread = floor
+    return 0.9 * spread * n ** -0.2
+
+def binned_kde(values, grid_size=KDE_GRID_SIZE, bandwidth=None):
+    """KDE gaussiana em grade: binning linear O(n) e convolução com o núcleo via FFT O(g log g).
+
+    A grade tem pelo menos grid_size pontos e espaçamento de no máximo h / KDE_POINTS_PER_BANDWIDTH
+    (limitada a KDE_MAX_GRID_SIZE), então o erro em relação a scipy.stats.gaussian_kde com a mesma largura
+    de banda fica abaixo de 1e-3 da densidade de pico mesmo em dados assimétricos (LogNormal), sem somar
+    n núcleos em cada ponto da grade. Retorna (grade, densidade).
+    """
+    values = np.asarray(values, dtype=float)
+    values = values[np.isfinite(values)]
+    bandwidth = kde_bandwidth(values) if bandwidth is None else bandwidth
+    low, high = values.min() - 3 * bandwidth, values.max() + 3 * bandwidth
+    needed = int(np.ceil((high - low) / bandwidth * KDE_POINTS_PER_BANDWIDTH)) + 1
+    grid_size = int(np.clip(needed, grid_size, KDE_MAX_GRID_SIZE))
+    grid = np.linspace(low, high, grid_size)
+    delta = grid[1] - grid[0]
+
+    # Binning linear: cada valor divide o peso entre os dois pontos vizinhos da grade
+    position = (values - grid[0]) / delta
+    left = np.clip(np.floor(position).astype(int), 0, grid_size - 2)
+    frac = position - left
+    counts = (np.bincount(left, 1.0 - frac, minlength=grid_size) +
+              np.bincount(left + 1, frac, minlength=grid_size))
+
+    # Núcleo truncado em ±6h e preenchimento com zeros (sem efeito circular da FFT)
+    half = min(grid_size - 1, int(np.ceil(6 * bandwidth / delta)))
+    offsets = np.arange(-half, half + 1) * delta
+    kernel = np.exp(-0.5 * (offsets / bandwidth) ** 2) / (bandwidth * np.sqrt(2 * np.pi))
+    size = grid_size + 2 * half
+    smoothed = np.fft.irfft(np.fft.rfft(counts, size) * np.fft.rfft(kernel, size), size)
+    density = np.clip(smoothed[half:half + grid_size], 0.0, None) / len(values)
+    return grid, density
+
+def strip_width(positions):
+    """Largura de cada violino: 70% do menor espaçamento entre as posições do eixo x"""
+    steps = np.diff(np.unique(np.asarray(positions, dtype=float)))
+    return 0.7 * (steps.min() if len(steps) else 1.0)
+
+def plot_replicates(ax, x, values, color, label, width=0.7):
+    """Réplicas de um grupo em x: pontos até DENSE_POINTS_THRESHOLD, violino por KDE binado acima disso"""
+    values = np.asarray(values, dtype=float)
+    if len(values) <= DENSE_POINTS_THRESHOLD:
+        return ax.scatter(
+            [x] * len(values),
+            values,
+            alpha=0.85,
+            s=100,
+            color=color,
+            edgecolors='white',
+            linewidth=1.2,
+            zorder=3,
+            label=label,
+            marker='o'
+        )
+    grid, density = binned_kde(values)
+    visible = density >= density.max() * 1e-3
+    half = density[visible] / density.max() * width / 2
+    return ax.fill_betweenx(
+        grid[visible], x - half, x + half,
+        color=color,
+        alpha=0.6,
+        edgecolor='white',
+        linewidth=1.0,
+        zorder=3,
+        label=f"{label} (n = {len(values):,})".replace(",", ".")
+    )
+
+def density_strip(values, bins=DENSE_STRIP_BINS):
+    """Faixa binada de um grupo grande: (centros, densidade relativa) de bins pontos da KDE"""
+    grid, density = binned_kde(values)
+    keep = np.linspace(0, len(grid) - 1, bins).round().astype(int)
+    return grid[keep], density[keep] / density.max()
+
+# ===================================================================
+# CACHE DE GRÁFICOS POR PARÂMETRO (TILES PNG)
+# ===================================================================
+TILE_STYLE_VERSION = 2  # incrementar sempre que o desenho dos gráficos mudar
+TILE_CACHE_SIZE = 256
+TILE_WORKERS = os.cpu_count() or 1
+# draw é uma função de módulo e args só contém arrays, números e textos: o pedido pode ir a outro processo
+TileJob = namedtuple('TileJob', ['key', 'draw', 'args'])
+VegaJob = namedtuple('VegaJob', ['key', 'build'])
+
+@st.cache_resource
+def tile_cache():
+    """PNGs já renderizados, compartilhados entre reruns e sessões (LRU de TILE_CACHE_SIZE itens)"""
+    return OrderedDict(), threading.Lock()
+
+def data_fingerprint(*parts):
+    """Hash dos dados que definem um tile: arrays, números, textos e listas deles"""
+    digest = hashlib.blake2b(digest_size=16)
+
+    def feed(part):
+        if isinstance(part, (list, tuple)):
+            digest.update(f"[{len(part)}".encode())
+            for item in part:
+                feed(item)
+            return
+        array = np.asarray(part)
+        if array.dtype == object:
+            digest.update(repr(part).encode())
+        else:
+            digest.update(f"{array.dtype}{array.shape}".encode())
+            digest.update(np.ascontiguousarray(array).tobytes())
+
+    for part in parts:
+        feed(part)
+    return digest.hexdigest()
+
+def render_tile(draw, args=(), dpi=100):
+    """Executa draw(*args) (que devolve uma figura) e codifica o resultado em PNG"""
+    fig = draw(*args)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=dpi, bbox_inches='tight')
+    plt.close(fig)
+    return buffer.getvalue()
+
+def chart_tile(study, param, fingerprint, draw, *args):
+    """Pedido do gráfico PNG de um parâmetro (draw(*args)), identificado por (estudo, parâmetro, dados, estilo)"""
+    return TileJob((study, param, fingerprint, TILE_STYLE_VERSION), draw, args)
+
+def vega_tile(study, param, fingerprint, build):
+    """Pedido do gráfico Vega-Lite de um parâmetro; build() só é chamado quando a aba do parâmetro é aberta"""
+    return VegaJob((study, param, fingerprint, 'vega'), build)
+
+def init_tile_worker():
+    """Início de cada processo de tile_pool(): backend sem tela"""
+    mpl.use('Agg')
+
+def render_named_tile(name, args):
+    """Executado nos processos de tile_pool(): a função de desenho chega pelo nome, não serializada"""
+    return render_tile(globals()[name], args)
+
+def importable_app():
+    """Este arquivo como módulo importável: o Streamlit o executa como um __main__ novo a cada rerun, e os
+    processos de spawn só encontram funções de um módulo que eles mesmos conseguem importar"""
+    folder, filename = os.path.split(os.path.abspath(__file__))
+    if folder not in sys.path:
+        sys.path.insert(0, folder)
+    return importlib.import_module(os.path.splitext(filename)[0])
+
+@st.cache_resource
+def tile_pool():
+    """Processos Agg persistentes (spawn), compartilhados entre reruns e sessões: matplotlib e o app já
+    importados, só os dados do tile vão e só o PNG volta"""
+    app = importable_app()
+    return ProcessPoolExecutor(max_workers=TILE_WORKERS, mp_context=multiprocessing.get_context('spawn'),
+                               initializer=app.init_tile_worker)
+
+def render_tiles(jobs, workers=None):
+    """PNGs dos pedidos: distribuídos entre os processos de tile_pool() quando há mais de um núcleo e de um
+    tile; senão (ou se um processo falhar) desenhados aqui, em série, com o mesmo resultado"""
+    if min(workers or TILE_WORKERS, len(jobs)) < 2:
+        return [render_tile(job.draw, job.args) for job in jobs]
+    futures = []
+    try:
+        pool = tile_pool()
+        render = importable_app().render_named_tile
+        futures = [pool.submit(render, job.draw.__name__, job.args) for job in jobs]
+    except BrokenProcessPool:
+        tile_pool.clear()  # um processo morreu: o próximo rerun inicia outro pool
+    pngs = []
+    for i, job in enumerate(jobs):
+        try:
+            pngs.append(futures[i].result())
+        except Exception:
+            pngs.append(render_tile(job.draw, job.args))
+    return pngs
+
+def resolve_tiles(jobs, workers=None):
+    """PNGs dos pedidos: os que estão em cache são reaproveitados e só os ausentes são renderizados (em paralelo)"""
+    cache, lock = tile_cache()
+    pngs = {}
+    with lock:
+        for job in jobs:
+            if job.key in cache:
+                cache.move_to_end(job.key)
+                pngs[job.key] = cache[job.key]
+    missing = list({job.key: job for job in jobs if job.key not in pngs}.values())
+    if missing:
+        rendered = render_tiles(missing, workers)
+        with lock:
+            for job, png in zip(missing, rendered):
+                pngs[job.key] = cache[job.key] = png
+            while len(cache) > TILE_CACHE_SIZE:
+                cache.popitem(last=False)
+    return [pngs[job.key] for job in jobs]
+
+def annotate_axes(ax, text, fontsize=11, color='white'):
+    """Caixa com o resultado do teste no topo do gráfico"""
+    ax.text(
+        0.5, 0.95,
+        text,
+        transform=ax.transAxes,
+        ha='center',
+        va='top',
+        fontsize=fontsize,
+        color=color,
+        bbox=dict(
+            boxstyle="round,pad=0.3",
+            facecolor='#2a2f45',
+            alpha=0.8,
+            edgecolor='none'
+        )
+    )
+    return ax
+
+def remembered_charts(key_prefix, tiles):
+    """Gráficos dos pedidos {parâmetro: tile}, guardados na sessão até a chave (dados/estilo) mudar.
+
+    Os PNGs ausentes são renderizados juntos (ver resolve_tiles) e as especificações Vega-Lite
+    só são montadas aqui.
+    """
+    store = st.session_state.setdefault(f"{key_prefix}_charts", {})
+    stale = {param: tile for param, tile in tiles.items() if param not in store or store[param][0] != tile.key}
+    png_jobs = {param: tile for param, tile in stale.items() if isinstance(tile, TileJob)}
+    for (param, tile), png in zip(png_jobs.items(), resolve_tiles(list(png_jobs.values()))):
+        store[param] = (tile.key, png)
+    for param, tile in stale.items():
+        if isinstance(tile, VegaJob):
+            store[param] = (tile.key, tile.build())
+    return {param: store[param][1] for param in tiles}
+
+def show_chart(chart):
+    """PNG (bytes) como imagem; especificação Vega-Lite direto no navegador"""
+    if isinstance(chart, bytes):
+        st.image(chart, use_container_width=True)
+    else:
+        st.vega_lite_chart(chart, use_container_width=True)
+
+def parameter_tabs(key_prefix, tiles, label_map, details=None):
+    """Uma aba por parâmetro com execução preguiçosa: trocar de aba provoca um rerun e só a aba aberta
+    desenha o gráfico e chama details(param), então a primeira exibição não cresce com os parâmetros"""
+    params = list(tiles)
+    if not params:
+        return
+    tabs = st.tabs([label_map.get(p, p) for p in params], on_change="rerun", key=f"{key_prefix}_param_tabs")
+    opened = [(param, tab) for param, tab in zip(params, tabs) if tab.open is not False]
+    charts = remembered_charts(key_prefix, {param: tiles[param] for param, _ in opened})
+    for param, tab in opened:
+        with tab:
+            show_chart(charts[param])
+            if details is not None:
+                details(param)
+
+# ===================================================================
+# GRÁFICOS DOS ESTUDOS (TILES PNG)
+# ===================================================================
+# Funções de módulo que recebem só arrays, números e textos (rótulos já traduzidos): os pedidos de
+# chart_tile podem ser desenhados nos processos de tile_pool().
+
+# Dermendzhieva: evolução ao longo dos dias de vermicompostagem
+def plot_parameter_evolution(ax, data, days, numeric_days, label, median_ci=None):
+    # Modern color palette
+    colors = ['#6f42c1', '#00c1e0', '#00d4b1', '#ffd166', '#ff6b6b']
+    width = strip_width(numeric_days)
+
+    for i, (day, num_day) in enumerate(zip(days, numeric_days)):
+        group_data = data[i]
+
+        # Plot individual points (violin for large replicate counts)
+        plot_replicates(ax, num_day, group_data, colors[i % len(colors)], f"{day.replace('Day ', 'Dia ')}", width)
+
+    # Calculate and plot medians with premium style
+    medians = [np.median(group) for group in data]
+    ax.plot(
+        numeric_days, 
+        medians, 
+        'D-', 
+        markersize=10,
+        linewidth=3,
+        color='#ffffff',
+        markerfacecolor='#6f42c1',
+        markeredgecolor='white',
+        markeredgewidth=1.5,
+        zorder=5,
+        alpha=0.95
+    )
+
+    # Bootstrap (BCa) confidence band for the medians
+    if median_ci is not None:
+        ax.fill_between(
+            numeric_days,
+            median_ci[0][:len(numeric_days)],
+            median_ci[1][:len(numeric_days)],
+            color='#a78bfa',
+            alpha=0.25,
+            zorder=2,
+            label="IC 95% da mediana (bootstrap BCa)"
+        )
+
+    # Configure X-axis with numeric days
+    ax.set_xticks(numeric_days)
+    ax.set_xticklabels([d.replace('Day ', '') for d in days], fontsize=11)
+    ax.xaxis.set_major_locator(MaxNLocator(integer=True))
+
+    # Improve formatting
+    ax.set_xlabel("Dias de Vermicompostagem", fontsize=12, fontweight='bold', labelpad=15)
+    ax.set_ylabel(label, fontsize=12, fontweight='bold', labelpad=15)
+    ax.set_title(f"Evolução do {label}", 
+                         fontsize=14, fontweight='bold', pad=20)
+
+    # Grid and style
+    ax.grid(True, alpha=0.2, linestyle='--', color='#a0a7c0', zorder=1)
+    # Adjustment: Change legend location to 'lower right' to avoid overlapping
+    ax.legend(loc='lower right', fontsize=10, framealpha=0.25) 
+
+    # Remove borders
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+
+    # Gradient background
+    ax.set_facecolor('#0c0f1d')
+
+    return ax
+
+# Function to draw one parameter tile (figure is encoded and cached by chart_tile)
+def draw_parameter_tile(data_by_day, valid_days, numeric_days, label, median_ci, annotation_text):
+    fig, ax = plt.subplots(figsize=(10, 6))
+    plot_parameter_evolution(ax, data_by_day, valid_days, numeric_days, label, median_ci=median_ci)
+    annotate_axes(ax, annotation_text)
+    plt.tight_layout()
+    return fig
+
+# Jordão: efeito da dose de vermicomposto
+def plot_parameter_by_dose(ax, data, doses, numeric_doses, label, median_ci=None, reference=None):
+    # Modern color palette
+    colors = ['#6f42c1', '#00c1e0', '#00d4b1', '#ffd166']
+    width = strip_width(numeric_doses)
+
+    for i, (dose, num_dose) in enumerate(zip(doses, numeric_doses)):
+        group_data = data[i]
+
+        # Plot individual points (violin for large replicate counts)
+        plot_replicates(ax, num_dose, group_data, colors[i % len(colors)], dose, width)
+
+    # Calculate and plot medians with premium style
+    medians = [np.median(group) for group in data]
+    ax.plot(
+        numeric_doses, 
+        medians, 
+        'D-', 
+        markersize=10,
+        linewidth=3,
+        color='#ffffff',
+        markerfacecolor='#6f42c1',
+        markeredgecolor='white',
+        markeredgewidth=1.5,
+        zorder=5,
+        alpha=0.95
+    )
+
+    # Bootstrap (BCa) confidence band for the medians
+    if median_ci is not None:
+        ax.fill_between(
+            numeric_doses,
+            median_ci[0][:len(numeric_doses)],
+            median_ci[1][:len(numeric_doses)],
+            color='#a78bfa',
+            alpha=0.25,
+            zorder=2,
+            label="IC 95% da mediana (bootstrap BCa)"
+        )
+
+    # Add reference lines for toxic levels
+    if reference is not None:
+        level, text = reference
+        ax.axhline(y=level, color='#ff6b6b', linestyle='--', alpha=0.7)
+        ax.text(5, level + 20, text, color='#ff6b6b', fontsize=10)
+
+    # Configure X-axis with numeric doses
+    ax.set_xticks(numeric_doses)
+    ax.set_xticklabels([d.replace('Dose ', '') for d in doses], fontsize=11)
+
+    # Improve formatting
+    ax.set_xlabel("Dose de Vermicomposto", fontsize=12, fontweight='bold', labelpad=15)
+    ax.set_ylabel(label, fontsize=12, fontweight='bold', labelpad=15)
+    ax.set_title(f"Efeito da Dose em {label}", 
+                 fontsize=14, fontweight='bold', pad=20)
+
+    # Grid and style
+    ax.grid(True, alpha=0.2, linestyle='--', color='#a0a7c0', zorder=1)
+    # Adjustment: Change legend location to 'lower right' to avoid overlapping
+    ax.legend(loc='lower right', fontsize=10, framealpha=0.25)
+
+    # Remove borders
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+
+    # Gradient background
+    ax.set_facecolor('#0c0f1d')
+
+    return ax
+
+# Function to draw one parameter tile (figure is encoded and cached by chart_tile)
+def draw_dose_tile(data_by_dose, valid_doses, numeric_doses, label, median_ci, annotation_text, reference=None):
+    fig, ax = plt.subplots(figsize=(10, 6))
+    plot_parameter_by_dose(ax, data_by_dose, valid_doses, numeric_doses, label, median_ci=median_ci,
+                           reference=reference)
+    annotate_axes(ax, annotation_text)
+    plt.tight_layout()
+    return fig
+
+# Sharma: comparação entre grupos
+def plot_group_comparison(ax, data, group_labels, label, median_ci=None):
+    # Paleta de cores moderna
+    colors = ['#6f42c1', '#00c1e0', '#00d4b1', '#ffd166']
+    width = strip_width(range(len(group_labels)))
+
+    for i, group_label in enumerate(group_labels):
+        group_data = data[i]
+
+        # Plotar pontos individuais (violino para muitas réplicas)
+        plot_replicates(ax, i, group_data, colors[i % len(colors)], group_label, width)
+
+        # Plotar mediana e intervalo de confiança bootstrap (BCa); sem ele, média ± IC normal
+        if median_ci is not None:
+            center = np.median(group_data)
+            yerr = np.clip([[center - median_ci[0][i]], [median_ci[1][i] - center]], 0, None)
+        else:
+            center = np.mean(group_data)
+            yerr = 1.96*np.std(group_data)/np.sqrt(len(group_data))
+
+        ax.errorbar(
+            i, center, 
+            yerr=yerr,
+            fmt='o',
+            markersize=10,
+            color='white',
+            markeredgecolor='black',
+            markeredgewidth=1.5,
+            elinewidth=3,
+            capsize=8,
+            zorder=5
+        )
+
+    # Melhorar formatação
+    ax.set_xticks(range(len(group_labels)))
+    ax.set_xticklabels(group_labels, rotation=15, ha="right", fontsize=10)
+
+    ax.set_xlabel("Tipo de Amostra", fontsize=12, fontweight='bold', labelpad=15)
+    ax.set_ylabel(label, fontsize=12, fontweight='bold', labelpad=15)
+    ax.set_title(f"Comparação de {label}", 
+                 fontsize=14, fontweight='bold', pad=20)
+
+    # Grid e estilo
+    ax.grid(True, alpha=0.2, linestyle='--', color='#a0a7c0', zorder=1)
+    # Ajuste: Mudar a localização da legenda para 'lower right' para evitar sobreposição
+    ax.legend(loc='lower right', fontsize=9, framealpha=0.25) 
+
+    # Remover bordas
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+
+    # Fundo gradiente
+    ax.set_facecolor('#0c0f1d')
+
+    return ax
+
+# Tile de um parâmetro: comparação entre grupos e matriz de Dunn (codificado e guardado por chart_tile)
+def draw_group_tile(data_by_group, groups, group_labels, label, median_ci, dunn_matrix, correction, annotation_text,
+                    color):
+    fig = plt.figure(figsize=(14, 6))
+    gs = fig.add_gridspec(1, 2, wspace=0.25, width_ratios=[3, 1.2])
+    ax = fig.add_subplot(gs[0, 0])
+    plot_group_comparison(ax, data_by_group, group_labels, label, median_ci=median_ci)
+    plot_dunn_matrix(fig.add_subplot(gs[0, 1]), dunn_matrix, groups, correction)
+    annotate_axes(ax, annotation_text, color=color)
+    plt.tight_layout()
+    return fig
+
+# Mago: comparação entre vermirreatores
+def plot_mago_parameters(ax, data, treatments, treatment_labels, label, median_ci=None):
+    colors = plt.get_cmap('viridis', len(treatments)).colors
+
+    numeric_treatments = np.arange(len(treatments))
+    width = strip_width(numeric_treatments)
+
+    for i in range(len(treatments)):
+        group_data = data[i]
+
+        # Pontos individuais (violino para muitas réplicas)
+        plot_replicates(ax, numeric_treatments[i], group_data, colors[i], treatment_labels[i], width)
+
+        # Mediana com IC 95% bootstrap (BCa); sem ele, média ± IC normal
+        if median_ci is not None:
+            center = np.median(group_data)
+            yerr = np.clip([[center - median_ci[0][i]], [median_ci[1][i] - center]], 0, None)
+        else:
+            center = np.mean(group_data)
+            yerr = 1.96*np.std(group_data)/np.sqrt(len(group_data))
+
+        ax.errorbar(
+            numeric_treatments[i], center, 
+            yerr=yerr, # IC 95%
+            fmt='o',
+            markersize=10,
+            color='white',
+            markeredgecolor='black',
+            markeredgewidth=1.5,
+            elinewidth=3,
+            capsize=8,
+            zorder=5
+        )
+
+    ax.set_xticks(numeric_treatments)
+    # Usar rótulos simplificados (VR1, VR2, etc.) para o eixo X
+    ax.set_xticklabels([t for t in treatments], rotation=45, ha="right", fontsize=9)
+
+    ax.set_xlabel("Vermireator (Proporção CD:BL)", fontsize=12, fontweight='bold', labelpad=15)
+    ax.set_ylabel(label, fontsize=12, fontweight='bold', labelpad=15)
+    ax.set_title(f"Comparação de {label} no Vermicomposto Final", 
+                 fontsize=14, fontweight='bold', pad=20)
+
+    ax.grid(True, alpha=0.2, linestyle='--', color='#a0a7c0', zorder=1)
+    ax.legend(loc='lower right', fontsize=8, framealpha=0.25, bbox_to_anchor=(1.05, 0.0))
+
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+
+    ax.set_facecolor('#0c0f1d')
+
+    return ax
+
+def draw_mago_tile(data_by_treatment, treatments, treatment_labels, label, median_ci, dunn_matrix=None,
+                   correction='Holm', annotation_text=None):
+    """Tile de um parâmetro: comparação entre tratamentos e, com resultado do teste, matriz de Dunn"""
+    fig = plt.figure(figsize=(16, 6))
+    gs = fig.add_gridspec(1, 2, wspace=0.3, width_ratios=[3, 1.2])
+    ax = fig.add_subplot(gs[0, 0])
+    plot_mago_parameters(ax, data_by_treatment, treatments, treatment_labels, label, median_ci=median_ci)
+    if dunn_matrix is not None:
+        plot_dunn_matrix(fig.add_subplot(gs[0, 1]), dunn_matrix, treatments, correction)
+    if annotation_text is not None:
+        annotate_axes(ax, annotation_text)
+    plt.tight_layout(rect=[0, 0, 0.85, 1]) # Ajusta o layout para acomodar a legenda externa
+    return fig
+
+# Hanc: evolução ao longo das camadas, um painel por tratamento
+def plot_hanc_parameter_evolution(ax, data_by_layer, layers_ordered, numeric_layers, label, treatment_label,
+                                  current_color, median_ci=None):
+    # Como estamos plotando para UM tratamento por vez, a cor (current_color) é fixa para este tratamento
+    width = strip_width(numeric_layers)
+
+    for i, (layer, num_layer) in enumerate(zip(layers_ordered, numeric_layers)):
+        group_data = data_by_layer[i]
+
+        # Pontos individuais (violino para muitas réplicas)
+        plot_replicates(ax, num_layer, group_data, current_color,
+                        f"Camada {layer.split(' ')[1]}", width) # "45 days", "90 days", etc.
+
+    # Calcular e plotar medianas com estilo premium
+    medians = [np.median(group) for group in data_by_layer]
+    ax.plot(
+        numeric_layers, 
+        medians, 
+        'D-', 
+        markersize=10,
+        linewidth=3,
+        color='#ffffff', # Linha branca para as medianas
+        markerfacecolor=current_color, # Marcador com a cor do tratamento
+        markeredgecolor='white',
+        markeredgewidth=1.5,
+        zorder=5,
+        alpha=0.95,
+        label=f"Mediana ({treatment_label})" # Adicionar label aqui
+    )
+
+    # Faixa de confiança bootstrap (BCa) das medianas
+    if median_ci is not None:
+        ax.fill_between(
+            numeric_layers,
+            median_ci[0][:len(numeric_layers)],
+            median_ci[1][:len(numeric_layers)],
+            color=current_color,
+            alpha=0.25,
+            zorder=2,
+            label="IC 95% da mediana (bootstrap BCa)"
+        )
+
+    ax.set_xticks(numeric_layers)
+    ax.set_xticklabels([f"{n} dias" for n in numeric_layers], fontsize=11)
+    ax.xaxis.set_major_locator(MaxNLocator(integer=True))
+
+    ax.set_xlabel("Idade da Camada (Dias)", fontsize=12, fontweight='bold', labelpad=15)
+    ax.set_ylabel(label, fontsize=12, fontweight='bold', labelpad=15)
+    ax.set_title(f"Evolução de {label} - {treatment_label}", 
+                 fontsize=14, fontweight='bold', pad=20)
+
+    ax.grid(True, alpha=0.2, linestyle='--', color='#a0a7c0', zorder=1)
+    ax.legend(loc='lower right', fontsize=9, framealpha=0.25) 
+
+    for spine in ax.spines.values():
+        spine.set_visible(False)
+
+    ax.set_facecolor('#0c0f1d')
+
+    return ax
+
+def draw_layer_row_tile(layers_ordered, numeric_layers, label, row_panels):
+    """Tile de um parâmetro: um painel por tratamento com (rótulo, cor, dados por camada, IC, anotação)"""
+    fig, axes = plt.subplots(1, len(row_panels), figsize=(7 * len(row_panels), 6), squeeze=False)
+    for ax, (treatment_label, color, data_by_layer, median_ci, annotation_text) in zip(axes[0], row_panels):
+        plot_hanc_parameter_evolution(ax, data_by_layer, layers_ordered, numeric_layers, label, treatment_label,
+                                      color, median_ci=median_ci)
+        if annotation_text is not None:
+            annotate_axes(ax, annotation_text, fontsize=9)
+    plt.tight_layout()
+    return fig
+
+# ===================================================================
+# GRÁFICOS INTERATIVOS (VEGA-LITE)
+# ===================================================================
+# Só os dados e uma especificação declarativa vão ao navegador: zoom e tooltip sem rerun no servidor.
+# Matplotlib continua disponível (tiles PNG) para exportação.
+CHART_BACKENDS = ['Interativo (Vega-Lite)', 'Imagem (Matplotlib)']
+CHART_COLORS = ['#6f42c1', '#00c1e0', '#00d4b1', '#ffd166', '#ff6b6b']
+
+# Mesmo tema escuro dos gráficos matplotlib (rcParams acima)
+VEGA_DARK_CONFIG = {
+    'background': '#0c0f1d',
+    'font': 'Segoe UI',
+    'view': {'fill': '#0c0f1d', 'stroke': None},
+    'axis': {
+        'domain': False,
+        'labelColor': '#a0a7c0',
+        'labelFontSize': 11,
+        'tickColor': '#a0a7c0',
+        'titleColor': '#e0e5ff',
+        'titleFontSize': 12,
+        'titleFontWeight': 'bold',
+        'titlePadding': 15,
+        'gridColor': '#a0a7c0',
+        'gridOpacity': 0.2,
+        'gridDash': [4, 4]
+    },
+    'title': {'color': '#e0e5ff', 'fontSize': 14, 'fontWeight': 600, 'subtitleFontSize': 11, 'offset': 12},
+    'legend': {'labelColor': '#e0e5ff', 'titleColor': '#e0e5ff', 'orient': 'bottom', 'columns': 3}
+}
+
+def chart_backend_input(key_prefix):
+    """Seleção do backend dos gráficos por parâmetro"""
+    return st.selectbox(
+        "Gráficos:",
+        CHART_BACKENDS,
+        index=0,
+        key=f"{key_prefix}_chart_backend",
+        help="Vega-Lite envia só os dados ao navegador (zoom e tooltip locais); Matplotlib gera imagens PNG para exportação."
+    )
+
+def json_number(value):
+    """Número para a especificação JSON (NaN/inf viram null)"""
+    value = float(value)
+    return value if np.isfinite(value) else None
+
+def vega_parameter_chart(data, labels, title, x_title, y_title, positions=None, median_ci=None,
+                         annotation=None, annotation_color='#e0e5ff', colors=None, band_color='#a78bfa',
+                         reference=None, width='container'):
+    """Especificação Vega-Lite de um parâmetro: réplicas (ou faixa binada), mediana e IC 95% BCa por grupo.
+
+    Com positions (dias, doses, camadas) o eixo x é numérico, as medianas são ligadas por uma linha e o IC é
+    uma faixa; sem positions os grupos são categorias com barra de erro, como nos gráficos matplotlib.
+    """
+    colors = colors or [CHART_COLORS[i % len(CHART_COLORS)] for i in range(len(labels))]
+    trend = positions is not None
+    x_values = list(positions) if trend else list(labels)
+    points, strips, summary = [], [], []
+    for i, (label, x, group) in enumerate(zip(labels, x_values, data)):
+        group = np.asarray(group, dtype=float)
+        group = group[~np.isnan(group)]
+        if len(group) > DENSE_POINTS_THRESHOLD:
+            centers, density = density_strip(group)
+            strips.extend({'Grupo': label, 'x': x, 'Valor': json_number(c), 'Densidade': json_number(d)}
+                          for c, d in zip(centers, density))
+        else:
+            points.extend({'Grupo': label, 'x': x, 'Valor': json_number(v)} for v in group)
+        if len(group) == 0:
+            continue
+        row = {'Grupo': label, 'x': x, 'Mediana': json_number(np.median(group))}
+        if median_ci is not None:
+            row['IC inf'], row['IC sup'] = json_number(median_ci[0][i]), json_number(median_ci[1][i])
+        summary.append(row)
+
+    if trend:
+        x_encoding = {'field': 'x', 'type': 'quantitative', 'title': x_title, 'axis': {'values': x_values}}
+    else:
+        x_encoding = {'field': 'x', 'type': 'nominal', 'title': x_title, 'sort': x_values,
+                      'axis': {'labelAngle': -15}}
+    y_title_encoding = {'type': 'quantitative', 'title': y_title, 'scale': {'zero': False}}
+
+    layers = []
+    if median_ci is not None:
+        if trend:
+            layers.append({
+                'data': {'values': summary},
+                'mark': {'type': 'area', 'color': band_color, 'opacity': 0.25},
+                'encoding': {'x': x_encoding, 'y': {'field': 'IC inf', **y_title_encoding},
+                             'y2': {'field': 'IC sup'}}
+            })
+    color_encoding = {'field': 'Grupo', 'type': 'nominal', 'title': None,
+                      'scale': {'domain': list(labels), 'range': list(colors)}}
+    if strips:
+        # Grupos grandes: um quadrado por bin, com área proporcional à densidade da KDE
+        layers.append({
+            'data': {'values': strips},
+            'mark': {'type': 'square', 'opacity': 0.6},
+            'encoding': {
+                'x': x_encoding,
+                'y': {'field': 'Valor', **y_title_encoding},
+                'size': {'field': 'Densidade', 'type': 'quantitative', 'legend': None,
+                         'scale': {'domain': [0, 1], 'range': [0, 320]}},
+                'color': color_encoding,
+                'tooltip': [{'field': 'Grupo', 'type': 'nominal'},
+                            {'field': 'Valor', 'type': 'quantitative', 'format': '.3f'},
+                            {'field': 'Densidade', 'type': 'quantitative', 'format': '.2f'}]
+            }
+        })
+    layers.append({
+        'data': {'values': points},
+        'mark': {'type': 'circle', 'size': 100, 'opacity': 0.85, 'stroke': 'white', 'strokeWidth': 1.2},
+        'encoding': {
+            'x': x_encoding,
+            'y': {'field': 'Valor', **y_title_encoding},
+            'color': color_encoding,
+            'tooltip': [{'field': 'Grupo', 'type': 'nominal'},
+                        {'field': 'Valor', 'type': 'quantitative', 'format': '.3f'}]
+        }
+    })
+    summary_tooltip = [{'field': 'Grupo', 'type': 'nominal'},
+                       {'field': 'Mediana', 'type': 'quantitative', 'format': '.3f'}]
+    if median_ci is not None:
+        summary_tooltip += [{'field': 'IC inf', 'type': 'quantitative', 'format': '.3f'},
+                            {'field': 'IC sup', 'type': 'quantitative', 'format': '.3f'}]
+        if not trend:
+            layers.append({
+                'data': {'values': summary},
+                'mark': {'type': 'errorbar', 'ticks': {'size': 16}, 'thickness': 3, 'color': 'white'},
+                'encoding': {'x': x_encoding, 'y': {'field': 'IC inf', **y_title_encoding},
+                             'y2': {'field': 'IC sup'}}
+            })
+    if trend:
+        layers.append({
+            'data': {'values': summary},
+            'mark': {'type': 'line', 'color': 'white', 'strokeWidth': 3, 'opacity': 0.95,
+                     'point': {'shape': 'diamond', 'size': 120, 'filled': True, 'fill': colors[0],
+                               'stroke': 'white', 'strokeWidth': 1.5}},
+            'encoding': {'x': x_encoding, 'y': {'field': 'Mediana', **y_title_encoding},
+                         'tooltip': summary_tooltip}
+        })
+    else:
+        layers.append({
+            'data': {'values': summary},
+            'mark': {'type': 'point', 'filled': True, 'size': 110, 'color': 'white', 'stroke': 'black',
+                     'strokeWidth': 1.5, 'opacity': 1},
+            'encoding': {'x': x_encoding, 'y': {'field': 'Mediana', **y_title_encoding},
+                         'tooltip': summary_tooltip}
+        })
+    if reference is not None:
+        level, text = reference
+        layers.append({
+            'data': {'values': [{'y': level, 'texto': text}]},
+            'layer': [
+                {'mark': {'type': 'rule', 'color': '#ff6b6b', 'strokeDash': [6, 4], 'opacity': 0.7},
+                 'encoding': {'y': {'field': 'y', 'type': 'quantitative'}}},
+                {'mark': {'type': 'text', 'color': '#ff6b6b', 'align': 'left', 'dx': 4, 'dy': -8, 'x': 0},
+                 'encoding': {'y': {'field': 'y', 'type': 'quantitative'}, 'text': {'field': 'texto'}}}
+            ]
+        })
+
+    chart_title = {'text': title}
+    if annotation:
+        chart_title.update(subtitle=annotation.split("\n"), subtitleColor=annotation_color)
+    return {'title': chart_title, 'width': width, 'height': 360, 'layer': layers,
+            'resolve': {'scale': {'color': 'independent'}}}
+
+def vega_dunn_matrix(p_matrix, labels, correction='Holm', alpha=0.05):
+    """Matriz de Dunn (triângulo inferior, p ajustado) como mapa de calor Vega-Lite, igual a plot_dunn_matrix"""
+    cells = []
+    for i, j in zip(*np.nonzero(np.tril(np.ones((len(labels), len(labels)), dtype=bool), -1))):
+        value = p_matrix[i, j]
+        if np.isnan(value):
+            continue
+        cells.append({
+            'Linha': labels[i], 'Coluna': labels[j], 'p': json_number(value),
+            'força': float(np.clip(-np.log10(max(value, 1e-300)), 0.0, 3.0)),
+            'texto': "<0.001" if value < 0.001 else f"{value:.3f}",
+            'significativo': bool(value < alpha)
+        })
+    encoding = {
+        'x': {'field': 'Coluna', 'type': 'nominal', 'sort': list(labels[:-1]), 'title': None,
+              'axis': {'labelAngle': -45}},
+        'y': {'field': 'Linha', 'type': 'nominal', 'sort': list(labels[1:]), 'title': None}
+    }
+    return {
+        'title': {'text': f"Dunn ({correction})", 'fontSize': 11},
+        'width': 180, 'height': 180,
+        'data': {'values': cells},
+        'layer': [
+            {'mark': 'rect',
+             'encoding': {**encoding,
+                          'color': {'field': 'força', 'type': 'quantitative', 'legend': None,
+                                    'scale': {'scheme': 'magma', 'domain': [0, 3]}},
+                          'tooltip': [{'field': 'Linha'}, {'field': 'Coluna'},
+                                      {'field': 'p', 'type': 'quantitative', 'format': '.4f'}]}},
+            {'mark': {'type': 'text', 'fontSize': 9},
+             'encoding': {**encoding, 'text': {'field': 'texto'},
+                          'color': {'condition': {'test': 'datum.significativo', 'value': '#00c853'},
+                                    'value': 'white'}}}
+        ]
+    }
+
+def vega_chart_row(*charts):
+    """Gráficos lado a lado (ex.: parâmetro + matriz de Dunn, ou um painel por tratamento) com o tema escuro"""
+    if len(charts) == 1:
+        return {**charts[0], 'config': VEGA_DARK_CONFIG}
+    return {
+        'hconcat': [{**chart, 'width': 480} if chart.get('width') == 'container' else chart for chart in charts],
+        'config': VEGA_DARK_CONFIG
+    }
+
+# ===================================================================
+# TELA INICIAL
+# ===================================================================
+def show_homepage():
+    """Tela inicial de seleção de artigo"""
+    st.markdown(f"""
+    <div class="header-card">
+        <h1 style="margin:0;padding:0;background:linear-gradient(135deg, #a78bfa 0%, #6f42c1 100%); -webkit-background-clip:text; -webkit-text-fill-color:transparent; font-size:2.5rem;">
+            🪱 Análise de Vermicompostos
+        </h1>
+        <p style="margin:0;padding-top:10px;color:#a0a7c0;font-size:1.1rem;">
+            Selecione um artigo abaixo para realizar a análise estatística
+        </p>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Madhubala et al. (2025) - Removido
+    
+    col1, col2, col3 = st.columns(3) # Use colunas para os próximos 3 artigos
+
+    with col1:
+        # Dermendzhieva et al. (2021) - PRIMEIRO
+        with st.container():
+            st.markdown("""
+            <div class="card-container">
+                <div class="card">
+                    <h2 style="color:#e0e5ff;">Dermendzhieva et al. (2021)</h2>
+                    <p style="color:#a0a7c0;">Análise temporal de parâmetros de vermicomposto</p>
+                    <ul class="custom-list">
+                        <li>Evolução ao longo de 120 dias</li>
+                        <li>Parâmetros: TKN, Fósforo, Potássio</li>
+                        <li>Teste de Kruskal-Wallis</li>
+                    </ul>
+                </div>
+            </div>
+            """, unsafe_allow_html=True)
+            
+            if st.button("Selecionar Dermendzhieva", key="btn_dermendzhieva", 
+                         help="Clique para selecionar este artigo",
+                         use_container_width=True,
+                         type="primary"):
+                st.session_state['selected_article'] = 'dermendzhieva'
+                st.rerun()
+    
+    with col2:
+        # Mago et al. (2021) - SEGUNDO
+        with st.container():
+            st.markdown("""
+            <div class="card-container">
+                <div class="card">
+                    <h2 style="color:#e0e5ff;">Mago et al. (2021)</h2>
+                    <p style="color:#a0a7c0;">Gestão de biomassa de resíduos de cultura de banana via vermicompostagem</p>
+                    <ul class="custom-list">
+                        <li>Análise de parâmetros físico-químicos do vermicomposto final</li>
+                        <li>Diferentes proporções de resíduos de folha de bananeira e esterco de vaca</li>
+                        <li>Teste de Kruskal-Wallis</li>
+                    </ul>
+                </div>
+            </div>
+            """, unsafe_allow_html=True)
+            if st.button("Selecionar Mago", key="btn_mago", 
+                        help="Clique para selecionar este artigo",
+                        use_container_width=True,
+                        type="primary"):
+                st.session_state['selected_article'] = 'mago'
+                st.rerun()
+
+    with col3:
+        # Hanc et al. (2021) - TERCEIRO
+        with st.container():
+            st.markdown("""
+            <div class="card-container">
+                <div class="card">
+                    <h2 style="color:#e0e5ff;">Hanc et al. (2021)</h2>
+                    <p style="color:#a0a7c0;">Conversão de borra de café em vermicomposto</p>
+                    <ul class="custom-list">
+                        <li>Análise temporal de pH, C/N, N-NH₄⁺, N-NO₃⁻, Fósforo e Potássio</li>
+                        <li>Diferentes camadas (idades) e tratamentos</li>
+                        <li>Teste de Kruskal-Wallis</li>
+                    </ul>
+                </div>
+            </div>
+            """, unsafe_allow_html=True)
+            if st.button("Selecionar Hanc", key="btn_hanc",
+                        help="Clique para selecionar este artigo",
+                        use_container_width=True,
+                        type="primary"):
+                st.session_state['selected_article'] = 'hanc'
+                st.rerun()
+
+    # Próximos dois artigos em uma nova linha
+    col4, col5, _ = st.columns(3) # A terceira coluna está vazia para manter o alinhamento
+                
+    with col4:
+        # Sharma (2019) - QUARTO
+        with st.container():
+            st.markdown("""
+            <div class="card-container">
+                <div class="card">
+                    <h2 style="color:#e0e5ff;">Sharma (2019)</h2>
+                    <p style="color:#a0a7c0;">Comparação de vermicompostos por espécie</p>
+                    <ul class="custom-list">
+                        <li>Três espécies de minhocas epigeicas</li>
+                        <li>Parâmetros: N, P, K, pH, C/N</li>
+                        <li>Comparação com solo original</li>
+                    </ul>
+                </div>
+            </div>
+            """, unsafe_allow_html=True)
+            
+            if st.button("Selecionar Sharma", key="btn_sharma", 
+                         help="Clique para selecionar este artigo",
+                         use_container_width=True,
+                         type="primary"):
+                st.session_state['selected_article'] = 'sharma'
+                st.rerun()
+
+    with col5:
+        # Jordão et al. (2007) - QUINTO
+        with st.container():
+            st.markdown("""
+            <div class="card-container">
+                <div class="card">
+                    <h2 style="color:#e0e5ff;">Jordão et al. (2007)</h2>
+                    <p style="color:#a0a7c0;">Remoção de metais pesados e cultivo de alface</p>
+                    <ul class="custom-list">
+                        <li>Comparação entre doses de vermicomposto</li>
+                        <li>Metais: Cobre, Níquel, Zinco</li>
+                        <li>Absorção por folhas e raízes</li>
+                    </ul>
+                </div>
+            </div>
+            """, unsafe_allow_html=True)
+            
+            if st.button("Selecionar Jordão", key="btn_jordao", 
+                         help="Clique para selecionar este artigo",
+                         use_container_width=True,
+                         type="primary"):
+                st.session_state['selected_article'] = 'jordao'
+                st.rerun()
+
+# ===================================================================
+# MÓDULO DERMENDZHIEVA ET AL. (2021) - ANÁLISE TEMPORAL
+# ===================================================================
+def run_dermendzhieva_analysis():
+    """Módulo de análise temporal corrigido"""
+    
+    # Mapeamento de parâmetros
+    PARAM_MAPPING = {
+        "TKN (g/kg)": "Nitrogênio Total (N)",
+        "Total P (g/kg)": "Fósforo Total (P)",
+        "TK (g/kg)": "Potássio Total (K)",
+        "pH (H₂O)": "pH",
+        "C/N ratio": "Relação C/N"
+    }
+
+    # Mapeamento de dias
+    DAY_MAPPING = {
+        'Day 1': 1,
+        'Day 30': 30,
+        'Day 60': 60,
+        'Day 90': 90, 
+        'Day 120': 120
+    }
+
+    # Médias e desvios padrão por dia (dados de exemplo)
+    SAMPLE_PARAM_DATA = {
+        'TKN (g/kg)': {
+            'Day 1': {'mean': 20.8, 'stdev': 0.5},
+            'Day 30': {'mean': 21.5, 'stdev': 0.6},
+            'Day 60': {'mean': 22.2, 'stdev': 0.7},
+            'Day 90': {'mean': 23.0, 'stdev': 0.8},
+            'Day 120': {'mean': 24.5, 'stdev': 0.9}
+        },
+        'Total P (g/kg)': {
+            'Day 1': {'mean': 12.1, 'stdev': 0.3},
+            'Day 30': {'mean': 12.8, 'stdev': 0.4},
+            'Day 60': {'mean': 13.5, 'stdev': 0.4},
+            'Day 90': {'mean': 14.2, 'stdev': 0.5},
+            'Day 120': {'mean': 15.0, 'stdev': 0.6}
+        },
+        'TK (g/kg)': {
+            'Day 1': {'mean': 1.28, 'stdev': 0.02},
+            'Day 30': {'mean': 1.29, 'stdev': 0.02},
+            'Day 60': {'mean': 1.30, 'stdev': 0.02},
+            'Day 90': {'mean': 1.31, 'stdev': 0.02},
+            'Day 120': {'mean': 1.32, 'stdev': 0.02}
+        },
+        'pH (H₂O)': {
+            'Day 1': {'mean': 7.04, 'stdev': 0.05},
+            'Day 30': {'mean': 7.00, 'stdev': 0.05},
+            'Day 60': {'mean': 6.95, 'stdev': 0.05},
+            'Day 90': {'mean': 6.90, 'stdev': 0.05},
+            'Day 120': {'mean': 6.85, 'stdev': 0.05}
+        },
+        'C/N ratio': {
+            'Day 1': {'mean': 11.2, 'stdev': 0.2},
+            'Day 30': {'mean': 10.9, 'stdev': 0.25},
+            'Day 60': {'mean': 10.5, 'stdev': 0.3},
+            'Day 90': {'mean': 10.0, 'stdev': 0.35},
+            'Day 120': {'mean': 9.5, 'stdev': 0.4}
+        }
+    }
+
+    # Correlações padrão do modo multivariado (N e P acumulam juntos; C/N cai quando N sobe)
+    DEFAULT_CORRELATIONS = {
+        ('TKN (g/kg)', 'Total P (g/kg)'): 0.6,
+        ('TKN (g/kg)', 'C/N ratio'): -0.8,
+        ('Total P (g/kg)', 'TK (g/kg)'): 0.4,
+    }
+
+    # Descrição do estudo para simulação (pH entre 0-14, concentrações e razões não-negativas)
+    def study_spec():
+        return prepare_study(
+            'dermendzhieva',
+            SAMPLE_PARAM_DATA,
+            dims=('Parameter', 'Day'),
+            ph_params=['pH (H₂O)'],
+            nonneg_params=[p for p in SAMPLE_PARAM_DATA if 'g/kg' in p or 'ratio' in p]
+        )
+
+    # Função para carregar dados de exemplo
+    @st.cache_data
+    def load_sample_data_with_stdev(distribution_type='Normal', num_replications=PUBLISHED_REPLICATIONS['dermendzhieva'],
+                                    seed=DEFAULT_SEED,
+                                    correlation=None, sampling='Pseudoaleatória'):
+        block = simulate_spec(study_spec(), num_replications, distribution_type, seed, correlation, sampling)
+        df = block_to_wide_frame(block, 'Day')
+        df.insert(1, 'Substrate', 'VC-M')
+        return df
+    
+    # Same chart as a Vega-Lite spec (rendered in the browser)
+    def parameter_chart_spec(data_by_day, valid_days, param_name, median_ci, annotation_text):
+        return vega_chart_row(vega_parameter_chart(
+            data_by_day, [day.replace('Day ', 'Dia ') for day in valid_days],
+            f"Evolução do {PARAM_MAPPING.get(param_name, param_name)}",
+            "Dias de Vermicompostagem", PARAM_MAPPING.get(param_name, param_name),
+            positions=[DAY_MAPPING[d] for d in valid_days], median_ci=median_ci, annotation=annotation_text
+        ))
 
     # Function to display results
+    # Interpretation cards (shown inside each parameter's tab)
     def display_results_interpretation(results):
-        st.markdown("""
-        <div class="card">
-            <h2 style="display:flex;align-items:center;gap:10px;">
-                <span style="background:linear-gradient(135deg, #a78bfa 0%, #6f42c1 100%);padding:5px 15px;border-radius:30px;font-size:1.2rem;">
-                    📝 Interpretação dos Resultados
-                </span>
-            </h2>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        if not results:
-            st.info("Nenhuma interpretação disponível, pois não há resultados estatísticos.")
-            return
-        
         for res in results:
             param_name = res["Parâmetro"]
             p_val = res["p-value"]
-            is_significant = p_val < 0.05 
+            p_adj = res["p ajustado"]
+            is_significant = p_adj < 0.05 
             
             card_class = "signif-card" if is_significant else "not-signif-card"
             icon = "✅" if is_significant else "❌"
@@ -544,7 +3449,7 @@ def run_dermendzhieva_analysis():
                     </div>
                     <div style="background:rgba(42, 47, 69, 0.7); padding:8px 18px; border-radius:30px; border:1px solid {title_color}30;">
                         <span style="font-weight:bold; font-size:1.1rem; color:{title_color};">{status}</span>
-                        <span style="color:#a0a7c0; margin-left:8px;">p = {p_val:.4f}</span>
+                        <span style="color:#a0a7c0; margin-left:8px;">p = {p_val:.4f} · ajustado = {p_adj:.4f}</span>
                     </div>
                 </div>
                 <div style="margin-top:20px; padding-top:15px; border-top:1px solid rgba(100, 110, 200, 0.2);">
@@ -578,12 +3483,9 @@ def run_dermendzhieva_analysis():
                             <span style="color:#ff5252; font-size:1.5rem;">•</span>
                             Não há evidências suficientes de mudanças significativas
                         </p>
-                        <p style="margin:12px 0; display:flex; align-items:center; gap:8px;">
-                            <span style="color:#ff5252; font-size:1.5rem;">•</span>
-                            O parâmetro permanece estável durante o processo de vermicompostagem
-                        </p>
                     </div>
                 """, unsafe_allow_html=True)
+                st.markdown(equivalence_note(res), unsafe_allow_html=True)
             
             st.markdown("</div></div>", unsafe_allow_html=True)
 
@@ -618,10 +3520,19 @@ def run_dermendzhieva_analysis():
     
     with col1:
         use_sample = st.checkbox("Usar dados de exemplo", value=True, key="use_sample_derm")
-        distribution_type = "LogNormal"
+        distribution_type = distribution_input("derm", default="LogNormal")
+        sampling = sampling_input("derm")
+        seed = seed_input("derm")
+        replications = replications_input("derm", PUBLISHED_REPLICATIONS['dermendzhieva'])
+        multiplicity = multiplicity_input("derm")
+        interactive = chart_backend_input("derm") == CHART_BACKENDS[0]
+    
+    correlation = correlation_input("derm", list(SAMPLE_PARAM_DATA.keys()), PARAM_MAPPING, DEFAULT_CORRELATIONS)
+    margins = equivalence_margin_input("derm", list(SAMPLE_PARAM_DATA.keys()), PARAM_MAPPING)
     
     # Load data BEFORE attempting to access columns
-    df = load_sample_data_with_stdev(distribution_type)
+    df = load_sample_data_with_stdev(distribution_type, replications, seed=seed, correlation=correlation,
+                                     sampling=sampling)
     
     with col2:
         unique_params = df['Parameter'].unique()
@@ -646,7 +3557,8 @@ def run_dermendzhieva_analysis():
     """, unsafe_allow_html=True)
     
     st.dataframe(df)
-    st.markdown(f"**Total de amostras:** {len(df)}")
+    st.markdown(f"**Total de amostras:** {len(df)} · **Semente:** {seed} · **Amostragem:** {sampling}")
+    render_export_button(df, "dermendzhieva", seed, distribution_type, sampling)
     
     # Detailed explanation of sample production
     st.markdown(f"""
@@ -663,6 +3575,7 @@ def run_dermendzhieva_analysis():
                 <ul>
                     <li><b>Distribuição Normal:</b> Assume que os dados se distribuem simetricamente em torno da média.</li>
                     <li><b>Distribuição Lognormal:</b> Frequentemente usada para dados que são estritamente positivos, assimétricos à direita e comuns em análises ambientais e biológicas. Seus logaritmos naturais seguem uma distribuição normal.</li>
+                    <li><b>Normal/LogNormal Truncada, Gama e Beta Escalonada:</b> Ajustadas para reproduzir a média e o desvio padrão publicados respeitando os limites físicos, sem acumular amostras exatamente no limite (a Beta Escalonada é usada no pH, limitado entre 0 e 14).</li>
                 </ul>
                 Aplicamos regras para garantir que os valores simulados de pH permaneçam dentro da escala lógica (0 a 14) e que as concentrações de substâncias não sejam negativas, tornando as amostras mais realistas para dados de vermicompostagem.
             </p>
@@ -688,21 +3601,13 @@ def run_dermendzhieva_analysis():
     num_plots = len(selected_params)
     
     if num_plots > 0:
-        # Create figure with additional space between subplots
-        fig = plt.figure(figsize=(10, 6 * num_plots))
-        
-        # Use GridSpec to control spacing
-        gs = fig.add_gridspec(num_plots, 1, hspace=0.6)  # Vertical space between graphs
-        
-        axes = []
-        for i in range(num_plots):
-            ax = fig.add_subplot(gs[i])
-            axes.append(ax)
+        # One chart request per parameter (drawn only when its tab is opened)
+        tiles = {}
     
-        for i, param in enumerate(selected_original_params):
+        # Collect data by day for every parameter
+        collected = []
+        for param in selected_original_params:
             param_df = df[df['Parameter'] == param]
-            
-            # Collect data by day
             data_by_day = []
             valid_days = []
             for day in days_ordered:
@@ -711,39 +3616,59 @@ def run_dermendzhieva_analysis():
                     if len(day_data) > 0:
                         data_by_day.append(day_data)
                         valid_days.append(day)
+            collected.append((data_by_day, valid_days))
+        
+        # Perform Kruskal-Wallis test for all parameters in one batch (exact and asymptotic p-values)
+        stacked = stack_groups([c[0] for c in collected])
+        # Trend tests over the ordered sampling days (Jonckheere-Terpstra and Mann-Kendall/Sen)
+        day_positions = np.full(stacked.shape[:2], np.nan)
+        for b, (_, valid_days) in enumerate(collected):
+            day_positions[b, :len(valid_days)] = [DAY_MAPPING[day] for day in valid_days]
+        # Rank battery, exact p, trend, bootstrap (BCa) CIs of medians and ε², and equivalence (TOST) backing
+        # the "stable parameter" conclusion: cached by the data, so reruns (tabs, backend) reuse them
+        margin_values, margin_relative = zip(*(margins[p] for p in selected_original_params))
+        battery, exact_p, trend, median_ci, effect_ci, equivalence, _ = parameter_tests(
+            stacked, selected_original_params, seed, margin_values, np.array(margin_relative), day_positions)
+        h_stats, p_vals = battery.kw_h, battery.kw_p
+        adjusted_p = adjust_pvalues(exact_p, multiplicity)  # família: todos os testes da rodada
+    
+        for i, param in enumerate(selected_original_params):
+            data_by_day, valid_days = collected[i]
             
-            # Perform Kruskal-Wallis test
             if len(data_by_day) >= 2:
                 try:
-                    h_stat, p_val = kruskal(*data_by_day)
+                    h_stat, p_chi2, p_val = h_stats[i], p_vals[i], exact_p[i]
                     results.append({
                         "Parâmetro": PARAM_MAPPING.get(param, param),
                         "H-Statistic": h_stat,
                         "p-value": p_val,
-                        "Significativo (p<0.05)": p_val < 0.05
+                        "p ajustado": adjusted_p[i],
+                        "p (qui-quadrado)": p_chi2,
+                        "ε²": effect_ci.estimate[i],
+                        "ε² (IC inf)": effect_ci.low[i],
+                        "ε² (IC sup)": effect_ci.high[i],
+                        "JT z": trend.jt_z[i],
+                        "p (Jonckheere)": trend.jt_p[i],
+                        "p (Mann-Kendall)": trend.mk_p[i],
+                        "Sen (inclinação)": trend.sen_slope[i],
+                        "Margem (TOST)": equivalence.margin[i],
+                        "p (TOST)": equivalence.p_value[i],
+                        "Significativo (p<0.05)": adjusted_p[i] < 0.05
                     })
                     
-                    # Plot graph
-                    ax = axes[i]
-                    plot_parameter_evolution(ax, data_by_day, valid_days, param)
-                    
-                    # Add test result
-                    annotation_text = f"Kruskal-Wallis: H = {h_stat:.2f}, p = {p_val:.4f}"
-                    ax.text(
-                        0.5, 0.95, 
-                        annotation_text,
-                        transform=ax.transAxes,
-                        ha='center',
-                        va='top',
-                        fontsize=11,
-                        color='white',
-                        bbox=dict(
-                            boxstyle="round,pad=0.3",
-                            facecolor='#2a2f45',
-                            alpha=0.8,
-                            edgecolor='none'
-                        )
-                    )
+                    # Plot graph with the test result
+                    annotation_text = (f"Kruskal-Wallis: H = {h_stat:.2f}, p exato = {p_val:.4f} (χ²: {p_chi2:.4f})\n"
+                                       f"Jonckheere: z = {trend.jt_z[i]:.2f}, p = {trend.jt_p[i]:.4f} · "
+                                       f"Sen = {trend.sen_slope[i]:.3g}/dia")
+                    ci = (median_ci.low[i], median_ci.high[i])
+                    fingerprint = data_fingerprint(stacked[i], valid_days, ci, annotation_text)
+                    if interactive:
+                        tiles[param] = vega_tile("dermendzhieva", param, fingerprint, partial(
+                            parameter_chart_spec, data_by_day, valid_days, param, ci, annotation_text))
+                    else:
+                        tiles[param] = chart_tile("dermendzhieva", param, fingerprint, draw_parameter_tile,
+                                                  data_by_day, valid_days, [DAY_MAPPING[d] for d in valid_days],
+                                                  PARAM_MAPPING.get(param, param), ci, annotation_text)
                 except Exception as e:
                     st.error(f"Erro ao processar {param}: {str(e)}")
                     continue
@@ -768,27 +3693,38 @@ def run_dermendzhieva_analysis():
     if results:
         # Format results table
         results_df = pd.DataFrame(results)
-        results_df['Significância'] = results_df['p-value'].apply(
+        results_df['Significância'] = results_df['p ajustado'].apply(
             lambda p: "✅ Sim" if p < 0.05 else "❌ Não"
         )
         
         # Reorder columns
-        results_df = results_df[['Parâmetro', 'H-Statistic', 'p-value', 'Significância']]
+        results_df = results_df[['Parâmetro', 'H-Statistic', 'p-value', 'p ajustado', 'p (qui-quadrado)', 'ε²', 'ε² (IC inf)', 'ε² (IC sup)',
+                                 'JT z', 'p (Jonckheere)', 'p (Mann-Kendall)', 'Sen (inclinação)', 'Margem (TOST)', 'p (TOST)', 'Significância']]
         
         # Style table
         st.dataframe(
             results_df.style
-            .format({"p-value": "{:.4f}", "H-Statistic": "{:.2f}"})
+            .format({"p-value": "{:.4f}", "p ajustado": "{:.4f}", "p (qui-quadrado)": "{:.4f}", "H-Statistic": "{:.2f}",
+                     "ε²": "{:.3f}", "ε² (IC inf)": "{:.3f}", "ε² (IC sup)": "{:.3f}",
+                     "JT z": "{:.2f}", "p (Jonckheere)": "{:.4f}", "p (Mann-Kendall)": "{:.4f}",
+                     "Sen (inclinação)": "{:.4g}",
+                     "Margem (TOST)": "{:.3g}", "p (TOST)": "{:.4f}"})
             .set_properties(**{
                 'color': 'white',
                 'background-color': '#131625',
             })
             .apply(lambda x: ['background: rgba(70, 80, 150, 0.3)' 
-                               if x['p-value'] < 0.05 else '' for i in x], axis=1)
+                               if x['p ajustado'] < 0.05 else '' for i in x], axis=1)
         )
     else:
         st.info("Nenhum resultado estatístico disponível.")
     
+    # Referência analítica (ANOVA/Welch) a partir da tabela do artigo
+    render_summary_tests(study_spec(), [PARAM_MAPPING], selected_original_params, PUBLISHED_REPLICATIONS['dermendzhieva'], results)
+    if results:
+        render_rank_battery(battery, [{"Parâmetro": PARAM_MAPPING.get(p, p)} for p in selected_original_params], multiplicity)
+        render_online_editor("derm", {PARAM_MAPPING.get(p, p): c for p, c in zip(selected_original_params, collected)})
+    
     # Graphs
     if num_plots > 0:
         st.markdown("""
@@ -804,13 +3740,17 @@ def run_dermendzhieva_analysis():
         # Add visual spacing between graphs
         st.markdown('<div class="graph-spacer"></div>', unsafe_allow_html=True)
         
-        # Adjust layout with additional space
-        plt.tight_layout()
-        st.pyplot(fig)
-        plt.close(fig)
+        # Chart and interpretation of the parameter in the open tab only
+        parameter_tabs("derm", tiles, PARAM_MAPPING, lambda param: display_results_interpretation(
+            [res for res in results if res["Parâmetro"] == PARAM_MAPPING.get(param, param)]))
     
-    # Interpretation
-    display_results_interpretation(results)
+    # Monte Carlo power planner
+    render_power_planner(study_spec(), "derm", [PARAM_MAPPING], selected_original_params,
+                         distribution_type=distribution_type, current_replications=replications, seed=seed, sampling=sampling,
+                         correction=multiplicity)
+    render_streaming_summary(study_spec(), "derm", [PARAM_MAPPING], selected_original_params,
+                             distribution_type=distribution_type, current_replications=replications, seed=seed,
+                             correction=multiplicity)
     
     # Bibliographic Reference (ABNT Format)
     st.markdown("""
@@ -864,164 +3804,89 @@ def run_jordao_analysis():
         'Dose 100%': 100
     }
 
-    # Function to load sample data
-    @st.cache_data
-    def load_sample_data(distribution_type='Normal'):
-        sample_data = {
-            'Dose 0%': {
-                'Cu_leaves': {'mean': 8.1, 'stdev': 1.5},
-                'Ni_leaves': {'mean': 35.3, 'stdev': 3.2},
-                'Zn_leaves': {'mean': 1074.8, 'stdev': 85},
-                'Cu_roots': {'mean': 246.3, 'stdev': 25},
-                'Ni_roots': {'mean': 587.7, 'stdev': 45},
-                'Zn_roots': {'mean': 1339.2, 'stdev': 120}
-            },
-            'Dose 25%': {
-                'Cu_leaves': {'mean': 15.2, 'stdev': 2.1},
-                'Ni_leaves': {'mean': 48.5, 'stdev': 4.3},
-                'Zn_leaves': {'mean': 1280.5, 'stdev': 95},
-                'Cu_roots': {'mean': 320.7, 'stdev': 28},
-                'Ni_roots': {'mean': 720.3, 'stdev': 52},
-                'Zn_roots': {'mean': 1580.4, 'stdev': 135}
-            },
-            'Dose 50%': {
-                'Cu_leaves': {'mean': 22.8, 'stdev': 2.8},
-                'Ni_leaves': {'mean': 62.1, 'stdev': 5.1},
-                'Zn_leaves': {'mean': 1520.3, 'stdev': 110},
-                'Cu_roots': {'mean': 410.5, 'stdev': 35},
-                'Ni_roots': {'mean': 890.7, 'stdev': 65},
-                'Zn_roots': {'mean': 1890.2, 'stdev': 150}
-            },
-            'Dose 100%': {
-                'Cu_leaves': {'mean': 38.5, 'stdev': 3.5},
-                'Ni_leaves': {'mean': 85.7, 'stdev': 6.8},
-                'Zn_leaves': {'mean': 1950.4, 'stdev': 145},
-                'Cu_roots': {'mean': 520.8, 'stdev': 42},
-                'Ni_roots': {'mean': 1150.2, 'stdev': 85},
-                'Zn_roots': {'mean': 2350.5, 'stdev': 180}
-            }
+    # Means and standard deviations by dose
+    SAMPLE_DATA = {
+        'Dose 0%': {
+            'Cu_leaves': {'mean': 8.1, 'stdev': 1.5},
+            'Ni_leaves': {'mean': 35.3, 'stdev': 3.2},
+            'Zn_leaves': {'mean': 1074.8, 'stdev': 85},
+            'Cu_roots': {'mean': 246.3, 'stdev': 25},
+            'Ni_roots': {'mean': 587.7, 'stdev': 45},
+            'Zn_roots': {'mean': 1339.2, 'stdev': 120}
+        },
+        'Dose 25%': {
+            'Cu_leaves': {'mean': 15.2, 'stdev': 2.1},
+            'Ni_leaves': {'mean': 48.5, 'stdev': 4.3},
+            'Zn_leaves': {'mean': 1280.5, 'stdev': 95},
+            'Cu_roots': {'mean': 320.7, 'stdev': 28},
+            'Ni_roots': {'mean': 720.3, 'stdev': 52},
+            'Zn_roots': {'mean': 1580.4, 'stdev': 135}
+        },
+        'Dose 50%': {
+            'Cu_leaves': {'mean': 22.8, 'stdev': 2.8},
+            'Ni_leaves': {'mean': 62.1, 'stdev': 5.1},
+            'Zn_leaves': {'mean': 1520.3, 'stdev': 110},
+            'Cu_roots': {'mean': 410.5, 'stdev': 35},
+            'Ni_roots': {'mean': 890.7, 'stdev': 65},
+            'Zn_roots': {'mean': 1890.2, 'stdev': 150}
+        },
+        'Dose 100%': {
+            'Cu_leaves': {'mean': 38.5, 'stdev': 3.5},
+            'Ni_leaves': {'mean': 85.7, 'stdev': 6.8},
+            'Zn_leaves': {'mean': 1950.4, 'stdev': 145},
+            'Cu_roots': {'mean': 520.8, 'stdev': 42},
+            'Ni_roots': {'mean': 1150.2, 'stdev': 85},
+            'Zn_roots': {'mean': 2350.5, 'stdev': 180}
         }
-        
-        num_replications = 4
-        all_data = []
-        
-        for dose, params in sample_data.items():
-            for param, stats in params.items():
-                for _ in range(num_replications):
-                    if distribution_type == 'LogNormal':
-                        mu = stats['mean']
-                        sigma = stats['stdev']
-                        if sigma <= 0:
-                            log_sigma = 0
-                            log_mu = np.log(mu)
-                        else:
-                            log_sigma = np.sqrt(np.log(1 + (sigma/mu)**2))
-                            log_mu = np.log(mu) - 0.5 * log_sigma**2
-                        value = np.random.lognormal(mean=log_mu, sigma=log_sigma)
-                    else:
-                        value = np.random.normal(stats['mean'], stats['stdev'])
-                    
-                    # Ensure non-negative values
-                    value = max(0, value)
-                    
-                    all_data.append({
-                        'Parameter': param,
-                        'Dose': dose,
-                        'Value': value
-                    })
-                    
-        return pd.DataFrame(all_data)
+    }
 
-    # Function to plot evolution by dose
-    def plot_parameter_by_dose(ax, data, doses, param_name):
-        # Convert doses to numeric for ordering
-        numeric_doses = [DOSE_MAPPING[d] for d in doses]
-        
-        # Modern color palette
-        colors = ['#6f42c1', '#00c1e0', '#00d4b1', '#ffd166']
-        
-        for i, (dose, num_dose) in enumerate(zip(doses, numeric_doses)):
-            group_data = data[i]
-            
-            # Plot individual points
-            ax.scatter(
-                [num_dose] * len(group_data), 
-                group_data, 
-                alpha=0.85, 
-                s=100,
-                color=colors[i % len(colors)],
-                edgecolors='white',
-                linewidth=1.2,
-                zorder=3,
-                label=dose,
-                marker='o'
-            )
-        
-        # Calculate and plot medians with premium style
-        medians = [np.median(group) for group in data]
-        ax.plot(
-            numeric_doses, 
-            medians, 
-            'D-', 
-            markersize=10,
-            linewidth=3,
-            color='#ffffff',
-            markerfacecolor='#6f42c1',
-            markeredgecolor='white',
-            markeredgewidth=1.5,
-            zorder=5,
-            alpha=0.95
+    # Default correlations for the multivariate mode (same metal in leaves and roots)
+    DEFAULT_CORRELATIONS = {
+        ('Cu_leaves', 'Cu_roots'): 0.7,
+        ('Ni_leaves', 'Ni_roots'): 0.7,
+        ('Zn_leaves', 'Zn_roots'): 0.7,
+    }
+
+    # Study description for simulation (ensure non-negative values)
+    def study_spec():
+        return prepare_study(
+            'jordao',
+            SAMPLE_DATA,
+            dims=('Dose', 'Parameter'),
+            order=('Parameter', 'Dose'),
+            nonneg_params=list(PARAM_MAPPING.keys())
         )
-        
-        # Add reference lines for toxic levels
-        if "Zinco" in param_name and "Folhas" in param_name:
-            ax.axhline(y=500, color='#ff6b6b', linestyle='--', alpha=0.7)
-            ax.text(5, 520, 'Nível Tóxico', color='#ff6b6b', fontsize=10)
-        
-        # Configure X-axis with numeric doses
-        ax.set_xticks(numeric_doses)
-        ax.set_xticklabels([d.replace('Dose ', '') for d in doses], fontsize=11)
-        
-        # Improve formatting
-        ax.set_xlabel("Dose de Vermicomposto", fontsize=12, fontweight='bold', labelpad=15)
-        ax.set_ylabel(PARAM_MAPPING.get(param_name, param_name), fontsize=12, fontweight='bold', labelpad=15)
-        ax.set_title(f"Efeito da Dose em {PARAM_MAPPING.get(param_name, param_name)}", 
-                     fontsize=14, fontweight='bold', pad=20)
-        
-        # Grid and style
-        ax.grid(True, alpha=0.2, linestyle='--', color='#a0a7c0', zorder=1)
-        # Adjustment: Change legend location to 'lower right' to avoid overlapping
-        ax.legend(loc='lower right', fontsize=10, framealpha=0.25)
-        
-        # Remove borders
-        for spine in ax.spines.values():
-            spine.set_visible(False)
-        
-        # Gradient background
-        ax.set_facecolor('#0c0f1d')
-        
-        return ax
+
+    # Function to load sample data
+    @st.cache_data
+    def load_sample_data(distribution_type='Normal', num_replications=PUBLISHED_REPLICATIONS['jordao'], seed=DEFAULT_SEED,
+                         correlation=None,
+                         sampling='Pseudoaleatória'):
+        block = simulate_spec(study_spec(), num_replications, distribution_type, seed, correlation, sampling)
+        return block_to_long_frame(block)
+
+    # Toxic level drawn on the chart, decided from the displayed label (same for both backends)
+    def toxic_reference(param_name):
+        label = PARAM_MAPPING.get(param_name, param_name)
+        return (500, 'Nível Tóxico') if "Zinco" in label and "Folhas" in label else None
+
+    # Same chart as a Vega-Lite spec (rendered in the browser)
+    def dose_chart_spec(data_by_dose, valid_doses, param_name, median_ci, annotation_text):
+        label = PARAM_MAPPING.get(param_name, param_name)
+        return vega_chart_row(vega_parameter_chart(
+            data_by_dose, valid_doses, f"Efeito da Dose em {label}", "Dose de Vermicomposto", label,
+            positions=[DOSE_MAPPING[d] for d in valid_doses], median_ci=median_ci, annotation=annotation_text,
+            reference=toxic_reference(param_name)
+        ))
 
     # Function to display results with specific context
+    # Interpretation cards (shown inside each parameter's tab)
     def display_results_interpretation(results):
-        st.markdown("""
-        <div class="card">
-            <h2 style="display:flex;align-items:center;gap:10px;">
-                <span style="background:linear-gradient(135deg, #a78bfa 0%, #6f42c1 100%);padding:5px 15px;border-radius:30px;font-size:1.2rem;">
-                    📝 Interpretação dos Resultados - Jordão et al. (2007)
-                </span>
-            </h2>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        if not results:
-            st.info("Nenhuma interpretação disponível, pois não há resultados estatísticos.")
-            return
-        
         for res in results:
             param_name = res["Parâmetro"]
             p_val = res["p-value"]
-            is_significant = p_val < 0.05
+            p_adj = res["p ajustado"]
+            is_significant = p_adj < 0.05
             
             card_class = "signif-card" if is_significant else "not-signif-card"
             icon = "✅" if is_significant else "❌"
@@ -1037,7 +3902,7 @@ def run_jordao_analysis():
                     </div>
                     <div style="background:rgba(42, 47, 69, 0.7); padding:8px 18px; border-radius:30px; border:1px solid {title_color}30;">
                         <span style="font-weight:bold; font-size:1.1rem; color:{title_color};">{status}</span>
-                        <span style="color:#a0a7c0; margin-left:8px;">p = {p_val:.4f}</span>
+                        <span style="color:#a0a7c0; margin-left:8px;">p = {p_val:.4f} · ajustado = {p_adj:.4f}</span>
                     </div>
                 </div>
                 <div style="margin-top:20px; padding-top:15px; border-top:1px solid rgba(100, 110, 200, 0.2);">
@@ -1098,6 +3963,7 @@ def run_jordao_analysis():
                     {metal_context}
                 </div>
                 """, unsafe_allow_html=True)
+                st.markdown(equivalence_note(res), unsafe_allow_html=True)
             
             st.markdown("</div></div>", unsafe_allow_html=True)
 
@@ -1133,14 +3999,21 @@ def run_jordao_analysis():
     with col1:
         distribution_type = st.radio(
             "Distribuição para geração de amostras:",
-            ['Normal', 'LogNormal'],
+            DISTRIBUTION_FAMILIES,
             index=1,
             key="jordao_distribution"
         )
+        sampling = sampling_input("jordao")
+        seed = seed_input("jordao")
+        replications = replications_input("jordao", PUBLISHED_REPLICATIONS['jordao'])
+        multiplicity = multiplicity_input("jordao")
+        interactive = chart_backend_input("jordao") == CHART_BACKENDS[0]
+        correlation = correlation_input("jordao", list(PARAM_MAPPING.keys()), PARAM_MAPPING, DEFAULT_CORRELATIONS)
+        margins = equivalence_margin_input("jordao", list(PARAM_MAPPING.keys()), PARAM_MAPPING)
     
     with col2:
         # Load data
-        df = load_sample_data(distribution_type)
+        df = load_sample_data(distribution_type, replications, seed=seed, correlation=correlation, sampling=sampling)
         
         # Parameter selection
         param_options = list(PARAM_MAPPING.keys())
@@ -1163,7 +4036,8 @@ def run_jordao_analysis():
     """, unsafe_allow_html=True)
     
     st.dataframe(df)
-    st.markdown(f"**Total de amostras:** {len(df)}")
+    st.markdown(f"**Total de amostras:** {len(df)} · **Semente:** {seed} · **Amostragem:** {sampling}")
+    render_export_button(df, "jordao", seed, distribution_type, sampling)
     
     # Explanation about data generation
     st.markdown(f"""
@@ -1174,7 +4048,7 @@ def run_jordao_analysis():
         <div style="margin-top:15px; color:#d7dce8; line-height:1.7;">
             <p>
                 Os dados foram simulados a partir de médias e desvios padrão reportados no estudo de Jordão et al. (2007). 
-                Para cada combinação de parâmetro e dose, foram geradas <b>4 réplicas</b> utilizando uma distribuição {distribution_type}.
+                Para cada combinação de parâmetro e dose, foram geradas <b>{replications} réplicas</b> utilizando uma distribuição {distribution_type}.
             </p>
             <p>
                 <b>Doses analisadas:</b>
@@ -1204,14 +4078,13 @@ def run_jordao_analysis():
     num_plots = len(selected_params)
     
     if num_plots > 0:
-        fig = plt.figure(figsize=(10, 6 * num_plots))
-        gs = fig.add_gridspec(num_plots, 1, hspace=0.6)
-        axes = [fig.add_subplot(gs[i]) for i in range(num_plots)]
+        # One chart request per parameter (drawn only when its tab is opened)
+        tiles = {}
     
-        for i, param in enumerate(selected_params):
+        # Collect data by dose for every parameter
+        collected = []
+        for param in selected_params:
             param_df = df[df['Parameter'] == param]
-            
-            # Collect data by dose
             data_by_dose = []
             valid_doses = []
             for dose in doses_ordered:
@@ -1219,39 +4092,60 @@ def run_jordao_analysis():
                 if len(dose_data) > 0:
                     data_by_dose.append(dose_data)
                     valid_doses.append(dose)
+            collected.append((data_by_dose, valid_doses))
+        
+        # Perform Kruskal-Wallis test for all parameters in one batch (exact and asymptotic p-values)
+        stacked = stack_groups([c[0] for c in collected])
+        # Trend tests over the ordered doses (Jonckheere-Terpstra and Mann-Kendall/Sen)
+        dose_positions = np.full(stacked.shape[:2], np.nan)
+        for b, (_, valid_doses) in enumerate(collected):
+            dose_positions[b, :len(valid_doses)] = [DOSE_MAPPING[dose] for dose in valid_doses]
+        # Rank battery, exact p, trend, bootstrap (BCa) CIs of medians and ε², and equivalence (TOST) backing
+        # the "stable parameter" conclusion: cached by the data, so reruns (tabs, backend) reuse them
+        margin_values, margin_relative = zip(*(margins[p] for p in selected_params))
+        battery, exact_p, trend, median_ci, effect_ci, equivalence, _ = parameter_tests(
+            stacked, selected_params, seed, margin_values, np.array(margin_relative), dose_positions)
+        h_stats, p_vals = battery.kw_h, battery.kw_p
+        adjusted_p = adjust_pvalues(exact_p, multiplicity)  # família: todos os testes da rodada
+    
+        for i, param in enumerate(selected_params):
+            data_by_dose, valid_doses = collected[i]
             
-            # Perform Kruskal-Wallis test
             if len(data_by_dose) >= 2:
                 try:
-                    h_stat, p_val = kruskal(*data_by_dose)
+                    h_stat, p_chi2, p_val = h_stats[i], p_vals[i], exact_p[i]
                     results.append({
                         "Parâmetro": PARAM_MAPPING.get(param, param),
                         "H-Statistic": h_stat,
                         "p-value": p_val,
-                        "Significativo (p<0.05)": p_val < 0.05
+                        "p ajustado": adjusted_p[i],
+                        "p (qui-quadrado)": p_chi2,
+                        "ε²": effect_ci.estimate[i],
+                        "ε² (IC inf)": effect_ci.low[i],
+                        "ε² (IC sup)": effect_ci.high[i],
+                        "JT z": trend.jt_z[i],
+                        "p (Jonckheere)": trend.jt_p[i],
+                        "p (Mann-Kendall)": trend.mk_p[i],
+                        "Sen (inclinação)": trend.sen_slope[i],
+                        "Margem (TOST)": equivalence.margin[i],
+                        "p (TOST)": equivalence.p_value[i],
+                        "Significativo (p<0.05)": adjusted_p[i] < 0.05
                     })
                     
-                    # Plot graph
-                    ax = axes[i]
-                    plot_parameter_by_dose(ax, data_by_dose, valid_doses, param)
-                    
-                    # Add test result
-                    annotation_text = f"Kruskal-Wallis: H = {h_stat:.2f}, p = {p_val:.4f}"
-                    ax.text(
-                        0.5, 0.95, 
-                        annotation_text,
-                        transform=ax.transAxes,
-                        ha='center',
-                        va='top',
-                        fontsize=11,
-                        color='white',
-                        bbox=dict(
-                            boxstyle="round,pad=0.3",
-                            facecolor='#2a2f45',
-                            alpha=0.8,
-                            edgecolor='none'
-                        )
-                    )
+                    # Plot graph with the test result
+                    annotation_text = (f"Kruskal-Wallis: H = {h_stat:.2f}, p exato = {p_val:.4f} (χ²: {p_chi2:.4f})\n"
+                                       f"Jonckheere: z = {trend.jt_z[i]:.2f}, p = {trend.jt_p[i]:.4f} · "
+                                       f"Sen = {trend.sen_slope[i]:.3g}/% dose")
+                    ci = (median_ci.low[i], median_ci.high[i])
+                    fingerprint = data_fingerprint(stacked[i], valid_doses, ci, annotation_text)
+                    if interactive:
+                        tiles[param] = vega_tile("jordao", param, fingerprint, partial(
+                            dose_chart_spec, data_by_dose, valid_doses, param, ci, annotation_text))
+                    else:
+                        tiles[param] = chart_tile("jordao", param, fingerprint, draw_dose_tile,
+                                                  data_by_dose, valid_doses, [DOSE_MAPPING[d] for d in valid_doses],
+                                                  PARAM_MAPPING.get(param, param), ci, annotation_text,
+                                                  toxic_reference(param))
                 except Exception as e:
                     st.error(f"Erro ao processar {param}: {str(e)}")
                     continue
@@ -1275,21 +4169,32 @@ def run_jordao_analysis():
     
     if results:
         results_df = pd.DataFrame(results)
-        results_df['Significância'] = results_df['p-value'].apply(
+        results_df['Significância'] = results_df['p ajustado'].apply(
             lambda p: "✅ Sim" if p < 0.05 else "❌ Não"
         )
-        results_df = results_df[['Parâmetro', 'H-Statistic', 'p-value', 'Significância']]
+        results_df = results_df[['Parâmetro', 'H-Statistic', 'p-value', 'p ajustado', 'p (qui-quadrado)', 'ε²', 'ε² (IC inf)', 'ε² (IC sup)',
+                                 'JT z', 'p (Jonckheere)', 'p (Mann-Kendall)', 'Sen (inclinação)', 'Margem (TOST)', 'p (TOST)', 'Significância']]
         
         st.dataframe(
             results_df.style
-            .format({"p-value": "{:.4f}", "H-Statistic": "{:.2f}"})
+            .format({"p-value": "{:.4f}", "p ajustado": "{:.4f}", "p (qui-quadrado)": "{:.4f}", "H-Statistic": "{:.2f}",
+                     "ε²": "{:.3f}", "ε² (IC inf)": "{:.3f}", "ε² (IC sup)": "{:.3f}",
+                     "JT z": "{:.2f}", "p (Jonckheere)": "{:.4f}", "p (Mann-Kendall)": "{:.4f}",
+                     "Sen (inclinação)": "{:.4g}",
+                     "Margem (TOST)": "{:.3g}", "p (TOST)": "{:.4f}"})
             .set_properties(**{'color': 'white', 'background-color': '#131625'})
             .apply(lambda x: ['background: rgba(70, 80, 150, 0.3)' 
-                            if x['p-value'] < 0.05 else '' for i in x], axis=1)
+                            if x['p ajustado'] < 0.05 else '' for i in x], axis=1)
         )
     else:
         st.info("Nenhum resultado estatístico disponível.")
     
+    # Referência analítica (ANOVA/Welch) a partir da tabela do artigo
+    render_summary_tests(study_spec(), [PARAM_MAPPING], selected_params, PUBLISHED_REPLICATIONS['jordao'], results)
+    if results:
+        render_rank_battery(battery, [{"Parâmetro": PARAM_MAPPING.get(p, p)} for p in selected_params], multiplicity)
+        render_online_editor("jordao", {PARAM_MAPPING.get(p, p): c for p, c in zip(selected_params, collected)})
+    
     # Graphs
     if num_plots > 0:
         st.markdown("""
@@ -1302,13 +4207,21 @@ def run_jordao_analysis():
         </div>
         """, unsafe_allow_html=True)
         
-        plt.tight_layout()
-        st.pyplot(fig)
-        plt.close(fig)
+        # Chart and interpretation of the parameter in the open tab only
+        parameter_tabs("jordao", tiles, PARAM_MAPPING, lambda param: display_results_interpretation(
+            [res for res in results if res["Parâmetro"] == PARAM_MAPPING.get(param, param)]))
     
-    # Interpretation
-    if results:
-        display_results_interpretation(results)
+    # Bayesian comparison from the published means/SDs
+    render_bayes_comparison(study_spec(), "jordao", [PARAM_MAPPING], selected_params,
+                            PUBLISHED_REPLICATIONS['jordao'], seed)
+    
+    # Monte Carlo power planner
+    render_power_planner(study_spec(), "jordao", [PARAM_MAPPING], selected_params,
+                         distribution_type=distribution_type, current_replications=replications, seed=seed, sampling=sampling,
+                         correction=multiplicity)
+    render_streaming_summary(study_spec(), "jordao", [PARAM_MAPPING], selected_params,
+                             distribution_type=distribution_type, current_replications=replications, seed=seed,
+                             correction=multiplicity)
     
     # Bibliographic Reference
     st.markdown("""
@@ -1411,111 +4324,53 @@ def run_sharma_analysis():
         "Original": "Solo original (controle)"
     }
 
+    # Correlações padrão do modo multivariado (C/N = OC / N)
+    DEFAULT_CORRELATIONS = {
+        ("OC", "N"): 0.5,
+        ("OC", "C_N_ratio"): 0.4,
+        ("N", "C_N_ratio"): -0.8,
+        ("Ca", "Mg"): 0.5,
+    }
+
+    # Descrição do estudo para simulação (garantir valores fisicamente possíveis)
+    def study_spec():
+        return prepare_study(
+            'sharma',
+            VERMICOMPOST_DATA,
+            dims=('Group', 'Parameter'),
+            order=('Parameter', 'Group'),
+            ph_params=["pH"],
+            nonneg_params=["OC", "N", "P", "K", "Ca", "Mg"]
+        )
+
     # Função para carregar dados de exemplo
     @st.cache_data
-    def load_sample_data(num_replications=5):
-        all_data = []
-        for group, params in VERMICOMPOST_DATA.items():
-            for param, (mean, stdev) in params.items():
-                for _ in range(num_replications):
-                    # Gerar valor com distribuição normal
-                    value = np.random.normal(mean, stdev)
-                    # Garantir valores fisicamente possíveis
-                    if param == "pH":
-                        value = np.clip(value, 0, 14)
-                    elif param in ["OC", "N", "P", "K", "Ca", "Mg"]:
-                        value = max(0, value)
-                    
-                    all_data.append({
-                        "Parameter": param,
-                        "Group": group,
-                        "Value": value
-                    })
-                    
-        return pd.DataFrame(all_data)
+    def load_sample_data(num_replications=PUBLISHED_REPLICATIONS['sharma'], seed=DEFAULT_SEED, distribution_type='Normal',
+                         correlation=None, derive_cn=False, sampling='Pseudoaleatória'):
+        block = simulate_spec(study_spec(), num_replications, distribution_type, seed, correlation, sampling)
+        if derive_cn:
+            # Razão C/N derivada do carbono e nitrogênio simulados em cada réplica
+            block = derive_ratio(block, "C_N_ratio", "OC", "N")
+        return block_to_long_frame(block)
 
-    # Função para plotar comparação entre grupos
-    def plot_group_comparison(ax, data, groups, param_name):
-        # Paleta de cores moderna
-        colors = ['#6f42c1', '#00c1e0', '#00d4b1', '#ffd166']
-        
-        for i, group in enumerate(groups):
-            group_data = data[i]
-            
-            # Plotar pontos individuais
-            ax.scatter(
-                [i] * len(group_data), 
-                group_data, 
-                alpha=0.85, 
-                s=100,
-                color=colors[i % len(colors)],
-                edgecolors='white',
-                linewidth=1.2,
-                zorder=3,
-                label=GROUP_DESCRIPTIONS[group],
-                marker='o'
-            )
-            
-            # Plotar média e intervalo de confiança
-            mean_val = np.mean(group_data)
-            std_val = np.std(group_data)
-            
-            ax.errorbar(
-                i, mean_val, 
-                yerr=1.96*std_val/np.sqrt(len(group_data)),
-                fmt='o',
-                markersize=10,
-                color='white',
-                markeredgecolor='black',
-                markeredgewidth=1.5,
-                elinewidth=3,
-                capsize=8,
-                zorder=5
-            )
-        
-        # Melhorar formatação
-        ax.set_xticks(range(len(groups)))
-        ax.set_xticklabels([GROUP_DESCRIPTIONS[g] for g in groups], rotation=15, ha="right", fontsize=10)
-        
-        ax.set_xlabel("Tipo de Amostra", fontsize=12, fontweight='bold', labelpad=15)
-        ax.set_ylabel(PARAM_MAPPING.get(param_name, param_name), fontsize=12, fontweight='bold', labelpad=15)
-        ax.set_title(f"Comparação de {PARAM_MAPPING.get(param_name, param_name)}", 
-                     fontsize=14, fontweight='bold', pad=20)
-        
-        # Grid e estilo
-        ax.grid(True, alpha=0.2, linestyle='--', color='#a0a7c0', zorder=1)
-        # Ajuste: Mudar a localização da legenda para 'lower right' para evitar sobreposição
-        ax.legend(loc='lower right', fontsize=9, framealpha=0.25) 
-        
-        # Remover bordas
-        for spine in ax.spines.values():
-            spine.set_visible(False)
-        
-        # Fundo gradiente
-        ax.set_facecolor('#0c0f1d')
-        
-        return ax
+    # O mesmo gráfico como especificação Vega-Lite (desenhada no navegador)
+    def group_chart_spec(data_by_group, param_name, median_ci, dunn_matrix, correction, annotation_text, color):
+        label = PARAM_MAPPING.get(param_name, param_name)
+        return vega_chart_row(
+            vega_parameter_chart(data_by_group, [GROUP_DESCRIPTIONS[g] for g in groups], f"Comparação de {label}",
+                                 "Tipo de Amostra", label, median_ci=median_ci, annotation=annotation_text,
+                                 annotation_color=color),
+            vega_dunn_matrix(dunn_matrix, groups, correction)
+        )
 
     # Função para exibir resultados
+    # Cartões de interpretação (exibidos na aba de cada parâmetro)
     def display_results_interpretation(results):
-        st.markdown("""
-        <div class="card">
-            <h2 style="display:flex;align-items:center;gap:10px;">
-                <span style="background:linear-gradient(135deg, #a78bfa 0%, #6f42c1 100%);padding:5px 15px;border-radius:30px;font-size:1.2rem;">
-                    📝 Interpretação dos Resultados
-                </span>
-            </h2>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        if not results:
-            st.info("Nenhuma interpretação disponível.")
-            return
-        
         for res in results:
             param_name = res["Parâmetro"]
             p_val = res["p-value"]
-            is_significant = p_val < 0.05
+            p_adj = res["p ajustado"]
+            is_significant = p_adj < 0.05
             
             card_class = "signif-card" if is_significant else "not-signif-card"
             icon = "✅" if is_significant else "❌"
@@ -1531,7 +4386,7 @@ def run_sharma_analysis():
                     </div>
                     <div style="background:rgba(42, 47, 69, 0.7); padding:8px 18px; border-radius:30px; border:1px solid {title_color}30;">
                         <span style="font-weight:bold; font-size:1.1rem; color:{title_color};">{status}</span>
-                        <span style="color:#a0a7c0; margin-left:8px;">p = {p_val:.4f}</span>
+                        <span style="color:#a0a7c0; margin-left:8px;">p = {p_val:.4f} · ajustado = {p_adj:.4f}</span>
                     </div>
                 </div>
                 <div style="margin-top:20px; padding-top:15px; border-top:1px solid rgba(100, 110, 200, 0.2);">
@@ -1574,6 +4429,7 @@ def run_sharma_analysis():
                         </p>
                     </div>
                 """, unsafe_allow_html=True)
+                st.markdown(equivalence_note(res), unsafe_allow_html=True)
             
             st.markdown("</div></div>", unsafe_allow_html=True)
 
@@ -1617,7 +4473,22 @@ def run_sharma_analysis():
     """, unsafe_allow_html=True)
     
     # Load data
-    df = load_sample_data()
+    col1, col2 = st.columns(2)
+    with col1:
+        distribution_type = distribution_input("sharma")
+        sampling = sampling_input("sharma")
+    with col2:
+        seed = seed_input("sharma")
+        replications = replications_input("sharma", PUBLISHED_REPLICATIONS['sharma'])
+        multiplicity = multiplicity_input("sharma")
+        interactive = chart_backend_input("sharma") == CHART_BACKENDS[0]
+    correlation = correlation_input("sharma", list(PARAM_MAPPING.keys()), PARAM_MAPPING, DEFAULT_CORRELATIONS)
+    margins = equivalence_margin_input("sharma", list(PARAM_MAPPING.keys()), PARAM_MAPPING)
+    derive_cn = False
+    if correlation is not None:
+        derive_cn = st.checkbox("Calcular a Razão C/N a partir do C e N simulados", value=True, key="sharma_derive_cn")
+    df = load_sample_data(replications, seed=seed, distribution_type=distribution_type,
+                          correlation=correlation, derive_cn=derive_cn, sampling=sampling)
     
     # Data Preview
     st.markdown("""
@@ -1631,10 +4502,11 @@ def run_sharma_analysis():
     """, unsafe_allow_html=True)
     
     st.dataframe(df)
-    st.markdown(f"**Total de amostras:** {len(df)}")
+    st.markdown(f"**Total de amostras:** {len(df)} · **Semente:** {seed} · **Amostragem:** {sampling}")
+    render_export_button(df, "sharma", seed, distribution_type, sampling)
     
     # Explanation about data generation
-    st.markdown("""
+    st.markdown(f"""
     <div class="info-card">
         <h3 style="display:flex;align-items:center;color:#00c1e0;">
             <span class="info-icon">ℹ️</span> Metodologia de Análise
@@ -1642,7 +4514,7 @@ def run_sharma_analysis():
         <div style="margin-top:15px; color:#d7dce8; line-height:1.7;">
             <p>
                 Os dados foram gerados com base nas médias e desvios padrão reportados no estudo de Sharma (2019). 
-                Para cada combinação de parâmetro e grupo, foram simuladas <b>5 réplicas</b> utilizando uma distribuição normal.
+                Para cada combinação de parâmetro e grupo, foram simuladas <b>{replications} réplicas</b> utilizando uma distribuição {distribution_type}.
             </p>
             <p>
                 <b>Grupos analisados:</b>
@@ -1681,6 +4553,7 @@ def run_sharma_analysis():
         default=param_options[:5],
         key="sharma_param_select"
     )
+    correction = posthoc_correction_input("sharma")
     
     # Perform Analysis
     if not selected_params:
@@ -1698,53 +4571,65 @@ def run_sharma_analysis():
     num_plots = len(selected_params)
     
     if num_plots > 0:
-        fig = plt.figure(figsize=(10, 6 * num_plots))
-        gs = fig.add_gridspec(num_plots, 1, hspace=0.6)
-        axes = [fig.add_subplot(gs[i]) for i in range(num_plots)]
+        # Um pedido de gráfico por parâmetro (desenhado só quando a aba dele é aberta)
+        tiles = {}
     
-        for i, param in enumerate(selected_original_params):
+        # Coletar dados por grupo para todos os parâmetros
+        collected = []
+        for param in selected_original_params:
             param_df = df[df['Parameter'] == param]
-            
-            # Collect data by group
             data_by_group = []
             for group in groups:
                 group_data = param_df[param_df['Group'] == group]['Value'].values
                 data_by_group.append(group_data)
+            collected.append(data_by_group)
+        
+        # Teste de Kruskal-Wallis para todos os parâmetros em um único lote (p exato e assintótico)
+        stacked = stack_groups(collected)
+        # Bateria por postos, p exato, IC bootstrap (BCa) das medianas e do ε², equivalência (TOST) e pós-teste
+        # de Dunn (todos os pares) com os mesmos postos: em cache pelos dados, reaproveitados nos reruns
+        margin_values, margin_relative = zip(*(margins[p] for p in selected_original_params))
+        battery, exact_p, _, median_ci, effect_ci, equivalence, dunn_p = parameter_tests(
+            stacked, selected_original_params, seed, margin_values, np.array(margin_relative), dunn=True)
+        h_stats, p_vals = battery.kw_h, battery.kw_p
+        adjusted_p = adjust_pvalues(exact_p, multiplicity)  # família: todos os testes da rodada
+        dunn_adjusted = adjust_pairwise(dunn_p, correction)
+    
+        for i, param in enumerate(selected_original_params):
+            data_by_group = collected[i]
             
-            # Perform Kruskal-Wallis test
             try:
-                h_stat, p_val = kruskal(*data_by_group)
+                h_stat, p_chi2, p_val = h_stats[i], p_vals[i], exact_p[i]
                 results.append({
                     "Parâmetro": PARAM_MAPPING[param],
                     "H-Statistic": h_stat,
                     "p-value": p_val,
-                    "Significativo (p<0.05)": p_val < 0.05
+                    "p ajustado": adjusted_p[i],
+                    "p (qui-quadrado)": p_chi2,
+                    "ε²": effect_ci.estimate[i],
+                    "ε² (IC inf)": effect_ci.low[i],
+                    "ε² (IC sup)": effect_ci.high[i],
+                    "Margem (TOST)": equivalence.margin[i],
+                    "p (TOST)": equivalence.p_value[i],
+                    "Significativo (p<0.05)": adjusted_p[i] < 0.05
                 })
                 
-                # Plot graph
-                ax = axes[i]
-                plot_group_comparison(ax, data_by_group, groups, param)
-                
-                # Add test result
-                significance = "SIGNIFICATIVO" if p_val < 0.05 else "NÃO SIGNIFICATIVO"
-                color = "#00c853" if p_val < 0.05 else "#ff5252"
+                # Plot graph with the test result
+                significance = "SIGNIFICATIVO" if adjusted_p[i] < 0.05 else "NÃO SIGNIFICATIVO"
+                color = "#00c853" if adjusted_p[i] < 0.05 else "#ff5252"
                 
-                annotation_text = f"Kruskal-Wallis: H = {h_stat:.2f}, p = {p_val:.4f} ({significance})"
-                ax.text(
-                    0.5, 0.95, 
-                    annotation_text,
-                    transform=ax.transAxes,
-                    ha='center',
-                    va='top',
-                    fontsize=11,
-                    color=color,
-                    bbox=dict(
-                        boxstyle="round,pad=0.3",
-                        facecolor='#2a2f45',
-                        alpha=0.8,
-                        edgecolor='none'
-                    )
-                )
+                annotation_text = f"Kruskal-Wallis: H = {h_stat:.2f}, p exato = {p_val:.4f} (χ²: {p_chi2:.4f}) ({significance})"
+                ci = (median_ci.low[i], median_ci.high[i])
+                fingerprint = data_fingerprint(stacked[i], ci, dunn_adjusted[i], correction, annotation_text, color)
+                if interactive:
+                    tiles[param] = vega_tile("sharma", param, fingerprint, partial(
+                        group_chart_spec, data_by_group, param, ci, dunn_adjusted[i], correction, annotation_text,
+                        color))
+                else:
+                    tiles[param] = chart_tile("sharma", param, fingerprint, draw_group_tile,
+                                              data_by_group, groups, [GROUP_DESCRIPTIONS[g] for g in groups],
+                                              PARAM_MAPPING.get(param, param), ci, dunn_adjusted[i], correction,
+                                              annotation_text, color)
             except Exception as e:
                 st.error(f"Erro ao processar {param}: {str(e)}")
                 continue
@@ -1762,24 +4647,33 @@ def run_sharma_analysis():
     
     if results:
         results_df = pd.DataFrame(results)
-        results_df['Significância'] = results_df['p-value'].apply(
+        results_df['Significância'] = results_df['p ajustado'].apply(
             lambda p: "✅ Sim" if p < 0.05 else "❌ Não"
         )
-        results_df = results_df[['Parâmetro', 'H-Statistic', 'p-value', 'Significância']]
+        results_df = results_df[['Parâmetro', 'H-Statistic', 'p-value', 'p ajustado', 'p (qui-quadrado)', 'ε²', 'ε² (IC inf)', 'ε² (IC sup)', 'Margem (TOST)', 'p (TOST)', 'Significância']]
         
         st.dataframe(
             results_df.style
-            .format({"p-value": "{:.4f}", "H-Statistic": "{:.2f}"})
+            .format({"p-value": "{:.4f}", "p ajustado": "{:.4f}", "p (qui-quadrado)": "{:.4f}", "H-Statistic": "{:.2f}",
+                     "ε²": "{:.3f}", "ε² (IC inf)": "{:.3f}", "ε² (IC sup)": "{:.3f}",
+                     "Margem (TOST)": "{:.3g}", "p (TOST)": "{:.4f}"})
             .set_properties(**{
                 'color': 'white',
                 'background-color': '#131625',
             })
             .apply(lambda x: ['background: rgba(70, 80, 150, 0.3)' 
-                               if x['p-value'] < 0.05 else '' for i in x], axis=1)
+                               if x['p ajustado'] < 0.05 else '' for i in x], axis=1)
         )
     else:
         st.info("Nenhum resultado estatístico disponível.")
     
+    # Referência analítica (ANOVA/Welch) a partir da tabela do artigo
+    render_summary_tests(study_spec(), [PARAM_MAPPING], selected_original_params, PUBLISHED_REPLICATIONS['sharma'], results)
+    if results:
+        render_rank_battery(battery, [{"Parâmetro": PARAM_MAPPING[p]} for p in selected_original_params], multiplicity)
+        render_online_editor("sharma", {PARAM_MAPPING[p]: (c, [GROUP_DESCRIPTIONS[g] for g in groups])
+                                        for p, c in zip(selected_original_params, collected)})
+    
     # Graphs
     if num_plots > 0:
         st.markdown("""
@@ -1792,12 +4686,21 @@ def run_sharma_analysis():
         </div>
         """, unsafe_allow_html=True)
         
-        plt.tight_layout()
-        st.pyplot(fig)
-        plt.close(fig)
+        # Gráfico e interpretação só do parâmetro da aba aberta
+        parameter_tabs("sharma", tiles, PARAM_MAPPING, lambda param: display_results_interpretation(
+            [res for res in results if res["Parâmetro"] == PARAM_MAPPING[param]]))
+    
+    # Comparação bayesiana a partir das médias e desvios publicados
+    render_bayes_comparison(study_spec(), "sharma", [PARAM_MAPPING], selected_original_params,
+                            PUBLISHED_REPLICATIONS['sharma'], seed)
     
-    # Interpretation
-    display_results_interpretation(results)
+    # Planejamento de poder (Monte Carlo)
+    render_power_planner(study_spec(), "sharma", [PARAM_MAPPING], selected_original_params,
+                         distribution_type=distribution_type, current_replications=replications, seed=seed, sampling=sampling,
+                         correction=multiplicity)
+    render_streaming_summary(study_spec(), "sharma", [PARAM_MAPPING, GROUP_DESCRIPTIONS], selected_original_params,
+                             distribution_type=distribution_type, current_replications=replications, seed=seed,
+                             correction=multiplicity)
     
     # Study conclusion
     st.markdown("""
@@ -1910,107 +4813,54 @@ def run_mago_analysis():
         "VR5": "20% CD : 80% BL"
     }
 
+    # Correlações padrão do modo multivariado (TOC é derivado da matéria orgânica)
+    DEFAULT_CORRELATIONS = {
+        ("OM", "TOC"): 0.95,
+        ("TKN", "TAP"): 0.5,
+        ("TAP", "TK"): 0.5,
+    }
+
+    # A Tabela 3 informa erro padrão (SEM, n=3): convertido para desvio padrão antes de simular e testar.
+    # Desvio padrão ausente (None) é estimado como 1% da média;
+    # valores não-negativos garantidos para todas as concentrações
+    def study_spec():
+        return prepare_study(
+            'mago',
+            VERMICOMPOST_FINAL_DATA,
+            dims=('Parameter', 'Treatment'),
+            nonneg_params=list(VERMICOMPOST_FINAL_DATA.keys()),
+            missing_stdev=0.01,
+            dispersion='sem',
+            sample_size=3
+        )
+
     @st.cache_data
-    def load_mago_data(num_replications=3): # N=30 no artigo, mas indica n=3 para as médias.
-        all_data = []
-        for param, treatments_data in VERMICOMPOST_FINAL_DATA.items():
-            for treatment, (mean, stdev) in treatments_data.items():
-                for _ in range(num_replications):
-                    # Usar o desvio padrão fornecido, ou estimar um pequeno se for None
-                    if stdev is None:
-                        # Estimar um pequeno desvio padrão se não for fornecido
-                        # Por exemplo, 1% da média ou um valor fixo pequeno
-                        sim_stdev = mean * 0.01 if mean != 0 else 0.01
-                    else:
-                        sim_stdev = stdev
-                    
-                    value = np.random.normal(mean, sim_stdev)
-                    
-                    # Garantir valores não-negativos para concentrações
-                    value = max(0.0, value)
-                    
-                    all_data.append({
-                        "Parameter": param,
-                        "Treatment": treatment,
-                        "Value": value
-                    })
-        return pd.DataFrame(all_data)
+    def load_mago_data(num_replications=PUBLISHED_REPLICATIONS['mago'], seed=DEFAULT_SEED, distribution_type='Normal',
+                       correlation=None,
+                       sampling='Pseudoaleatória'): # N=30 no artigo, mas indica n=3 para as médias.
+        block = simulate_spec(study_spec(), num_replications, distribution_type, seed, correlation, sampling)
+        return block_to_long_frame(block)
 
-    def plot_mago_parameters(ax, data, treatments, param_name):
-        colors = plt.cm.get_cmap('viridis', len(treatments)).colors
-        
-        numeric_treatments = np.arange(len(treatments))
-        
-        for i, treatment in enumerate(treatments):
-            group_data = data[i]
-            
-            ax.scatter(
-                [numeric_treatments[i]] * len(group_data), 
-                group_data, 
-                alpha=0.85, 
-                s=100,
-                color=colors[i],
-                edgecolors='white',
-                linewidth=1.2,
-                zorder=3,
-                label=TREATMENT_DESCRIPTIONS[treatment],
-                marker='o'
-            )
-            
-            mean_val = np.mean(group_data)
-            std_val = np.std(group_data)
-            
-            ax.errorbar(
-                numeric_treatments[i], mean_val, 
-                yerr=1.96*std_val/np.sqrt(len(group_data)), # IC 95%
-                fmt='o',
-                markersize=10,
-                color='white',
-                markeredgecolor='black',
-                markeredgewidth=1.5,
-                elinewidth=3,
-                capsize=8,
-                zorder=5
-            )
-        
-        ax.set_xticks(numeric_treatments)
-        # Usar rótulos simplificados (VR1, VR2, etc.) para o eixo X
-        ax.set_xticklabels([t for t in treatments], rotation=45, ha="right", fontsize=9)
-        
-        ax.set_xlabel("Vermireator (Proporção CD:BL)", fontsize=12, fontweight='bold', labelpad=15)
-        ax.set_ylabel(PARAM_MAPPING.get(param_name, param_name), fontsize=12, fontweight='bold', labelpad=15)
-        ax.set_title(f"Comparação de {PARAM_MAPPING.get(param_name, param_name)} no Vermicomposto Final", 
-                     fontsize=14, fontweight='bold', pad=20)
-        
-        ax.grid(True, alpha=0.2, linestyle='--', color='#a0a7c0', zorder=1)
-        ax.legend(loc='lower right', fontsize=8, framealpha=0.25, bbox_to_anchor=(1.05, 0.0))
-        
-        for spine in ax.spines.values():
-            spine.set_visible(False)
-        
-        ax.set_facecolor('#0c0f1d')
-        
-        return ax
+    def mago_chart_spec(data_by_treatment, param_name, median_ci, dunn_matrix=None, correction='Holm',
+                        annotation_text=None):
+        """O mesmo tile como especificação Vega-Lite (desenhada no navegador)"""
+        label = PARAM_MAPPING.get(param_name, param_name)
+        colors = [mpl.colors.to_hex(c) for c in plt.get_cmap('viridis', len(treatments_ordered)).colors]
+        charts = [vega_parameter_chart(data_by_treatment, treatments_ordered,
+                                       f"Comparação de {label} no Vermicomposto Final",
+                                       "Vermireator (Proporção CD:BL)", label, median_ci=median_ci,
+                                       annotation=annotation_text, colors=colors)]
+        if dunn_matrix is not None:
+            charts.append(vega_dunn_matrix(dunn_matrix, treatments_ordered, correction))
+        return vega_chart_row(*charts)
 
+    # Cartões de interpretação (exibidos na aba de cada parâmetro)
     def display_mago_interpretation(results):
-        st.markdown("""
-        <div class="card">
-            <h2 style="display:flex;align-items:center;gap:10px;">
-                <span style="background:linear-gradient(135deg, #a78bfa 0%, #6f42c1 100%);padding:5px 15px;border-radius:30px;font-size:1.2rem;">
-                    📝 Interpretação dos Resultados - Mago et al. (2021)
-                </span>
-            </h2>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        if not results:
-            st.info("Nenhuma interpretação disponível, pois não há resultados estatísticos.")
-            return
-        
         for res in results:
             param_name = res["Parâmetro"]
             p_val = res["p-value"]
-            is_significant = p_val < 0.05
+            p_adj = res["p ajustado"]
+            is_significant = p_adj < 0.05
             
             card_class = "signif-card" if is_significant else "not-signif-card"
             icon = "✅" if is_significant else "❌"
@@ -2026,7 +4876,7 @@ def run_mago_analysis():
                     </div>
                     <div style="background:rgba(42, 47, 69, 0.7); padding:8px 18px; border-radius:30px; border:1px solid {title_color}30;">
                         <span style="font-weight:bold; font-size:1.1rem; color:{title_color};">{status}</span>
-                        <span style="color:#a0a7c0; margin-left:8px;">p = {p_val:.4f}</span>
+                        <span style="color:#a0a7c0; margin-left:8px;">p = {p_val:.4f} · ajustado = {p_adj:.4f}</span>
                     </div>
                 </div>
                 <div style="margin-top:20px; padding-top:15px; border-top:1px solid rgba(100, 110, 200, 0.2);">
@@ -2062,6 +4912,7 @@ def run_mago_analysis():
                     </p>
                 </div>
                 """, unsafe_allow_html=True)
+                st.markdown(equivalence_note(res), unsafe_allow_html=True)
             
             st.markdown("</div></div>", unsafe_allow_html=True)
 
@@ -2095,6 +4946,12 @@ def run_mago_analysis():
 
     with col1:
         st.write("Os dados são carregados e simulados a partir da Tabela 3 do artigo.")
+        distribution_type = distribution_input("mago")
+        sampling = sampling_input("mago")
+        seed = seed_input("mago")
+        replications = replications_input("mago", PUBLISHED_REPLICATIONS['mago'])
+        multiplicity = multiplicity_input("mago")
+        interactive = chart_backend_input("mago") == CHART_BACKENDS[0]
     
     with col2:
         param_options = list(PARAM_MAPPING.values())
@@ -2104,8 +4961,12 @@ def run_mago_analysis():
             default=param_options, # Seleciona todos por padrão
             key="mago_param_select"
         )
+        correction = posthoc_correction_input("mago")
     
-    df = load_mago_data()
+    correlation = correlation_input("mago", list(VERMICOMPOST_FINAL_DATA.keys()), PARAM_MAPPING, DEFAULT_CORRELATIONS)
+    margins = equivalence_margin_input("mago", list(VERMICOMPOST_FINAL_DATA.keys()), PARAM_MAPPING)
+    df = load_mago_data(replications, seed=seed, distribution_type=distribution_type, correlation=correlation,
+                        sampling=sampling)
 
     st.markdown("""
     <div class="card">
@@ -2118,9 +4979,10 @@ def run_mago_analysis():
     """, unsafe_allow_html=True)
     
     st.dataframe(df)
-    st.markdown(f"**Total de amostras simuladas:** {len(df)}")
+    st.markdown(f"**Total de amostras simuladas:** {len(df)} · **Semente:** {seed} · **Amostragem:** {sampling}")
+    render_export_button(df, "mago", seed, distribution_type, sampling)
 
-    st.markdown("""
+    st.markdown(f"""
     <div class="info-card">
         <h3 style="display:flex;align-items:center;color:#00c1e0;">
             <span class="info-icon">ℹ️</span> Metodologia de Análise
@@ -2128,8 +4990,8 @@ def run_mago_analysis():
         <div style="margin-top:15px; color:#d7dce8; line-height:1.7;">
             <p>
                 Os dados para esta análise foram extraídos da seção "Final vermicompost" da Tabela 3 do artigo de Mago et al. (2021). 
-                Para permitir a análise estatística, foram simuladas <b>3 réplicas</b> para cada valor médio de parâmetro e tratamento, 
-                utilizando uma distribuição normal com base nos desvios padrão fornecidos. Nos casos onde o desvio padrão não foi 
+                Para permitir a análise estatística, foram simuladas <b>{replications} réplicas</b> para cada valor médio de parâmetro e tratamento, 
+                utilizando uma distribuição {distribution_type} com base nos desvios padrão obtidos dos erros padrão publicados (DP = EPM × √3). Nos casos onde o desvio padrão não foi 
                 explicitamente dado, foi estimado um pequeno valor para permitir a simulação.
             </p>
             <p>
@@ -2162,15 +5024,16 @@ def run_mago_analysis():
     
     results = []
     treatments_ordered = list(TREATMENT_DESCRIPTIONS.keys()) # Ordem dos tratamentos
+    treatment_labels = [TREATMENT_DESCRIPTIONS[t] for t in treatments_ordered]
 
     num_plots = len(selected_params)
     
     if num_plots > 0:
-        fig = plt.figure(figsize=(12, 6 * num_plots)) # Aumentei a largura para a legenda
-        gs = fig.add_gridspec(num_plots, 1, hspace=0.8) # Aumentei o espaçamento vertical
-        axes = [fig.add_subplot(gs[i]) for i in range(num_plots)]
+        # Um pedido de gráfico por parâmetro (desenhado só quando a aba dele é aberta)
+        tiles = {}
     
-        for i, param in enumerate(selected_original_params):
+        collected = []
+        for param in selected_original_params:
             param_df = df[df['Parameter'] == param]
             
             data_by_treatment = []
@@ -2180,47 +5043,69 @@ def run_mago_analysis():
                     data_by_treatment.append(treatment_data)
                 else: # Se não houver dados, adicione um array vazio para manter a estrutura
                     data_by_treatment.append(np.array([]))
+            collected.append(data_by_treatment)
+        
+        # Kruskal-Wallis em lote para todos os parâmetros (tratamentos sem dados são ignorados pelo kernel)
+        stacked = stack_groups(collected)
+        # Bateria por postos, p exato, IC bootstrap (BCa) das medianas e do ε², equivalência (TOST) e Dunn para
+        # os 10 pares de vermireatores: em cache pelos dados, reaproveitados nos reruns
+        margin_values, margin_relative = zip(*(margins[p] for p in selected_original_params))
+        battery, exact_p, _, median_ci, effect_ci, equivalence, dunn_p = parameter_tests(
+            stacked, selected_original_params, seed, margin_values, np.array(margin_relative), dunn=True)
+        h_stats, p_vals = battery.kw_h, battery.kw_p
+        adjusted_p = adjust_pvalues(exact_p, multiplicity)  # família: todos os testes da rodada
+        dunn_adjusted = adjust_pairwise(dunn_p, correction)
+    
+        for i, param in enumerate(selected_original_params):
+            data_by_treatment = collected[i]
             
             # Filtrar tratamentos sem dados para Kruskal-Wallis, mas manter para plotagem se necessário
             valid_data_for_kruskal = [d for d in data_by_treatment if len(d) > 0]
             
             if len(valid_data_for_kruskal) >= 2:
                 try:
-                    h_stat, p_val = kruskal(*valid_data_for_kruskal)
+                    h_stat, p_chi2, p_val = h_stats[i], p_vals[i], exact_p[i]
                     results.append({
                         "Parâmetro": PARAM_MAPPING[param],
                         "H-Statistic": h_stat,
                         "p-value": p_val,
-                        "Significativo (p<0.05)": p_val < 0.05
+                        "p ajustado": adjusted_p[i],
+                        "p (qui-quadrado)": p_chi2,
+                        "ε²": effect_ci.estimate[i],
+                        "ε² (IC inf)": effect_ci.low[i],
+                        "ε² (IC sup)": effect_ci.high[i],
+                        "Margem (TOST)": equivalence.margin[i],
+                        "p (TOST)": equivalence.p_value[i],
+                        "Significativo (p<0.05)": adjusted_p[i] < 0.05
                     })
                     
-                    ax = axes[i]
-                    plot_mago_parameters(ax, data_by_treatment, treatments_ordered, param)
-                    
-                    annotation_text = f"Kruskal-Wallis: H = {h_stat:.2f}, p = {p_val:.4f}"
-                    ax.text(
-                        0.5, 0.95, 
-                        annotation_text,
-                        transform=ax.transAxes,
-                        ha='center',
-                        va='top',
-                        fontsize=11,
-                        color='white',
-                        bbox=dict(
-                            boxstyle="round,pad=0.3",
-                            facecolor='#2a2f45',
-                            alpha=0.8,
-                            edgecolor='none'
-                        )
-                    )
+                    annotation_text = f"Kruskal-Wallis: H = {h_stat:.2f}, p exato = {p_val:.4f} (χ²: {p_chi2:.4f})"
+                    ci = (median_ci.low[i], median_ci.high[i])
+                    fingerprint = data_fingerprint(stacked[i], ci, dunn_adjusted[i], correction, annotation_text)
+                    if interactive:
+                        tiles[param] = vega_tile("mago", param, fingerprint, partial(
+                            mago_chart_spec, data_by_treatment, param, ci, dunn_adjusted[i], correction,
+                            annotation_text))
+                    else:
+                        tiles[param] = chart_tile("mago", param, fingerprint, draw_mago_tile,
+                                                  data_by_treatment, treatments_ordered, treatment_labels,
+                                                  PARAM_MAPPING.get(param, param), ci, dunn_adjusted[i], correction,
+                                                  annotation_text)
                 except Exception as e:
                     st.error(f"Erro ao processar {param}: {str(e)}")
                     continue
             else:
                 st.warning(f"Dados insuficientes para {PARAM_MAPPING.get(param, param)} para realizar o teste de Kruskal-Wallis.")
                 # Ainda pode plotar se desejar, mas não terá resultado estatístico
-                ax = axes[i]
-                plot_mago_parameters(ax, data_by_treatment, treatments_ordered, param)
+                ci = (median_ci.low[i], median_ci.high[i])
+                fingerprint = data_fingerprint(stacked[i], ci)
+                if interactive:
+                    tiles[param] = vega_tile("mago", param, fingerprint, partial(
+                        mago_chart_spec, data_by_treatment, param, ci))
+                else:
+                    tiles[param] = chart_tile("mago", param, fingerprint, draw_mago_tile,
+                                              data_by_treatment, treatments_ordered, treatment_labels,
+                                              PARAM_MAPPING.get(param, param), ci)
     
     st.markdown("""
     <div class="card">
@@ -2234,24 +5119,33 @@ def run_mago_analysis():
     
     if results:
         results_df = pd.DataFrame(results)
-        results_df['Significância'] = results_df['p-value'].apply(
+        results_df['Significância'] = results_df['p ajustado'].apply(
             lambda p: "✅ Sim" if p < 0.05 else "❌ Não"
         )
-        results_df = results_df[['Parâmetro', 'H-Statistic', 'p-value', 'Significância']]
+        results_df = results_df[['Parâmetro', 'H-Statistic', 'p-value', 'p ajustado', 'p (qui-quadrado)', 'ε²', 'ε² (IC inf)', 'ε² (IC sup)', 'Margem (TOST)', 'p (TOST)', 'Significância']]
         
         st.dataframe(
             results_df.style
-            .format({"p-value": "{:.4f}", "H-Statistic": "{:.2f}"})
+            .format({"p-value": "{:.4f}", "p ajustado": "{:.4f}", "p (qui-quadrado)": "{:.4f}", "H-Statistic": "{:.2f}",
+                     "ε²": "{:.3f}", "ε² (IC inf)": "{:.3f}", "ε² (IC sup)": "{:.3f}",
+                     "Margem (TOST)": "{:.3g}", "p (TOST)": "{:.4f}"})
             .set_properties(**{
                 'color': 'white',
                 'background-color': '#131625',
             })
             .apply(lambda x: ['background: rgba(70, 80, 150, 0.3)' 
-                               if x['p-value'] < 0.05 else '' for i in x], axis=1)
+                               if x['p ajustado'] < 0.05 else '' for i in x], axis=1)
         )
     else:
         st.info("Nenhum resultado estatístico disponível.")
     
+    # Referência analítica (ANOVA/Welch) a partir da tabela do artigo
+    render_summary_tests(study_spec(), [PARAM_MAPPING], selected_original_params, PUBLISHED_REPLICATIONS['mago'], results)
+    if results:
+        render_rank_battery(battery, [{"Parâmetro": PARAM_MAPPING[p]} for p in selected_original_params], multiplicity)
+        render_online_editor("mago", {PARAM_MAPPING[p]: (c, treatments_ordered)
+                                      for p, c in zip(selected_original_params, collected)})
+    
     if num_plots > 0:
         st.markdown("""
         <div class="card">
@@ -2263,11 +5157,21 @@ def run_mago_analysis():
         </div>
         """, unsafe_allow_html=True)
         
-        plt.tight_layout(rect=[0, 0, 0.85, 1]) # Ajusta o layout para acomodar a legenda externa
-        st.pyplot(fig)
-        plt.close(fig)
+        # Gráfico e interpretação só do parâmetro da aba aberta
+        parameter_tabs("mago", tiles, PARAM_MAPPING, lambda param: display_mago_interpretation(
+            [res for res in results if res["Parâmetro"] == PARAM_MAPPING[param]]))
     
-    display_mago_interpretation(results)
+    # Comparação bayesiana a partir das médias e desvios publicados
+    render_bayes_comparison(study_spec(), "mago", [PARAM_MAPPING], selected_original_params,
+                            PUBLISHED_REPLICATIONS['mago'], seed)
+
+    # Planejamento de poder (Monte Carlo)
+    render_power_planner(study_spec(), "mago", [PARAM_MAPPING], selected_original_params,
+                         distribution_type=distribution_type, current_replications=replications, seed=seed, sampling=sampling,
+                         correction=multiplicity)
+    render_streaming_summary(study_spec(), "mago", [PARAM_MAPPING, TREATMENT_DESCRIPTIONS], selected_original_params,
+                             distribution_type=distribution_type, current_replications=replications, seed=seed,
+                             correction=multiplicity)
 
     st.markdown("""
     <div class="card">
@@ -2363,114 +5267,61 @@ def run_hanc_analysis():
         "Treatment 5": "50% Borra de Café + 50% Palha (Sem minhocas)"
     }
 
-    @st.cache_data
-    def load_hanc_data(num_replications=3):
-        all_data = []
-        for param_name, treatments_data in HANC_DATA.items():
-            for treatment_name, layers_data in treatments_data.items():
-                for layer_name, (mean, stdev) in layers_data.items():
-                    for _ in range(num_replications):
-                        sim_stdev = stdev if stdev is not None else (mean * 0.05 if mean != 0 else 0.01) # Estimativa se SD é None
-                        value = np.random.normal(mean, sim_stdev)
-                        
-                        # Garantir valores fisicamente possíveis (não-negativos, pH entre 0-14)
-                        if param_name == "pH":
-                            value = np.clip(value, 0, 14)
-                        else:
-                            value = max(0.0, value)
-                        
-                        all_data.append({
-                            "Parameter": param_name,
-                            "Treatment": treatment_name,
-                            "Layer": layer_name,
-                            "Value": value
-                        })
-        return pd.DataFrame(all_data)
-
-    def plot_hanc_parameter_evolution(ax, data_by_layer, layers_ordered, param_name, treatment_name):
-        numeric_layers = [LAYER_MAPPING[l] for l in layers_ordered]
-        
-        # Paleta de cores moderna (uma cor para cada tratamento na plotagem multi-linha)
-        # Como estamos plotando para UM tratamento por vez, a cor será fixa para este tratamento
-        colors = {
-            "Treatment 3": '#6f42c1',
-            "Treatment 4": '#00c1e0',
-            "Treatment 5": '#ffd166'
-        }
-        current_color = colors.get(treatment_name, '#a0a7c0') # Cor padrão
+    # Correlações padrão do modo multivariado (nitrificação consome amônio; P e K vêm do mesmo substrato)
+    DEFAULT_CORRELATIONS = {
+        ("N-NH4+", "N-NO3-"): -0.4,
+        ("P_tot", "K_tot"): 0.6,
+        ("pH", "N-NH4+"): 0.3,
+    }
 
-        for i, (layer, num_layer) in enumerate(zip(layers_ordered, numeric_layers)):
-            group_data = data_by_layer[i]
-            
-            ax.scatter(
-                [num_layer] * len(group_data), 
-                group_data, 
-                alpha=0.85, 
-                s=100,
-                color=current_color,
-                edgecolors='white',
-                linewidth=1.2,
-                zorder=3,
-                label=f"Camada {layer.split(' ')[1]}", # "45 days", "90 days", etc.
-                marker='o'
-            )
-        
-        # Calcular e plotar medianas com estilo premium
-        medians = [np.median(group) for group in data_by_layer]
-        ax.plot(
-            numeric_layers, 
-            medians, 
-            'D-', 
-            markersize=10,
-            linewidth=3,
-            color='#ffffff', # Linha branca para as medianas
-            markerfacecolor=current_color, # Marcador com a cor do tratamento
-            markeredgecolor='white',
-            markeredgewidth=1.5,
-            zorder=5,
-            alpha=0.95,
-            label=f"Mediana ({TREATMENT_DESCRIPTIONS_HANC[treatment_name]})" # Adicionar label aqui
+    # Garantir valores fisicamente possíveis (não-negativos, pH entre 0-14); SD ausente estimado como 5% da média
+    def study_spec():
+        return prepare_study(
+            'hanc',
+            HANC_DATA,
+            dims=('Parameter', 'Treatment', 'Layer'),
+            ph_params=["pH"],
+            nonneg_params=[p for p in HANC_DATA if p != "pH"],
+            missing_stdev=0.05
         )
-        
-        ax.set_xticks(numeric_layers)
-        ax.set_xticklabels([f"{LAYER_MAPPING[l]} dias" for l in layers_ordered], fontsize=11)
-        ax.xaxis.set_major_locator(MaxNLocator(integer=True))
-        
-        ax.set_xlabel("Idade da Camada (Dias)", fontsize=12, fontweight='bold', labelpad=15)
-        ax.set_ylabel(PARAM_MAPPING.get(param_name, param_name), fontsize=12, fontweight='bold', labelpad=15)
-        ax.set_title(f"Evolução de {PARAM_MAPPING.get(param_name, param_name)} - {TREATMENT_DESCRIPTIONS_HANC[treatment_name]}", 
-                     fontsize=14, fontweight='bold', pad=20)
-        
-        ax.grid(True, alpha=0.2, linestyle='--', color='#a0a7c0', zorder=1)
-        ax.legend(loc='lower right', fontsize=9, framealpha=0.25) 
-        
-        for spine in ax.spines.values():
-            spine.set_visible(False)
-        
-        ax.set_facecolor('#0c0f1d')
-        
-        return ax
 
+    @st.cache_data
+    def load_hanc_data(num_replications=PUBLISHED_REPLICATIONS['hanc'], seed=DEFAULT_SEED, distribution_type='Normal',
+                       correlation=None,
+                       sampling='Pseudoaleatória'):
+        block = simulate_spec(study_spec(), num_replications, distribution_type, seed, correlation, sampling)
+        return block_to_long_frame(block)
+
+    # Paleta de cores moderna (uma cor para cada tratamento na plotagem multi-linha)
+    TREATMENT_COLORS_HANC = {
+        "Treatment 3": '#6f42c1',
+        "Treatment 4": '#00c1e0',
+        "Treatment 5": '#ffd166'
+    }
+
+    def layer_row_chart_spec(param_name, row_panels):
+        """A mesma linha de painéis como especificação Vega-Lite (desenhada no navegador)"""
+        label = PARAM_MAPPING.get(param_name, param_name)
+        charts = []
+        for treatment, data_by_layer, median_ci, annotation_text in row_panels:
+            color = TREATMENT_COLORS_HANC.get(treatment, '#a0a7c0')
+            charts.append(vega_parameter_chart(
+                data_by_layer, [f"Camada {layer.split(' ')[1]}" for layer in layers_ordered],
+                f"Evolução de {label} - {TREATMENT_DESCRIPTIONS_HANC[treatment]}", "Idade da Camada (Dias)", label,
+                positions=[LAYER_MAPPING[layer] for layer in layers_ordered], median_ci=median_ci,
+                annotation=annotation_text, colors=[color] * len(layers_ordered), band_color=color,
+                width=400 if len(row_panels) > 1 else 'container'
+            ))
+        return vega_chart_row(*charts)
+
+    # Cartões de interpretação (exibidos na aba de cada parâmetro, um por tratamento)
     def display_hanc_interpretation(results):
-        st.markdown("""
-        <div class="card">
-            <h2 style="display:flex;align-items:center;gap:10px;">
-                <span style="background:linear-gradient(135deg, #a78bfa 0%, #6f42c1 100%);padding:5px 15px;border-radius:30px;font-size:1.2rem;">
-                    📝 Interpretação dos Resultados - Hanc et al. (2021)
-                </span>
-            </h2>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        if not results:
-            st.info("Nenhuma interpretação disponível, pois não há resultados estatísticos.")
-            return
-        
         for res in results:
             param_name = res["Parâmetro"]
             treatment_name = res["Tratamento"]
             p_val = res["p-value"]
-            is_significant = p_val < 0.05
+            p_adj = res["p ajustado"]
+            is_significant = p_adj < 0.05
             
             card_class = "signif-card" if is_significant else "not-signif-card"
             icon = "✅" if is_significant else "❌"
@@ -2486,7 +5337,7 @@ def run_hanc_analysis():
                     </div>
                     <div style="background:rgba(42, 47, 69, 0.7); padding:8px 18px; border-radius:30px; border:1px solid {title_color}30;">
                         <span style="font-weight:bold; font-size:1.1rem; color:{title_color};">{status}</span>
-                        <span style="color:#a0a7c0; margin-left:8px;">p = {p_val:.4f}</span>
+                        <span style="color:#a0a7c0; margin-left:8px;">p = {p_val:.4f} · ajustado = {p_adj:.4f}</span>
                     </div>
                 </div>
                 <div style="margin-top:20px; padding-top:15px; border-top:1px solid rgba(100, 110, 200, 0.2);">
@@ -2520,12 +5371,9 @@ def run_hanc_analysis():
                         <span style="color:#ff5252; font-size:1.5rem;">•</span>
                         Não há evidências suficientes de mudanças significativas nos valores do parâmetro {param_name} ao longo do tempo (camadas) neste tratamento.
                     </p>
-                    <p style="margin:12px 0; display:flex; align-items:center; gap:8px;">
-                        <span style="color:#ff5252; font-size:1.5rem;">•</span>
-                        Isso sugere que o parâmetro se manteve relativamente estável para esta formulação durante o período de observação.
-                    </p>
                 </div>
                 """, unsafe_allow_html=True)
+                st.markdown(equivalence_note(res), unsafe_allow_html=True)
             
             st.markdown("</div></div>", unsafe_allow_html=True)
 
@@ -2559,6 +5407,12 @@ def run_hanc_analysis():
 
     with col1:
         st.write("Os dados são carregados e simulados a partir da Tabela 3 e Figura 3 do artigo.")
+        distribution_type = distribution_input("hanc")
+        sampling = sampling_input("hanc")
+        seed = seed_input("hanc")
+        replications = replications_input("hanc", PUBLISHED_REPLICATIONS['hanc'])
+        multiplicity = multiplicity_input("hanc")
+        interactive = chart_backend_input("hanc") == CHART_BACKENDS[0]
     
     with col2:
         param_options = list(PARAM_MAPPING.values())
@@ -2569,7 +5423,10 @@ def run_hanc_analysis():
             key="hanc_param_select"
         )
     
-    df_hanc = load_hanc_data()
+    correlation = correlation_input("hanc", list(HANC_DATA.keys()), PARAM_MAPPING, DEFAULT_CORRELATIONS)
+    margins = equivalence_margin_input("hanc", list(HANC_DATA.keys()), PARAM_MAPPING)
+    df_hanc = load_hanc_data(replications, seed=seed, distribution_type=distribution_type, correlation=correlation,
+                             sampling=sampling)
 
     st.markdown("""
     <div class="card">
@@ -2582,9 +5439,10 @@ def run_hanc_analysis():
     """, unsafe_allow_html=True)
     
     st.dataframe(df_hanc)
-    st.markdown(f"**Total de amostras simuladas:** {len(df_hanc)}")
+    st.markdown(f"**Total de amostras simuladas:** {len(df_hanc)} · **Semente:** {seed} · **Amostragem:** {sampling}")
+    render_export_button(df_hanc, "hanc", seed, distribution_type, sampling)
 
-    st.markdown("""
+    st.markdown(f"""
     <div class="info-card">
         <h3 style="display:flex;align-items:center;color:#00c1e0;">
             <span class="info-icon">ℹ️</span> Metodologia de Análise
@@ -2593,8 +5451,8 @@ def run_hanc_analysis():
             <p>
                 Os dados para esta análise foram extraídos da <b>Tabela 3</b> (pH, C/N, N-NH₄⁺, N-NO₃⁻) e 
                 <b>Figura 3</b> (Fósforo e Potássio totais) do artigo de Hanc et al. (2021). 
-                Para permitir a análise estatística, foram simuladas <b>3 réplicas</b> para cada valor médio de parâmetro, 
-                tratamento e camada, utilizando uma distribuição normal com base nos desvios padrão fornecidos 
+                Para permitir a análise estatística, foram simuladas <b>{replications} réplicas</b> para cada valor médio de parâmetro, 
+                tratamento e camada, utilizando uma distribuição {distribution_type} com base nos desvios padrão fornecidos 
                 ou estimados (para a Figura 3).
             </p>
             <p>
@@ -2640,28 +5498,11 @@ def run_hanc_analysis():
     # Contar o número total de plots que serão gerados para ajustar o tamanho da figura
     # num_plots_total = len(selected_original_params) * len(treatments_to_analyze)
     # Ajuste: Criar uma figura por tratamento para melhor organização visual
-    
+
+    # Coletar os dados por camada de todas as combinações (tratamento, parâmetro)
+    collected = {}
     for treatment in treatments_to_analyze:
-        st.markdown(f"""
-        <div class="card">
-            <h2 style="display:flex;align-items:center;gap:10px;">
-                <span style="background:linear-gradient(135deg, #00c1e0 0%, #00d4b1 100%);padding:5px 15px;border-radius:30px;font-size:1.2rem;">
-                    📈 Evolução dos Parâmetros para {TREATMENT_DESCRIPTIONS_HANC[treatment]}
-                </span>
-            </h2>
-        </div>
-        """, unsafe_allow_html=True)
-        
-        # Criar uma figura e eixos para cada tratamento
-        fig, axes = plt.subplots(len(selected_original_params), 1, figsize=(10, 6 * len(selected_original_params)))
-        # Se houver apenas um subplot, axes não será um array. Garanta que seja iterável.
-        if len(selected_original_params) == 1:
-            axes = [axes] 
-
-        # Usar GridSpec para controlar o espaçamento (se necessário, o tight_layout abaixo pode ser suficiente)
-        # gs = fig.add_gridspec(len(selected_original_params), 1, hspace=0.6) # hspace moveu para tight_layout
-        
-        for i, param in enumerate(selected_original_params):
+        for param in selected_original_params:
             param_df_by_treatment = df_hanc[(df_hanc['Parameter'] == param) & (df_hanc['Treatment'] == treatment)]
             
             data_by_layer = []
@@ -2671,51 +5512,93 @@ def run_hanc_analysis():
                     data_by_layer.append(layer_data)
                 else:
                     data_by_layer.append(np.array([])) # Adiciona um array vazio se não houver dados
+            collected[(treatment, param)] = data_by_layer
+
+    # Um único Kruskal-Wallis em lote substitui as chamadas por tratamento e parâmetro
+    batch_keys = list(collected.keys())
+    stacked = stack_groups([collected[k] for k in batch_keys])
+    # Bateria por postos, p exato, tendência ao longo das camadas ordenadas pela idade (45 → 180 dias), IC
+    # bootstrap (BCa) das medianas e do ε² e equivalência (TOST): em cache pelos dados, reaproveitados nos reruns
+    margin_values, margin_relative = zip(*(margins[p] for _, p in batch_keys))
+    battery, exact_p, trend, median_ci, effect_ci, equivalence, _ = parameter_tests(
+        stacked, [f"{t}/{p}" for t, p in batch_keys], seed, margin_values, np.array(margin_relative),
+        [LAYER_MAPPING[layer] for layer in layers_ordered])
+    h_stats, p_vals = battery.kw_h, battery.kw_p
+    adjusted_p = adjust_pvalues(exact_p, multiplicity)  # família: todos os testes da rodada
+    kruskal_by_key = {k: (h_stats[j], p_vals[j], exact_p[j]) for j, k in enumerate(batch_keys)}
+    trend_index = {k: j for j, k in enumerate(batch_keys)}
+    
+    st.markdown("""
+    <div class="card">
+        <h2 style="display:flex;align-items:center;gap:10px;">
+            <span style="background:linear-gradient(135deg, #00c1e0 0%, #00d4b1 100%);padding:5px 15px;border-radius:30px;font-size:1.2rem;">
+                📈 Evolução dos Parâmetros por Tratamento
+            </span>
+        </h2>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    # Um gráfico por parâmetro (uma coluna por tratamento); aqui só se coletam os painéis de cada linha
+    panels = {param: [] for param in selected_original_params}
+    
+    for treatment in treatments_to_analyze:
+        for param in selected_original_params:
+            data_by_layer = collected[(treatment, param)]
 
             valid_data_for_kruskal = [d for d in data_by_layer if len(d) > 0]
             
             if len(valid_data_for_kruskal) >= 2:
                 try:
-                    h_stat, p_val = kruskal(*valid_data_for_kruskal)
+                    h_stat, p_chi2, p_val = kruskal_by_key[(treatment, param)]
+                    j = trend_index[(treatment, param)]
                     results.append({
                         "Parâmetro": PARAM_MAPPING[param],
                         "Tratamento": treatment,
                         "H-Statistic": h_stat,
                         "p-value": p_val,
-                        "Significativo (p<0.05)": p_val < 0.05
+                        "p ajustado": adjusted_p[j],
+                        "p (qui-quadrado)": p_chi2,
+                        "ε²": effect_ci.estimate[j],
+                        "ε² (IC inf)": effect_ci.low[j],
+                        "ε² (IC sup)": effect_ci.high[j],
+                        "JT z": trend.jt_z[j],
+                        "p (Jonckheere)": trend.jt_p[j],
+                        "p (Mann-Kendall)": trend.mk_p[j],
+                        "Sen (inclinação)": trend.sen_slope[j],
+                        "Margem (TOST)": equivalence.margin[j],
+                        "p (TOST)": equivalence.p_value[j],
+                        "Significativo (p<0.05)": adjusted_p[j] < 0.05
                     })
                     
-                    ax = axes[i]
-                    plot_hanc_parameter_evolution(ax, data_by_layer, layers_ordered, param, treatment)
-                    
-                    annotation_text = f"Kruskal-Wallis: H = {h_stat:.2f}, p = {p_val:.4f}"
-                    ax.text(
-                        0.5, 0.95, 
-                        annotation_text,
-                        transform=ax.transAxes,
-                        ha='center',
-                        va='top',
-                        fontsize=11,
-                        color='white',
-                        bbox=dict(
-                            boxstyle="round,pad=0.3",
-                            facecolor='#2a2f45',
-                            alpha=0.8,
-                            edgecolor='none'
-                        )
-                    )
+                    annotation_text = (f"Kruskal-Wallis: H = {h_stat:.2f}, p exato = {p_val:.4f} (χ²: {p_chi2:.4f})\n"
+                                       f"Jonckheere: z = {trend.jt_z[j]:.2f}, p = {trend.jt_p[j]:.4f} · "
+                                       f"Sen = {trend.sen_slope[j]:.3g}/dia")
+                    panels[param].append((treatment, data_by_layer, (median_ci.low[j], median_ci.high[j]),
+                                          annotation_text))
                 except Exception as e:
                     st.error(f"Erro ao processar {param} para {treatment}: {str(e)}")
                     continue
             else:
                 st.warning(f"Dados insuficientes para {PARAM_MAPPING.get(param, param)} para o tratamento {TREATMENT_DESCRIPTIONS_HANC[treatment]} para realizar o teste de Kruskal-Wallis.")
-                ax = axes[i]
-                plot_hanc_parameter_evolution(ax, data_by_layer, layers_ordered, param, treatment)
+                panels[param].append((treatment, data_by_layer, None, None))
 
-        plt.tight_layout(h_pad=0.6) # Usa h_pad para controle vertical no tight_layout
-        st.pyplot(fig)
-        plt.close(fig) # Fecha a figura para liberar memória
-        st.markdown('<div class="graph-spacer"></div>', unsafe_allow_html=True) # Espaçamento entre blocos de tratamento
+    tiles = {}
+    for param in selected_original_params:
+        if panels[param]:
+            fingerprint = data_fingerprint(panels[param])
+            if interactive:
+                tiles[param] = vega_tile("hanc", param, fingerprint, partial(layer_row_chart_spec, param, panels[param]))
+            else:
+                row_panels = [(TREATMENT_DESCRIPTIONS_HANC[treatment], TREATMENT_COLORS_HANC.get(treatment, '#a0a7c0'),
+                               data_by_layer, median_ci, annotation_text)
+                              for treatment, data_by_layer, median_ci, annotation_text in panels[param]]
+                tiles[param] = chart_tile("hanc", param, fingerprint, draw_layer_row_tile, layers_ordered,
+                                          [LAYER_MAPPING[layer] for layer in layers_ordered],
+                                          PARAM_MAPPING.get(param, param), row_panels)
+    # Gráfico e interpretação (todos os tratamentos) só do parâmetro da aba aberta
+    parameter_tabs("hanc", tiles, PARAM_MAPPING, lambda param: display_hanc_interpretation(
+        [res for res in results if res["Parâmetro"] == PARAM_MAPPING[param]]))
+    st.markdown('<div class="graph-spacer"></div>', unsafe_allow_html=True)
 
     st.markdown("""
     <div class="card">
@@ -2729,18 +5612,23 @@ def run_hanc_analysis():
     
     if results:
         results_df = pd.DataFrame(results)
-        results_df['Significância'] = results_df['p-value'].apply(
+        results_df['Significância'] = results_df['p ajustado'].apply(
             lambda p: "✅ Sim" if p < 0.05 else "❌ Não"
         )
         
         # Mapear Treatment para descrição completa
         results_df['Tratamento'] = results_df['Tratamento'].map(TREATMENT_DESCRIPTIONS_HANC)
 
-        results_df = results_df[['Parâmetro', 'Tratamento', 'H-Statistic', 'p-value', 'Significância']]
+        results_df = results_df[['Parâmetro', 'Tratamento', 'H-Statistic', 'p-value', 'p ajustado', 'p (qui-quadrado)', 'ε²', 'ε² (IC inf)', 'ε² (IC sup)',
+                                 'JT z', 'p (Jonckheere)', 'p (Mann-Kendall)', 'Sen (inclinação)', 'Margem (TOST)', 'p (TOST)', 'Significância']]
         
         st.dataframe(
             results_df.style
-            .format({"p-value": "{:.4f}", "H-Statistic": "{:.2f}"})
+            .format({"p-value": "{:.4f}", "p ajustado": "{:.4f}", "p (qui-quadrado)": "{:.4f}", "H-Statistic": "{:.2f}",
+                     "ε²": "{:.3f}", "ε² (IC inf)": "{:.3f}", "ε² (IC sup)": "{:.3f}",
+                     "JT z": "{:.2f}", "p (Jonckheere)": "{:.4f}", "p (Mann-Kendall)": "{:.4f}",
+                     "Sen (inclinação)": "{:.4g}",
+                     "Margem (TOST)": "{:.3g}", "p (TOST)": "{:.4f}"})
             .set_properties(**{
                 'color': 'white',
                 'background-color': '#131625',
@@ -2751,7 +5639,73 @@ def run_hanc_analysis():
     else:
         st.info("Nenhum resultado estatístico disponível.")
     
-    display_hanc_interpretation(results)
+    # Referência analítica (ANOVA/Welch) a partir da tabela do artigo
+    render_summary_tests(study_spec(), [PARAM_MAPPING], selected_original_params, PUBLISHED_REPLICATIONS['hanc'], results)
+    if results:
+        render_rank_battery(battery, [{"Parâmetro": PARAM_MAPPING[p], "Tratamento": TREATMENT_DESCRIPTIONS_HANC[t]}
+                                      for t, p in batch_keys], multiplicity)
+        render_online_editor("hanc", {f"{PARAM_MAPPING[p]} · {TREATMENT_DESCRIPTIONS_HANC[t]}": (collected[(t, p)], layers_ordered)
+                                      for t, p in batch_keys})
+    
+    # Análise fatorial: efeito do tratamento, da camada e da interação, todos os parâmetros em um lote
+    st.markdown("""
+    <div class="card">
+        <h2 style="display:flex;align-items:center;gap:10px;">
+            <span style="background:linear-gradient(135deg, #a78bfa 0%, #6f42c1 100%);padding:5px 15px;border-radius:30px;font-size:1.2rem;">
+                🧮 Análise Fatorial (Tratamento × Camada)
+            </span>
+        </h2>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    st.markdown("""
+    <div class="info-card">
+        <div style="color:#d7dce8; line-height:1.7;">
+            O Kruskal-Wallis por tratamento compara apenas as camadas. Aqui os dois fatores são testados juntos:
+            <b>Scheirer-Ray-Hare</b> (ANOVA sobre os postos) e <b>ART</b> (alinhamento e postos por efeito),
+            incluindo a interação tratamento × camada.
+        </div>
+    </div>
+    """, unsafe_allow_html=True)
+    
+    factorial_values = np.stack([stack_groups([collected[(t, p)] for t in treatments_to_analyze])
+                                 for p in selected_original_params])
+    if np.isnan(factorial_values).any():
+        st.info("A análise fatorial requer o delineamento completo (todas as camadas com réplicas).")
+    else:
+        factorial = two_factor_rank_tests(factorial_values)
+        factorial_rows = []
+        for i, param in enumerate(selected_original_params):
+            for e, effect in enumerate(FACTORIAL_EFFECTS):
+                factorial_rows.append({
+                    "Parâmetro": PARAM_MAPPING[param],
+                    "Efeito": effect,
+                    "gl": int(factorial.df[e]),
+                    "H (Scheirer-Ray-Hare)": factorial.srh_h[i, e],
+                    "p (SRH)": factorial.srh_p[i, e],
+                    "F (ART)": factorial.art_f[i, e],
+                    "p (ART)": factorial.art_p[i, e],
+                })
+        factorial_df = pd.DataFrame(factorial_rows)
+        st.dataframe(
+            factorial_df.style
+            .format({"H (Scheirer-Ray-Hare)": "{:.2f}", "p (SRH)": "{:.4f}", "F (ART)": "{:.2f}", "p (ART)": "{:.4f}"},
+                    na_rep="—")
+            .set_properties(**{'color': 'white', 'background-color': '#131625'})
+            .apply(lambda x: ['background: rgba(70, 80, 150, 0.3)'
+                              if x['p (ART)'] < 0.05 else '' for i in x], axis=1)
+        )
+        st.markdown(f"**Gl do erro (ART):** {factorial.df_error}")
+
+    # Planejamento de poder (Monte Carlo): uma linha por parâmetro e tratamento
+    render_power_planner(study_spec(), "hanc", [PARAM_MAPPING, TREATMENT_DESCRIPTIONS_HANC],
+                         selected_original_params, distribution_type=distribution_type,
+                         current_replications=replications, seed=seed, sampling=sampling,
+                         correction=multiplicity)
+    render_streaming_summary(study_spec(), "hanc", [PARAM_MAPPING, TREATMENT_DESCRIPTIONS_HANC],
+                             selected_original_params, distribution_type=distribution_type,
+                             current_replications=replications, seed=seed,
+                             correction=multiplicity)
 
     st.markdown("""
     <div class="card">
@@ -2786,6 +5740,8 @@ def run_hanc_analysis():
 # ROTEADOR PRINCIPAL
 # ===================================================================
 def main():
+    apply_page_theme()
+
     # Inicializar estado da sessão
     if 'selected_article' not in st.session_state:
         st.session_state['selected_article'] = None
@@ -2807,4 +5763,7 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    if "--build-kw-tables" in sys.argv:
+        print("Tabelas geradas:", ", ".join(build_exact_kruskal_tables()))
+    else:
+        main()
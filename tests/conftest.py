@@ -0,0 +1,7 @@
+import logging
+import os
+import sys
+
+# app.py é um script Streamlit: importá-lo fora de `streamlit run` só gera avisos de "no runtime"
+logging.getLogger('streamlit').setLevel(logging.ERROR)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,24 @@
+"""Execução do app pelo AppTest do Streamlit"""
+import os
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'app.py')
+
+
+@pytest.mark.parametrize('article, prefix', [('jordao', 'jordao'), ('dermendzhieva', 'derm')])
+def test_replicate_control_reaches_dense_path(article, prefix):
+    import app
+
+    at = AppTest.from_file(APP_PATH, default_timeout=300)
+    at.session_state['selected_article'] = article
+    at.run()
+    control = at.selectbox(key=f"{prefix}_replications")
+    assert control.value == app.PUBLISHED_REPLICATIONS[article]
+
+    dense = min(n for n in control.options if int(n) > app.DENSE_POINTS_THRESHOLD)
+    control.set_value(int(dense))
+    at.run()
+    assert not at.exception
+    assert not at.error
@@ -0,0 +1,924 @@
+"""Motores estatísticos do app.py comparados com implementações de referência (SciPy) em sementes fixas"""
+import itertools
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pytest
+from scipy import stats
+
+import app
+
+
+def rounded_groups(seed, batch, num_groups, num_reps, shift=0.5, decimals=1):
+    """Lote com tendência crescente e valores arredondados (empates frequentes)"""
+    rng = np.random.default_rng(seed)
+    trend = shift * np.arange(num_groups)[:, np.newaxis]
+    return np.round(rng.normal(size=(batch, num_groups, num_reps)) + trend, decimals)
+
+
+# ------------------------------------------------------------------
+# Simulador vetorizado de réplicas
+# ------------------------------------------------------------------
+@pytest.mark.parametrize('family', ['Normal', 'LogNormal'])
+def test_simulated_replicates_keep_published_moments(family):
+    means = np.array([[10.0, 20.0, 5.0], [0.5, 3.0, 1.0]])
+    sds = np.array([[1.0, 4.0, 0.5], [0.1, 0.6, 0.3]])
+    values = app.simulate_replicates(means, sds, 200000, family, rng=np.random.default_rng(0))
+
+    assert values.shape == means.shape + (200000,)
+    np.testing.assert_allclose(values.mean(axis=-1), means, rtol=0.01)
+    np.testing.assert_allclose(values.std(axis=-1, ddof=1), sds, rtol=0.03)
+
+
+def test_simulated_replicates_respect_bounds_and_zero_sd():
+    means = np.array([0.2, 6.5, 4.0])
+    sds = np.array([1.0, 2.0, 0.0])
+    values = app.simulate_replicates(means, sds, 5000, lower=np.array([0.0, 0.0, 0.0]),
+                                     upper=np.array([np.inf, 7.0, np.inf]), rng=np.random.default_rng(1))
+
+    assert values[0].min() == 0.0
+    assert values[1].max() == 7.0
+    assert np.all(values[2] == 4.0)
+
+
+def test_same_noise_gives_same_replicates():
+    means, sds = np.array([3.0, 8.0]), np.array([1.0, 2.0])
+    noise = np.random.default_rng(2).standard_normal((2, 6))
+    first = app.simulate_replicates(means, sds, 6, noise=noise)
+    second = app.simulate_replicates(means, sds, 6, noise=noise)
+    np.testing.assert_array_equal(first, second)
+    np.testing.assert_allclose(first, means[:, np.newaxis] + sds[:, np.newaxis] * noise)
+
+
+def test_long_frame_has_one_row_per_replicate():
+    values = np.arange(2 * 3 * 4, dtype=float).reshape(2, 3, 4)
+    block = app.SimulatedBlock(values, ['Parameter', 'Day', 'Replicate'],
+                               {'Parameter': ['pH', 'N'], 'Day': ['0', '15', '30'], 'Replicate': [1, 2, 3, 4]})
+    frame = app.block_to_long_frame(block)
+
+    assert list(frame.columns) == ['Parameter', 'Day', 'Value']
+    assert len(frame) == values.size
+    row = frame.iloc[1 * 12 + 2 * 4 + 3]
+    assert (row['Parameter'], row['Day'], row['Value']) == ('N', '30', values[1, 2, 3])
+
+
+# ------------------------------------------------------------------
+# Kruskal-Wallis em lote
+# ------------------------------------------------------------------
+def test_kruskal_batched_matches_scipy_with_ties_and_gaps():
+    samples = rounded_groups(12, 10, 4, 5, decimals=0)
+    samples[3, 2, 3:] = np.nan
+    h_stat, p_val = app.kruskal_batched(samples)
+    for b in range(samples.shape[0]):
+        reference = stats.kruskal(*[g[~np.isnan(g)] for g in samples[b]])
+        assert h_stat[b] == pytest.approx(reference.statistic, rel=1e-10)
+        assert p_val[b] == pytest.approx(reference.pvalue, rel=1e-10)
+
+
+def test_stack_groups_pads_uneven_groups_with_nan():
+    stacked = app.stack_groups([[[1.0, 2.0], [3.0]], [[4.0], [5.0, 6.0, 7.0]]])
+    assert stacked.shape == (2, 2, 3)
+    np.testing.assert_array_equal(stacked[0, 1], [3.0, np.nan, np.nan])
+    np.testing.assert_array_equal(stacked[1, 1], [5.0, 6.0, 7.0])
+
+
+# ------------------------------------------------------------------
+# Poder por ressimulação do estudo
+# ------------------------------------------------------------------
+def small_study(shift=1.0, sd=1.0, groups=4):
+    table = {'P': {f"G{g}": (10.0 + shift * g, sd) for g in range(groups)},
+             'Q': {f"G{g}": (5.0, 0.5 * sd) for g in range(groups)}}
+    return app.prepare_study('teste', table, dims=('Parameter', 'Group'))
+
+
+def test_simulated_study_is_reproducible_by_seed():
+    spec = small_study()
+    block = app.simulate_spec(spec, 7, seed=3)
+    assert block.values.shape == spec.means.shape + (7,)
+    assert block.dims[-1] == 'Replicate'
+    np.testing.assert_array_equal(block.values, app.simulate_spec(spec, 7, seed=3).values)
+    assert not np.array_equal(block.values, app.simulate_spec(spec, 7, seed=4).values)
+
+
+def test_power_matches_scipy_monte_carlo_without_tables():
+    # 4 × 6 = 24 observações: sem tabela exata, o p é o qui-quadrado de scipy.stats.kruskal
+    spec = small_study(shift=0.6)
+    rate, done, _, _ = app.simulate_rejection_rate(spec, 6, max_simulations=2000, target_power=1.1, seed=26)
+    rng = np.random.default_rng(27)
+    reference = np.mean([stats.kruskal(*rng.normal(spec.means[0][:, None], spec.sds[0][:, None], (4, 6))).pvalue < 0.05
+                         for _ in range(2000)])
+    tolerance = 4.0 * np.sqrt(reference * (1.0 - reference) * 2.0 / done)
+    assert rate[0] == pytest.approx(reference, abs=tolerance)
+    assert rate[1] <= 0.05 + 4.0 * np.sqrt(0.05 * 0.95 / done)
+
+
+def test_exact_replication_limit_marks_the_chi_square_switch():
+    grid = range(2, 11)
+    # 4 × 5 = 20 observações é o maior delineamento com tabela no arquivo
+    assert app.exact_replication_limit(4, grid) == 5
+    assert app.exact_replication_limit(5, grid) == 4
+    # 3 × 5 = 15 observações: sem tabela no arquivo, mas enumerável em execução
+    assert app.exact_replication_limit(3, grid) == 5
+    assert app.exact_replication_limit(4, range(8, 11)) is None
+
+
+# ------------------------------------------------------------------
+# Fluxos aleatórios independentes por célula
+# ------------------------------------------------------------------
+def test_spawned_streams_are_reproducible_and_distinct():
+    first = app.spawn_generator(7, 'jordao', 'pH', 'Controle').standard_normal(5)
+    np.testing.assert_array_equal(first, app.spawn_generator(7, 'jordao', 'pH', 'Controle').standard_normal(5))
+    assert not np.array_equal(first, app.spawn_generator(7, 'jordao', 'pH', 'Dose 1').standard_normal(5))
+    assert not np.array_equal(first, app.spawn_generator(8, 'jordao', 'pH', 'Controle').standard_normal(5))
+
+
+def test_cell_noise_does_not_depend_on_cell_order_or_other_cells():
+    spec = small_study()
+    noise = app.cell_noise(spec, (6,), 11, 'data')
+
+    order = spec.coords['Group'][::-1]
+    reordered = spec._replace(means=spec.means[:, ::-1], sds=spec.sds[:, ::-1],
+                              coords={**spec.coords, 'Group': order})
+    np.testing.assert_array_equal(app.cell_noise(reordered, (6,), 11, 'data'), noise[:, ::-1])
+
+    subset = spec._replace(means=spec.means[:, :2], sds=spec.sds[:, :2],
+                           coords={**spec.coords, 'Group': spec.coords['Group'][:2]})
+    np.testing.assert_array_equal(app.cell_noise(subset, (6,), 11, 'data'), noise[:, :2])
+
+
+# ------------------------------------------------------------------
+# Famílias limitadas (CDF inversa truncada)
+# ------------------------------------------------------------------
+def test_truncated_moments_match_scipy():
+    mu, sigma, lower, upper = np.array([1.0, 7.0]), np.array([2.0, 3.0]), np.array([0.0, 0.0]), np.array([np.inf, 14.0])
+    mean, sd = app.truncnorm_moments(mu, sigma, lower, upper)
+    reference = stats.truncnorm((lower - mu) / sigma, (upper - mu) / sigma, loc=mu, scale=sigma)
+    np.testing.assert_allclose(mean, reference.mean(), rtol=1e-10)
+    np.testing.assert_allclose(sd, reference.std(), rtol=1e-10)
+
+    log_mu, log_sigma, log_lower, log_upper = 0.5, 0.8, 0.5, 6.0
+    log_mean, log_sd = app.trunclognorm_moments(log_mu, log_sigma, log_lower, log_upper)
+    lognormal = stats.lognorm(log_sigma, scale=np.exp(log_mu))
+    first = lognormal.expect(lambda x: x, lb=log_lower, ub=log_upper, conditional=True)
+    second = lognormal.expect(lambda x: x ** 2, lb=log_lower, ub=log_upper, conditional=True)
+    assert log_mean == pytest.approx(first, rel=1e-8)
+    assert log_sd == pytest.approx(np.sqrt(second - first ** 2), rel=1e-7)
+
+
+@pytest.mark.parametrize('family', ['Normal Truncada', 'LogNormal Truncada', 'Gama', 'Beta Escalonada'])
+def test_bounded_families_keep_published_moments(family):
+    # pH perto do limite inferior (0-14) e concentração não negativa com desvio alto
+    means, sds = np.array([1.0, 3.0]), np.array([0.8, 2.5])
+    lower, upper = np.array([0.0, 0.0]), np.array([14.0, np.inf])
+    values = app.simulate_replicates(means, sds, 200000, family, lower, upper,
+                                     rng=np.random.default_rng(30))
+    assert np.all(values >= lower[:, None]) and np.all(values <= upper[:, None])
+    np.testing.assert_allclose(values.mean(axis=-1), means, rtol=0.02)
+    np.testing.assert_allclose(values.std(axis=-1, ddof=1), sds, rtol=0.03)
+
+
+# ------------------------------------------------------------------
+# Simulação em blocos com estatísticas online
+# ------------------------------------------------------------------
+def test_streaming_summary_matches_materialised_replicates():
+    spec = small_study(shift=0.5)
+    total, chunk, experiment_size = 600, 90, 3
+    stats_online, kruskal = app.stream_study_summary(spec, total, chunk_size=chunk, seed=28,
+                                                     experiment_size=experiment_size)
+    chunks = list(app.iter_replicate_chunks(spec, total, chunk, seed=28))
+    values = np.concatenate(chunks, axis=-1)
+
+    np.testing.assert_allclose(stats_online.mean, values.mean(axis=-1), rtol=1e-12)
+    np.testing.assert_allclose(stats_online.std(), values.std(axis=-1, ddof=1), rtol=1e-10)
+    median = stats_online.quantile(0.5)
+    assert np.all(np.abs(median - np.median(values, axis=-1)) <= 2 * stats_online.bin_width)
+
+    # Experimentos de 3 réplicas por grupo, montados bloco a bloco como no streaming
+    experiments = []
+    for block in chunks:
+        usable = block[..., :(block.shape[-1] // experiment_size) * experiment_size]
+        grouped = usable.reshape(spec.means.shape + (-1, experiment_size))
+        experiments.append(np.moveaxis(grouped, -2, -3))
+    experiments = np.concatenate(experiments, axis=-3)  # parâmetros × experimentos × grupos × réplicas
+    assert kruskal.experiments == experiments.shape[1]
+
+    flat = experiments.reshape(-1, 4, experiment_size)
+    h_reference = np.array([stats.kruskal(*row).statistic for row in flat]).reshape(experiments.shape[:2])
+    np.testing.assert_allclose(kruskal.h_sum, h_reference.sum(axis=-1), rtol=1e-10)
+    exact = app.kruskal_exact_pvalues(flat).reshape(experiments.shape[:2])
+    np.testing.assert_array_equal(kruskal.rejections, np.sum(exact < 0.05, axis=-1))
+
+
+# ------------------------------------------------------------------
+# Simulação multivariada (cópula gaussiana)
+# ------------------------------------------------------------------
+def test_nearest_correlation_returns_valid_matrix():
+    valid = np.array([[1.0, 0.5, 0.2], [0.5, 1.0, 0.1], [0.2, 0.1, 1.0]])
+    np.testing.assert_array_equal(app.nearest_correlation(valid), valid)
+
+    fixed = app.nearest_correlation(np.array([[1.0, 0.9, -0.9], [0.9, 1.0, 0.9], [-0.9, 0.9, 1.0]]))
+    np.testing.assert_allclose(fixed, fixed.T)
+    np.testing.assert_allclose(np.diag(fixed), 1.0)
+    assert np.linalg.eigvalsh(fixed).min() > 0
+
+
+def test_gaussian_copula_preserves_rank_correlation():
+    target = np.array([[1.0, 0.7, -0.4], [0.7, 1.0, 0.0], [-0.4, 0.0, 1.0]])
+    noise = app.correlate_noise(np.random.default_rng(29).standard_normal((3, 2, 20000)), target)
+    np.testing.assert_allclose(np.corrcoef(noise[:, 0]), target, atol=0.02)
+
+    # Margens LogNormal: a correlação de Spearman da cópula gaussiana é (6/π)·asen(r/2)
+    means = np.array([[10.0, 20.0], [5.0, 5.0], [1.0, 2.0]])
+    values = app.simulate_replicates(means, 0.5 * means, noise.shape[-1], 'LogNormal', noise=noise)
+    rho = stats.spearmanr(values[:, 1].T).statistic
+    np.testing.assert_allclose(rho, 6.0 / np.pi * np.arcsin(target / 2.0), atol=0.02)
+
+
+# ------------------------------------------------------------------
+# Amostragem quasi-Monte Carlo (Sobol e hipercubo latino)
+# ------------------------------------------------------------------
+@pytest.mark.parametrize('sampling', ['Sobol', 'Hipercubo Latino'])
+def test_qmc_normals_stratify_every_dimension(sampling):
+    # 64 pontos de 3 réplicas: cada um dos 64 estratos de Φ(z) recebe exatamente um ponto por dimensão
+    z = app.qmc_normals(np.random.default_rng(31), (64, 3), sampling)
+    assert z.shape == (64, 3)
+    strata = np.floor(stats.norm.cdf(z) * 64).astype(int)
+    for column in strata.T:
+        np.testing.assert_array_equal(np.sort(column), np.arange(64))
+
+
+def test_qmc_normals_reproducible_and_validated():
+    first = app.qmc_normals(np.random.default_rng(32), (16, 4), 'Sobol')
+    np.testing.assert_array_equal(first, app.qmc_normals(np.random.default_rng(32), (16, 4), 'Sobol'))
+    with pytest.raises(ValueError):
+        app.qmc_normals(np.random.default_rng(32), (16, 4), 'Halton')
+
+
+# ------------------------------------------------------------------
+# Kruskal-Wallis por permutação com parada antecipada
+# ------------------------------------------------------------------
+def brute_force_kruskal_pvalue(groups):
+    """P(H >= H observado) enumerando todas as atribuições dos postos 1..N aos grupos"""
+    sizes = [len(g) for g in groups]
+    observed = stats.kruskal(*groups).statistic
+    labels = np.repeat(np.arange(len(sizes)), sizes)
+    n_total = len(labels)
+    arrangements = np.array(sorted(set(itertools.permutations(labels))))
+    rank_sums = np.stack([np.sum(np.where(arrangements == g, np.arange(1, n_total + 1), 0), axis=-1)
+                          for g in range(len(sizes))], axis=-1)
+    statistics = 12.0 / (n_total * (n_total + 1)) * np.sum(rank_sums ** 2 / np.array(sizes), axis=-1) - 3.0 * (n_total + 1)
+    return np.mean(statistics >= observed - 1e-9)
+
+
+def shifted_design(seed, batch=6, num_groups=4, num_reps=2, step=0.3):
+    """Lote de linhas com deslocamento entre grupos crescente de linha para linha"""
+    shifts = step * np.arange(batch)[:, None, None] * np.arange(num_groups)[:, None]
+    return np.random.default_rng(seed).normal(size=(batch, num_groups, num_reps)) + shifts
+
+
+def test_permutation_pvalues_match_brute_force_enumeration():
+    samples = shifted_design(13)
+    p_val, used = app.kruskal_permutation(samples, max_permutations=20000, batch_size=20000, seed=5)
+    np.testing.assert_array_equal(used, 20000)
+    for b in range(samples.shape[0]):
+        exact = brute_force_kruskal_pvalue(list(samples[b]))
+        assert p_val[b] == pytest.approx(exact, abs=4.0 * np.sqrt(exact * (1.0 - exact) / 20000) + 1e-4)
+
+
+def test_permutation_stops_early_far_from_alpha():
+    samples = shifted_design(13)
+    p_val, used = app.kruskal_permutation(samples, alpha=0.05, batch_size=200, seed=5)
+    exact = np.array([brute_force_kruskal_pvalue(list(row)) for row in samples])
+    # Linhas com p longe de alpha decidem no primeiro bloco; a linha perto de alpha continua permutando
+    assert np.all(used[exact > 0.3] == 200)
+    assert used[np.argmin(np.abs(exact - 0.05))] > 200
+    np.testing.assert_array_equal(p_val < 0.05, exact < 0.05)
+
+
+def test_permutation_streams_follow_row_labels():
+    samples = shifted_design(14)
+    p_val, used = app.kruskal_permutation(samples, labels=['a', 'b', 'c', 'd', 'e', 'f'], seed=6)
+    reversed_p, reversed_used = app.kruskal_permutation(samples[::-1], labels=['f', 'e', 'd', 'c', 'b', 'a'], seed=6)
+    np.testing.assert_array_equal(reversed_p, p_val[::-1])
+    np.testing.assert_array_equal(reversed_used, used[::-1])
+
+
+# ------------------------------------------------------------------
+# p exato do Kruskal-Wallis por tabelas nulas
+# ------------------------------------------------------------------
+def test_exact_pvalues_match_brute_force_enumeration():
+    samples = shifted_design(13)
+    exact = app.kruskal_exact_pvalues(samples)
+    for b in range(samples.shape[0]):
+        assert exact[b] == pytest.approx(brute_force_kruskal_pvalue(list(samples[b])), abs=1e-12)
+
+
+def test_table_pvalues_agree_with_exact_pvalues():
+    # Sem empates: o p das ressimulações (tabela) é o p exato da tabela de resultados
+    samples = np.random.default_rng(14).normal(size=(40, 4, 3)) + 0.8 * np.arange(4)[:, None]
+    _, table_p = app.kruskal_table_batched(samples)
+    np.testing.assert_array_equal(table_p, app.kruskal_exact_pvalues(samples))
+
+    # Fora das tabelas (N > 20) o p das ressimulações é o qui-quadrado de scipy.stats.kruskal
+    large = np.random.default_rng(15).normal(size=(5, 4, 6))
+    _, large_p = app.kruskal_table_batched(large)
+    np.testing.assert_allclose(large_p, [stats.kruskal(*row).pvalue for row in large], rtol=1e-10)
+
+
+def test_lazy_tables_stay_in_memory(tmp_path):
+    lazy_path = str(tmp_path / 'lazy.npz')
+    support, survival = app.exact_kruskal_table((2, 2, 3), lazy_path)
+    assert not (tmp_path / 'lazy.npz').exists()
+    assert survival[0] == pytest.approx(1.0)
+
+    # Só a etapa de build grava; a tabela gravada é a mesma enumerada em memória
+    built_path = str(tmp_path / 'built.npz')
+    assert app.build_exact_kruskal_tables(built_path, designs=[(2, 2, 3)]) == [app.design_key((2, 2, 3))]
+    stored_support, stored_survival = app.exact_kruskal_tables(built_path)[0][app.design_key((2, 2, 3))]
+    np.testing.assert_array_equal(stored_support, support)
+    np.testing.assert_allclose(stored_survival, survival)
+
+
+def test_power_uses_the_exact_pvalues_of_the_results_table():
+    spec = small_study()
+    num_replications, simulations = 5, 300
+    rate, done, _, _ = app.simulate_rejection_rate(spec, num_replications, max_simulations=simulations,
+                                                   chunk_size=simulations, seed=25)
+    assert done == simulations
+
+    noise = np.moveaxis(app.cell_noise(spec, (simulations, num_replications), 25, 'power', num_replications, 0),
+                        -2, 0)
+    shape = (simulations,) + spec.means.shape
+    values = app.simulate_replicates(np.broadcast_to(spec.means, shape), np.broadcast_to(spec.sds, shape),
+                                     num_replications, 'Normal', spec.lower, spec.upper, noise=noise)
+    exact = app.kruskal_exact_pvalues(values.reshape(-1, 4, num_replications)).reshape(simulations, 2)
+    np.testing.assert_allclose(rate, np.mean(exact < 0.05, axis=0))
+
+
+# ------------------------------------------------------------------
+# Pós-teste de Dunn e correções Holm/BH
+# ------------------------------------------------------------------
+def test_dunn_matches_tie_corrected_formula():
+    samples = rounded_groups(17, 6, 4, 5, decimals=0)
+    z, p_val = app.dunn_batched(samples)
+
+    for b in range(samples.shape[0]):
+        pooled = samples[b].ravel()
+        n = len(pooled)
+        mean_ranks = stats.rankdata(pooled).reshape(samples.shape[1:]).mean(axis=-1)
+        _, ties = np.unique(pooled, return_counts=True)
+        variance = n * (n + 1) / 12.0 - np.sum(ties ** 3 - ties) / (12.0 * (n - 1))
+        for i, j in itertools.combinations(range(samples.shape[1]), 2):
+            expected = (mean_ranks[i] - mean_ranks[j]) / np.sqrt(variance * 2.0 / samples.shape[2])
+            assert z[b, i, j] == pytest.approx(expected, rel=1e-10)
+            assert p_val[b, i, j] == pytest.approx(2.0 * stats.norm.sf(abs(expected)), rel=1e-10)
+
+
+def holm_reference(p_vals):
+    order = np.argsort(p_vals)
+    adjusted, running = np.empty(len(p_vals)), 0.0
+    for position, index in enumerate(order):
+        running = max(running, min(1.0, (len(p_vals) - position) * p_vals[index]))
+        adjusted[index] = running
+    return adjusted
+
+
+def test_adjust_pvalues_matches_references():
+    p_vals = np.random.default_rng(18).uniform(0.0, 0.2, size=(5, 9))
+    p_vals[1, 3] = np.nan
+    holm = app.adjust_pvalues(p_vals, 'Holm')
+    bh = app.adjust_pvalues(p_vals, 'Benjamini-Hochberg')
+    for row in range(p_vals.shape[0]):
+        valid = ~np.isnan(p_vals[row])
+        np.testing.assert_allclose(holm[row, valid], holm_reference(p_vals[row, valid]), rtol=1e-12)
+        np.testing.assert_allclose(bh[row, valid], stats.false_discovery_control(p_vals[row, valid]), rtol=1e-12)
+        assert np.all(np.isnan(holm[row, ~valid]))
+    with pytest.raises(ValueError):
+        app.adjust_pvalues(p_vals, 'Bonferroni')
+
+
+def test_adjust_pairwise_corrects_each_distinct_comparison_once():
+    _, p_val = app.dunn_batched(rounded_groups(20, 3, 4, 5))
+    adjusted = app.adjust_pairwise(p_val, 'Holm')
+    upper_i, upper_j = np.triu_indices(4, 1)
+    np.testing.assert_allclose(adjusted[:, upper_i, upper_j], app.adjust_pvalues(p_val[:, upper_i, upper_j], 'Holm'))
+    np.testing.assert_array_equal(adjusted, np.swapaxes(adjusted, -1, -2))
+    assert np.all(np.isnan(np.diagonal(adjusted, axis1=-2, axis2=-1)))
+
+
+# ------------------------------------------------------------------
+# ANOVA e Welch a partir das tabelas publicadas
+# ------------------------------------------------------------------
+def published_table(groups, dispersion):
+    """Tabela {parâmetro: {grupo: (média, dispersão)}} no formato dos estudos a partir de réplicas"""
+    cells = {}
+    for g, values in enumerate(groups):
+        spread = np.std(values, ddof=1)
+        cells[f"G{g}"] = (np.mean(values), spread / np.sqrt(len(values)) if dispersion == 'sem' else spread)
+    return {'P': cells}
+
+
+def test_sem_table_is_converted_to_standard_deviation():
+    groups = np.random.default_rng(10).normal(5.0, 2.0, size=(5, 3))
+    spec = app.prepare_study('t', published_table(groups, 'sem'), dims=('Parameter', 'Group'),
+                             dispersion='sem', sample_size=3)
+    np.testing.assert_allclose(spec.sds[0], np.std(groups, axis=1, ddof=1), rtol=1e-12)
+
+    with pytest.raises(ValueError):
+        app.summary_table_to_arrays(published_table(groups, 'sem'), ('Parameter', 'Group'), dispersion='sem')
+    with pytest.raises(ValueError):
+        app.summary_table_to_arrays(published_table(groups, 'sd'), ('Parameter', 'Group'), dispersion='se')
+
+
+@pytest.mark.parametrize('dispersion', ['sd', 'sem'])
+def test_summary_anova_matches_f_oneway(dispersion):
+    groups = np.random.default_rng(11).normal([[4.0], [5.0], [5.5], [7.0], [6.0]], [[1.0], [2.0], [0.5], [1.5], [1.0]],
+                                              size=(5, 3))
+    spec = app.prepare_study('t', published_table(groups, dispersion), dims=('Parameter', 'Group'),
+                             dispersion=dispersion, sample_size=3)
+    result = app.summary_anova(spec.means, spec.sds, 3)
+
+    anova = stats.f_oneway(*groups)
+    welch = stats.f_oneway(*groups, equal_var=False)
+    assert result.anova_f[0] == pytest.approx(anova.statistic, rel=1e-10)
+    assert result.anova_p[0] == pytest.approx(anova.pvalue, rel=1e-10)
+    assert result.welch_f[0] == pytest.approx(welch.statistic, rel=1e-10)
+    assert result.welch_p[0] == pytest.approx(welch.pvalue, rel=1e-10)
+
+    ss_between = np.sum(3 * (groups.mean(axis=1) - groups.mean()) ** 2)
+    ss_total = np.sum((groups - groups.mean()) ** 2)
+    assert result.eta_squared[0] == pytest.approx(ss_between / ss_total, rel=1e-10)
+
+
+# ------------------------------------------------------------------
+# Tendência: Jonckheere-Terpstra, Mann-Kendall e Sen
+# ------------------------------------------------------------------
+def test_mann_kendall_matches_kendalltau():
+    samples = rounded_groups(0, 30, 5, 4)
+    samples[0, 1, 2] = np.nan
+    positions = np.array([1.0, 30.0, 60.0, 90.0, 120.0])
+    trend = app.trend_tests(samples, positions)
+
+    for b in range(samples.shape[0]):
+        values = samples[b].ravel()
+        times = np.repeat(positions, samples.shape[-1])
+        valid = ~np.isnan(values)
+        reference = stats.kendalltau(times[valid], values[valid])
+        assert trend.mk_p[b] == pytest.approx(reference.pvalue, rel=1e-10)
+        assert np.sign(trend.mk_s[b]) == np.sign(reference.statistic)
+
+
+def test_jonckheere_and_sen_match_pairwise_definition():
+    samples = rounded_groups(1, 8, 4, 3)
+    positions = np.array([0.0, 25.0, 50.0, 100.0])
+    trend = app.trend_tests(samples, positions)
+
+    for b in range(samples.shape[0]):
+        values = samples[b].ravel()
+        times = np.repeat(positions, samples.shape[-1])
+        later = times[np.newaxis, :] > times[:, np.newaxis]
+        diff = values[np.newaxis, :] - values[:, np.newaxis]
+        assert trend.jt_stat[b] == pytest.approx(np.sum(later * ((diff > 0) + 0.5 * (diff == 0))))
+        assert trend.mk_s[b] == pytest.approx(np.sum(later * np.sign(diff)))
+        slopes = diff[later] / (times[np.newaxis, :] - times[:, np.newaxis])[later]
+        assert trend.sen_slope[b] == pytest.approx(np.median(slopes))
+
+
+# ------------------------------------------------------------------
+# Dois fatores: Scheirer-Ray-Hare e ART
+# ------------------------------------------------------------------
+def between_ss(groups):
+    """Soma de quadrados entre grupos obtida do F de scipy.stats.f_oneway"""
+    groups = [np.asarray(g, dtype=float) for g in groups]
+    pooled = np.concatenate(groups)
+    ss_total = np.sum((pooled - pooled.mean()) ** 2)
+    f_stat = stats.f_oneway(*groups).statistic
+    k, n = len(groups), len(pooled)
+    return f_stat * (k - 1) * ss_total / (n - k + f_stat * (k - 1))
+
+
+def factorial_reference(y):
+    """SS de A, B, A×B e do erro de uma ANOVA A × B balanceada, a partir de ANOVAs de um fator"""
+    a, b, r = y.shape
+    ss_a = between_ss([y[i].ravel() for i in range(a)])
+    ss_b = between_ss([y[:, j].ravel() for j in range(b)])
+    ss_cells = between_ss([y[i, j] for i in range(a) for j in range(b)])
+    ss_total = np.sum((y - y.mean()) ** 2)
+    return np.array([ss_a, ss_b, ss_cells - ss_a - ss_b]), ss_total - ss_cells, ss_total
+
+
+def test_two_factor_rank_tests_match_anova_of_ranks():
+    rng = np.random.default_rng(23)
+    values = rng.normal(size=(2, 3, 4, 3)) + np.array([0.0, 0.5, 1.0])[:, None, None] + 0.4 * np.arange(4)[:, None]
+    result = app.two_factor_rank_tests(values)
+    a, b, r = values.shape[1:]
+    df = np.array([a - 1, b - 1, (a - 1) * (b - 1)])
+    df_error = a * b * (r - 1)
+
+    for row in range(values.shape[0]):
+        y = values[row]
+        ranks = stats.rankdata(y).reshape(y.shape)
+        ss_effects, _, ss_total = factorial_reference(ranks)
+        srh = ss_effects / (ss_total / (y.size - 1))
+        np.testing.assert_allclose(result.srh_h[row], srh, rtol=1e-9)
+        np.testing.assert_allclose(result.srh_p[row], stats.chi2.sf(srh, df), rtol=1e-9)
+
+        cell = y.mean(axis=-1, keepdims=True)
+        mean_a = y.mean(axis=(1, 2), keepdims=True)
+        mean_b = y.mean(axis=(0, 2), keepdims=True)
+        effects = [mean_a - y.mean(), mean_b - y.mean(), cell - mean_a - mean_b + y.mean()]
+        for e, effect in enumerate(effects):
+            aligned_ranks = stats.rankdata(np.round(y - cell + effect, 9)).reshape(y.shape)
+            ss_aligned, ss_error, _ = factorial_reference(aligned_ranks)
+            art_f = (ss_aligned[e] / df[e]) / (ss_error / df_error)
+            assert result.art_f[row, e] == pytest.approx(art_f, rel=1e-9)
+            assert result.art_p[row, e] == pytest.approx(stats.f.sf(art_f, df[e], df_error), rel=1e-8)
+
+
+# ------------------------------------------------------------------
+# Intervalos bootstrap (BCa e percentil)
+# ------------------------------------------------------------------
+def group_means(samples):
+    with np.errstate(invalid='ignore'):
+        return np.nanmean(samples, axis=-1)
+
+
+@pytest.mark.parametrize('method', ['BCa', 'Percentil'])
+def test_bootstrap_interval_matches_scipy_bootstrap(method):
+    values = np.random.default_rng(20).lognormal(size=40)
+    interval = app.bootstrap_interval(values[np.newaxis, np.newaxis, :], group_means, method=method)
+    reference = stats.bootstrap((values,), np.mean, confidence_level=0.95, n_resamples=20000,
+                                method='BCa' if method == 'BCa' else 'percentile',
+                                rng=np.random.default_rng(21)).confidence_interval
+    se = np.std(values, ddof=1) / np.sqrt(len(values))
+    assert interval.estimate[0, 0] == pytest.approx(values.mean())
+    assert interval.low[0, 0] == pytest.approx(reference.low, abs=0.2 * se)
+    assert interval.high[0, 0] == pytest.approx(reference.high, abs=0.2 * se)
+
+
+# ------------------------------------------------------------------
+# Correção sobre a família de testes de cada rodada (Holm, Hochberg, BH)
+# ------------------------------------------------------------------
+def hochberg_reference(p_vals):
+    order = np.argsort(p_vals)[::-1]
+    adjusted, running = np.empty(len(p_vals)), 1.0
+    for position, index in enumerate(order):
+        running = min(running, (position + 1) * p_vals[index])
+        adjusted[index] = running
+    return adjusted
+
+
+def test_hochberg_matches_step_up_reference():
+    p_vals = np.random.default_rng(18).uniform(0.0, 0.2, size=(5, 9))
+    p_vals[1, 3] = np.nan
+    hochberg = app.adjust_pvalues(p_vals, 'Hochberg')
+    for row in range(p_vals.shape[0]):
+        valid = ~np.isnan(p_vals[row])
+        np.testing.assert_allclose(hochberg[row, valid], hochberg_reference(p_vals[row, valid]), rtol=1e-12)
+        assert np.all(np.isnan(hochberg[row, ~valid]))
+    # Hochberg nunca é mais conservador que Holm
+    assert np.all(hochberg[~np.isnan(p_vals)] <= app.adjust_pvalues(p_vals, 'Holm')[~np.isnan(p_vals)] + 1e-15)
+
+
+def test_adjust_pvalues_matches_statsmodels():
+    multitest = pytest.importorskip('statsmodels.stats.multitest')
+    p_vals = np.random.default_rng(19).uniform(0.0, 0.3, size=12)
+    for method, name in [('Holm', 'holm'), ('Hochberg', 'simes-hochberg'), ('Benjamini-Hochberg', 'fdr_bh')]:
+        np.testing.assert_allclose(app.adjust_pvalues(p_vals, method),
+                                   multitest.multipletests(p_vals, method=name)[1], rtol=1e-12)
+
+
+def test_adjust_family_corrects_only_the_chosen_cells():
+    p_vals = np.random.default_rng(33).uniform(0.0, 0.1, size=(4, 3, 2))
+    family = [0, 2, 5]
+    adjusted = app.adjust_family(p_vals, 'Hochberg', family)
+    flat = adjusted.reshape(4, -1)
+
+    np.testing.assert_allclose(flat[:, family], app.adjust_pvalues(p_vals.reshape(4, -1)[:, family], 'Hochberg'))
+    assert np.all(np.isnan(np.delete(flat, family, axis=1)))
+    np.testing.assert_allclose(app.adjust_family(p_vals, 'Holm'),
+                               app.adjust_pvalues(p_vals.reshape(4, -1), 'Holm').reshape(p_vals.shape))
+    np.testing.assert_array_equal(app.adjust_family(p_vals, 'Nenhuma'), p_vals)
+
+
+# ------------------------------------------------------------------
+# Bateria por postos: Kruskal-Wallis, Mood, Van der Waerden e Fligner-Killeen
+# ------------------------------------------------------------------
+def test_rank_battery_matches_scipy():
+    samples = rounded_groups(16, 12, 4, 6, decimals=1)
+    samples[5, 1, 4:] = np.nan
+    battery = app.rank_test_battery(samples)
+    np.testing.assert_array_equal(app.rank_test_battery(samples, app.rank_bundle(samples)).vdw_p, battery.vdw_p)
+
+    for b in range(samples.shape[0]):
+        groups = [g[~np.isnan(g)] for g in samples[b]]
+        kruskal = stats.kruskal(*groups)
+        mood = stats.median_test(*groups, ties='below')
+        fligner = stats.fligner(*groups, center='median')
+        assert battery.kw_h[b] == pytest.approx(kruskal.statistic, rel=1e-10)
+        assert battery.mood_chi2[b] == pytest.approx(mood.statistic, rel=1e-10)
+        assert battery.mood_p[b] == pytest.approx(mood.pvalue, rel=1e-10)
+        assert battery.fk_chi2[b] == pytest.approx(fligner.statistic, rel=1e-10)
+        assert battery.fk_p[b] == pytest.approx(fligner.pvalue, rel=1e-10)
+
+        # Van der Waerden: escores normais dos postos (centrados, pois empates tiram a média de zero),
+        # teste qui-quadrado com k - 1 gl
+        pooled = np.concatenate(groups)
+        scores = stats.norm.ppf(stats.rankdata(pooled) / (len(pooled) + 1.0))
+        scores = scores - scores.mean()
+        split = np.split(scores, np.cumsum([len(g) for g in groups])[:-1])
+        vdw = sum(len(s) * s.mean() ** 2 for s in split) / np.var(scores, ddof=1)
+        assert battery.vdw_t[b] == pytest.approx(vdw, rel=1e-9, abs=1e-12)
+        assert battery.vdw_p[b] == pytest.approx(stats.chi2.sf(vdw, len(groups) - 1), rel=1e-8, abs=1e-12)
+
+
+# ------------------------------------------------------------------
+# Kruskal-Wallis incremental (edição de réplicas)
+# ------------------------------------------------------------------
+def test_online_kruskal_follows_every_edit():
+    rng = np.random.default_rng(34)
+    groups = [list(np.round(rng.normal(g * 0.5, 1.0, size=4), 0)) for g in range(3)]
+    online = app.OnlineKruskal(groups)
+
+    for step in range(60):
+        g = int(rng.integers(3))
+        action = step % 3
+        if action == 0 or len(groups[g]) < 2:
+            value = float(np.round(rng.normal(g * 0.5, 1.0), 0))
+            online.insert(g, value)
+            groups[g].append(value)
+        elif action == 1:
+            value = groups[g].pop(int(rng.integers(len(groups[g]))))
+            online.delete(g, value)
+        else:
+            position = int(rng.integers(len(groups[g])))
+            new_value = float(np.round(rng.normal(), 0))
+            online.update(g, groups[g][position], new_value)
+            groups[g][position] = new_value
+
+        reference = stats.kruskal(*groups)
+        h_stat, p_val = online.result()
+        assert h_stat == pytest.approx(reference.statistic, rel=1e-10)
+        assert p_val == pytest.approx(reference.pvalue, rel=1e-10)
+
+
+def test_online_kruskal_rejects_missing_values():
+    online = app.OnlineKruskal([[1.0, 2.0], [3.0, 4.0]])
+    with pytest.raises(ValueError):
+        online.delete(0, 3.0)
+    assert online.result()[0] == pytest.approx(stats.kruskal([1.0, 2.0], [3.0, 4.0]).statistic)
+
+
+# ------------------------------------------------------------------
+# Posteriores bayesianas
+# ------------------------------------------------------------------
+def test_bayes_posteriors_match_t_posterior():
+    means = np.array([[10.0, 10.5, 12.0], [3.0, 3.0, 2.5]])
+    sds = np.array([[1.0, 1.2, 0.8], [0.5, 0.6, 0.4]])
+    n = 4
+    result = app.bayes_posteriors(means, sds, n, num_draws=40000)
+    low, high = stats.t.interval(0.95, n - 1, loc=means, scale=sds / np.sqrt(n))
+    np.testing.assert_allclose(result.low, low, rtol=1e-12)
+    np.testing.assert_allclose(result.high, high, rtol=1e-12)
+
+    draws = stats.t.rvs(n - 1, loc=means, scale=sds / np.sqrt(n), size=(200000,) + means.shape,
+                        random_state=np.random.default_rng(24))
+    reference = np.mean(draws[..., :, None] > draws[..., None, :], axis=0)
+    np.testing.assert_allclose(result.prob_greater, reference, atol=0.015)
+    np.testing.assert_allclose(result.prob_max.sum(axis=-1), 1.0)
+
+
+# ------------------------------------------------------------------
+# Equivalência (TOST de Welch)
+# ------------------------------------------------------------------
+def test_tost_matches_welch_one_sided_tests():
+    samples = np.random.default_rng(22).normal(10.0, [[1.0], [1.5], [0.8]], size=(3, 3, 6))
+    samples[1] += np.array([[0.0], [0.3], [0.6]])
+    margins = np.array([1.0, 1.5, 2.0])
+    result = app.tost_equivalence(samples, margins)
+    for b in range(samples.shape[0]):
+        pair_p = []
+        for i, j in itertools.combinations(range(samples.shape[1]), 2):
+            a, c = samples[b, i], samples[b, j]
+            lower = stats.ttest_ind(a + margins[b], c, equal_var=False, alternative='greater').pvalue
+            upper = stats.ttest_ind(a - margins[b], c, equal_var=False, alternative='less').pvalue
+            pair_p.append(max(lower, upper))
+        assert result.p_value[b] == pytest.approx(max(pair_p), rel=1e-9)
+
+    relative = app.tost_equivalence(samples, np.full(3, 5.0), relative=True)
+    np.testing.assert_allclose(relative.margin, 0.05 * np.abs(samples.mean(axis=(-2, -1))))
+
+
+# ------------------------------------------------------------------
+# Cache de tiles PNG por impressão digital dos dados
+# ------------------------------------------------------------------
+@pytest.fixture
+def empty_tile_cache():
+    app.tile_cache.clear()
+    yield
+    app.tile_cache.clear()
+
+
+def line_tile(level):
+    fig, ax = plt.subplots(figsize=(2, 2))
+    ax.axhline(level)
+    return fig
+
+
+def test_data_fingerprint_is_stable_and_sensitive():
+    data = [np.array([1.0, 2.0, 3.0]), np.array([4.0, 5.0])]
+    fingerprint = app.data_fingerprint(data, ['A', 'B'], 0.05)
+    assert fingerprint == app.data_fingerprint([d.copy() for d in data], ['A', 'B'], 0.05)
+    assert fingerprint != app.data_fingerprint([data[0], np.array([4.0, 5.5])], ['A', 'B'], 0.05)
+    assert fingerprint != app.data_fingerprint(data, ['A', 'C'], 0.05)
+    assert fingerprint != app.data_fingerprint([np.array([1.0, 2.0]), np.array([3.0, 4.0, 5.0])], ['A', 'B'], 0.05)
+    assert app.data_fingerprint(np.arange(3)) != app.data_fingerprint(np.arange(3.0))
+
+
+def test_resolve_tiles_renders_each_key_once(empty_tile_cache, monkeypatch):
+    calls = []
+
+    def counted_tile(level):
+        calls.append(level)
+        return line_tile(level)
+
+    jobs = [app.chart_tile('teste', p, app.data_fingerprint(level), counted_tile, level)
+            for p, level in [('A', 1.0), ('B', 2.0), ('A', 1.0)]]
+    first = app.resolve_tiles(jobs, workers=1)
+    assert calls == [1.0, 2.0]
+    assert first[0] == first[2] and first[0].startswith(b'\x89PNG')
+
+    assert app.resolve_tiles(jobs, workers=1) == first
+    assert calls == [1.0, 2.0]
+
+    # LRU: com espaço para dois tiles, B (o usado há mais tempo; A foi consultado por último) sai e volta
+    # a ser desenhado, A continua em cache
+    monkeypatch.setattr(app, 'TILE_CACHE_SIZE', 2)
+    app.resolve_tiles([app.chart_tile('teste', 'C', app.data_fingerprint(3.0), counted_tile, 3.0)], workers=1)
+    app.resolve_tiles(jobs[:2], workers=1)
+    assert calls == [1.0, 2.0, 3.0, 2.0]
+
+
+# ------------------------------------------------------------------
+# Renderização dos tiles em processos
+# ------------------------------------------------------------------
+@pytest.fixture
+def tile_pool():
+    yield app.tile_pool
+    app.tile_pool().shutdown()
+    app.tile_pool.clear()
+
+
+def zinc_doses():
+    """Zinco nas folhas por dose, perto do nível tóxico de 500"""
+    return [np.array([380.0, 410.0, 450.0]), np.array([440.0, 470.0, 520.0]), np.array([510.0, 560.0, 600.0])]
+
+
+def test_pool_tiles_match_serial_rendering(tile_pool, monkeypatch):
+    grid = np.arange(2, 8)
+    jobs = [
+        app.chart_tile('teste', 'poder', 'a', app.draw_power_tile, 'P', grid,
+                       [('G', np.linspace(0.1, 0.9, len(grid)))], 0.8, 3, 5),
+        app.chart_tile('teste', 'dose', 'b', app.draw_dose_tile, zinc_doses(), ['0', '10', '20'],
+                       np.array([0.0, 10.0, 20.0]), 'Zinco', None, 'p = 0.01', (500, 'Nível Tóxico')),
+    ]
+    serial = [app.render_tile(job.draw, job.args) for job in jobs]
+
+    # Sem desenho em série neste processo: os PNGs vêm todos dos processos do pool
+    with monkeypatch.context() as patched:
+        patched.setattr(app, 'render_tile', None)
+        assert app.render_tiles(jobs, workers=2) == serial
+
+    # Uma função fora do app não chega aos processos pelo nome: o tile é desenhado aqui, com o mesmo PNG
+    local = [app.chart_tile('teste', 'linha', 'c', line_tile, 1.0), jobs[0]]
+    assert app.render_tiles(local, workers=2) == [app.render_tile(line_tile, (1.0,)), serial[0]]
+
+
+# ------------------------------------------------------------------
+# Nível tóxico nos dois backends de gráfico
+# ------------------------------------------------------------------
+def test_toxic_reference_is_drawn_by_both_backends():
+    doses, positions = ['0', '10', '20'], [0.0, 10.0, 20.0]
+    spec = app.vega_parameter_chart(zinc_doses(), doses, 'Zinco', 'Dose', 'Zinco', positions=positions,
+                                    reference=(500, 'Nível Tóxico'))
+    reference = spec['layer'][-1]
+    assert reference['data']['values'] == [{'y': 500, 'texto': 'Nível Tóxico'}]
+    assert [layer['mark']['type'] for layer in reference['layer']] == ['rule', 'text']
+    plain = app.vega_parameter_chart(zinc_doses(), doses, 'Zinco', 'Dose', 'Zinco', positions=positions)
+    assert len(plain['layer']) == len(spec['layer']) - 1
+
+    fig = app.draw_dose_tile(zinc_doses(), doses, np.array(positions), 'Zinco', None, 'p = 0.01',
+                             reference=(500, 'Nível Tóxico'))
+    ax = fig.axes[0]
+    assert any(np.allclose(line.get_ydata(), 500) for line in ax.get_lines())
+    assert 'Nível Tóxico' in [text.get_text() for text in ax.texts]
+    plt.close(fig)
+
+
+# ------------------------------------------------------------------
+# Testes por parâmetro em cache pelos dados
+# ------------------------------------------------------------------
+def test_parameter_tests_match_engines_and_reuse_cache(monkeypatch):
+    app.parameter_tests.clear()
+    stacked = rounded_groups(35, 3, 4, 4)
+    labels, margins, relative = ['pH', 'N', 'P'], (1.0, 1.0, 5.0), np.array([False, False, True])
+    calls = []
+    rank_bundle = app.rank_bundle
+
+    def counted_bundle(samples):
+        calls.append(samples.shape)
+        return rank_bundle(samples)
+
+    monkeypatch.setattr(app, 'rank_bundle', counted_bundle)
+
+    tests = app.parameter_tests(stacked, labels, 7, margins, relative, positions=np.arange(4.0), dunn=True)
+    assert len(calls) == 1  # uma ordenação repassada a todos os testes por postos
+    np.testing.assert_array_equal(tests.battery.kw_p, app.rank_test_battery(stacked).kw_p)
+    np.testing.assert_array_equal(tests.exact_p, app.kruskal_exact_pvalues(stacked, labels=labels, seed=7))
+    np.testing.assert_array_equal(tests.trend.mk_p, app.trend_tests(stacked, np.arange(4.0)).mk_p)
+    np.testing.assert_array_equal(tests.median_ci.low,
+                                  app.bootstrap_interval(stacked, app.group_medians, labels=labels, seed=7).low)
+    np.testing.assert_array_equal(tests.equivalence.p_value, app.tost_equivalence(stacked, margins, relative).p_value)
+    np.testing.assert_array_equal(tests.dunn_p, app.dunn_batched(stacked)[1])
+
+    # Mesmos dados: nenhum teste é refeito; outra semente recalcula
+    calls.clear()
+    app.parameter_tests(stacked.copy(), labels, 7, margins, relative, positions=np.arange(4.0), dunn=True)
+    assert calls == []
+    app.parameter_tests(stacked, labels, 8, margins, relative, positions=np.arange(4.0), dunn=True)
+    assert len(calls) == 1
+
+
+# ------------------------------------------------------------------
+# Muitas réplicas: KDE binada, violinos e blocos de memória
+# ------------------------------------------------------------------
+@pytest.mark.parametrize('sigma', [0.5, 1.0, 1.5, 2.0])
+def test_binned_kde_matches_gaussian_kde_on_lognormal(sigma):
+    values = np.random.default_rng(7).lognormal(0.0, sigma, 2000)
+    bandwidth = app.kde_bandwidth(values)
+    grid, density = app.binned_kde(values)
+    reference = stats.gaussian_kde(values, bw_method=bandwidth / np.std(values, ddof=1))(grid)
+    assert np.max(np.abs(density - reference)) < 1e-3 * reference.max()
+
+
+def test_density_strip_of_constant_group():
+    centers, density = app.density_strip(np.full(app.DENSE_POINTS_THRESHOLD + 100, 7.2))
+    assert len(centers) == app.DENSE_STRIP_BINS
+    assert np.all(np.isfinite(density)) and 0.9 < density.max() <= 1.0
+    assert centers.min() < 7.2 < centers.max()
+
+
+def test_plot_replicates_switches_to_violin_above_threshold():
+    matplotlib = pytest.importorskip('matplotlib')
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    from matplotlib.collections import PathCollection, PolyCollection
+
+    values = np.random.default_rng(3).normal(size=app.DENSE_POINTS_THRESHOLD + 1)
+    fig, ax = plt.subplots()
+    try:
+        assert isinstance(app.plot_replicates(ax, 1.0, values[:-1], 'red', 'A'), PathCollection)
+        assert isinstance(app.plot_replicates(ax, 2.0, values, 'red', 'B'), PolyCollection)
+    finally:
+        plt.close(fig)
+
+
+def test_group_medians_matches_nanmedian():
+    samples = np.random.default_rng(4).normal(size=(3, 4, 301))
+    samples[np.random.default_rng(5).random(samples.shape) < 0.3] = np.nan
+    samples[0, 0] = np.nan
+    with pytest.warns(RuntimeWarning):
+        reference = np.nanmedian(samples, axis=-1)
+    np.testing.assert_array_equal(app.group_medians(samples), reference)
+
+
+def test_bootstrap_chunks_match_single_draw(monkeypatch):
+    samples = rounded_groups(6, 3, 4, 7)
+    samples[1, 2, 5:] = np.nan
+    labels = ['a', 'b', 'c']
+    single = app.bootstrap_interval(samples, app.group_medians, labels=labels, num_resamples=500)
+    monkeypatch.setattr(app, 'BOOTSTRAP_CHUNK_VALUES', 100)
+    chunked = app.bootstrap_interval(samples, app.group_medians, labels=labels, num_resamples=500)
+    for expected, actual in zip(single, chunked):
+        np.testing.assert_array_equal(actual, expected)
+
+
+def test_sen_slope_blocks_match_single_block(monkeypatch):
+    samples = rounded_groups(8, 6, 4, 5)
+    samples[2, 1, 3] = np.nan
+    positions = [1.0, 2.0, 4.0, 8.0]
+    single = app.trend_tests(samples, positions).sen_slope
+    monkeypatch.setattr(app, 'SEN_CHUNK_VALUES', 1)
+    np.testing.assert_array_equal(app.trend_tests(samples, positions).sen_slope, single)
+
+
+def test_large_designs_use_chi_square_instead_of_permutation():
+    # Com empates não há tabela: até PERMUTATION_MAX_OBSERVATIONS permuta, acima usa o qui-quadrado
+    replicates = app.PERMUTATION_MAX_OBSERVATIONS // 4 + 1
+    samples = rounded_groups(36, 3, 4, replicates, shift=0.1)
+    samples[1, 0, :2] = np.nan  # 4 × n - 2 observações: ainda acima do limite
+    np.testing.assert_array_equal(app.kruskal_exact_pvalues(samples), app.kruskal_batched(samples)[1])
+
+    small = samples[..., :replicates - 1]
+    expected, _ = app.kruskal_permutation(small, labels=['a', 'b', 'c'], seed=9)
+    np.testing.assert_array_equal(app.kruskal_exact_pvalues(small, labels=['a', 'b', 'c'], seed=9), expected)